@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CapabilityProfile, TrainingMaterial
+from .models import CapabilityProfile, TrainingMaterial, ExportJob, AnalyticsCubeCell
 
 
 @admin.register(CapabilityProfile)
@@ -22,4 +22,28 @@ class TrainingMaterialAdmin(admin.ModelAdmin):
     list_filter = ('material_type', 'is_active', 'tags', 'created_at')
     search_fields = ('title', 'description')
     filter_horizontal = ('tags',)
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'file_format', 'status', 'progress', 'total_rows',
+                    'requested_by', 'created_at', 'finished_at', 'expires_at')
+    list_filter = ('status', 'kind', 'file_format', 'created_at')
+    readonly_fields = ('params_hash', 'watermark', 'progress', 'total_rows', 'file_path',
+                       'error', 'started_at', 'finished_at', 'created_at', 'updated_at')
+
+
+@admin.register(AnalyticsCubeCell)
+class AnalyticsCubeCellAdmin(admin.ModelAdmin):
+    list_display = ('week_start', 'department', 'position', 'tag', 'exam_count', 'pass_count',
+                    'answer_count', 'correct_count', 'mastery_count', 'refreshed_at')
+    list_filter = ('week_start', 'department', 'position')
+    list_select_related = ('tag',)
+
+    def has_add_permission(self, request):
+        # 立方体由 refresh_analytics_cube 命令生成
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class AnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analysis'
-    verbose_name = '能力分析'
\ No newline at end of file
+    verbose_name = '能力分析'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,144 @@
+"""
+同岗位能力分布与百分位排名
+
+按岗位一次性读取能力画像，为每个 (岗位, 标签) 构建排好序的 NumPy 数组，缓存在进程内。
+查询百分位只需在数组上 searchsorted，不需要对同岗位员工做 COUNT 查询。
+考试提交后将对应岗位标记为过期，下次查询时重建；缓存另有过期时间，
+保证多进程部署时其他进程也能在有限时间内看到最新数据。
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .models import CapabilityProfile
+
+
+class CohortDistribution:
+    """单个 (岗位, 标签) 的掌握度分布"""
+
+    def __init__(self, values):
+        self.values = np.sort(np.asarray(values, dtype=np.float64))
+        self.size = len(self.values)
+        self.mean = float(self.values.mean()) if self.size else None
+        if self.size:
+            self.q1, self.median, self.q3 = (float(value) for value in np.percentile(self.values, [25, 50, 75]))
+        else:
+            self.q1 = self.median = self.q3 = None
+
+    def percentile_of(self, value):
+        """
+        计算百分位排名（0-100）：低于该值的人数加上并列人数的一半，占全部人数的比例
+        """
+        if not self.size:
+            return None
+        below = np.searchsorted(self.values, value, side='left')
+        not_above = np.searchsorted(self.values, value, side='right')
+        return float((below + not_above) / 2 / self.size * 100)
+
+
+_cache = {}  # {岗位: (构建时间, {标签ID: CohortDistribution})}
+_lock = threading.Lock()
+
+
+def _cache_seconds():
+    return settings.ASSESSMENT_SETTINGS.get('COHORT_CACHE_SECONDS', 300)
+
+
+def build_cohort(position):
+    """
+    构建岗位的能力分布：一次查询读取该岗位全部能力画像（排除role标签），按标签拆分为有序数组
+
+    Returns:
+        dict: {标签ID: CohortDistribution}
+    """
+    rows = np.array(
+        CapabilityProfile.objects.filter(
+            user__position=position,
+            user__is_staff=False,
+            user__is_active=True
+        ).exclude(tag__category='role').values_list('tag_id', 'mastery_level'),
+        dtype=np.float64
+    ).reshape(-1, 2)
+    if not len(rows):
+        return {}
+
+    tag_ids = rows[:, 0].astype(np.int64)
+    order = np.argsort(tag_ids, kind='stable')
+    tag_ids, levels = tag_ids[order], rows[order, 1]
+    unique_tags, starts = np.unique(tag_ids, return_index=True)
+    return {
+        int(tag_id): CohortDistribution(values)
+        for tag_id, values in zip(unique_tags, np.split(levels, starts[1:]))
+    }
+
+
+def get_cohort(position):
+    """获取岗位的能力分布（缓存过期或被标记为过期时重建）"""
+    now = time.monotonic()
+    cached = _cache.get(position)
+    if cached and now - cached[0] < _cache_seconds():
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(position)
+        if cached and now - cached[0] < _cache_seconds():
+            return cached[1]
+        distributions = build_cohort(position)
+        _cache[position] = (time.monotonic(), distributions)
+        return distributions
+
+
+def mark_cohort_stale(position=None):
+    """将岗位的能力分布标记为过期（不指定岗位时清空全部缓存）"""
+    with _lock:
+        if position is None:
+            _cache.clear()
+        else:
+            _cache.pop(position, None)
+
+
+def cohort_percentiles(user, tags):
+    """
+    计算用户各标签在同岗位员工中的百分位排名
+
+    Args:
+        user: 用户对象
+        tags: 需要返回的标签列表（用于雷达图叠加，用户没有画像的标签也会返回同岗位分布）
+
+    Returns:
+        list: 每个标签的掌握度、百分位、同岗位人数、均值和四分位数
+    """
+    distributions = get_cohort(user.position)
+    levels = dict(
+        CapabilityProfile.objects.filter(user=user).values_list('tag_id', 'mastery_level')
+    )
+
+    results = []
+    for tag in tags:
+        distribution = distributions.get(tag.id)
+        level = levels.get(tag.id)
+        item = {
+            'tag_id': tag.id,
+            'tag_name': tag.name,
+            'mastery_level': level,
+            'percentile': None,
+            'cohort_size': 0,
+            'cohort_mean': None,
+            'q1': None,
+            'median': None,
+            'q3': None,
+        }
+        if distribution is not None:
+            item.update({
+                'cohort_size': distribution.size,
+                'cohort_mean': round(distribution.mean, 2),
+                'q1': round(distribution.q1, 2),
+                'median': round(distribution.median, 2),
+                'q3': round(distribution.q3, 2),
+            })
+            if level is not None:
+                item['percentile'] = round(distribution.percentile_of(level), 2)
+        results.append(item)
+    return results
@@ -0,0 +1,388 @@
+"""
+部门/岗位统计立方体
+
+按 部门 × 岗位 × 标签 × 周 预聚合考试和能力画像指标，存入 analytics_cube 表。
+构建时一次性读取所需列，用 pandas 分组聚合；增量刷新只重算上次刷新后有试卷变动的周、
+试卷数与立方体不一致（有试卷被删除）的周，以及当前周的能力画像快照。切片查询只读取立方体单元格，不扫描原始答题记录。
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.models import ExamPaper, ExamRecord, Question
+from .models import AnalyticsCubeCell, CapabilityProfile
+
+HISTOGRAM_BINS = 10
+CUBE_KEYS = ['week_start', 'department', 'position', 'tag_id']
+# pandas 分组键不能为空值，用 0 表示"全部标签"，写入数据库时转为 NULL
+ALL_TAGS = 0
+COUNT_FIELDS = ['exam_count', 'pass_count', 'answer_count', 'correct_count', 'mastery_count']
+SUM_FIELDS = ['score_rate_sum', 'mastery_sum']
+METRIC_FIELDS = COUNT_FIELDS + SUM_FIELDS
+HISTOGRAM_COLUMNS = [f'bin_{index}' for index in range(HISTOGRAM_BINS)]
+
+GROUP_BY_FIELDS = {
+    'week': ['week_start'],
+    'department': ['department'],
+    'position': ['position'],
+    'tag': ['tag_id', 'tag__name'],
+}
+
+
+def week_start_of(value):
+    """时间所在周（本地时区）的周一日期"""
+    local_date = timezone.localtime(value).date()
+    return local_date - timedelta(days=local_date.weekday())
+
+
+def week_start_of_date(value):
+    """日期所在周的周一"""
+    return value - timedelta(days=value.weekday())
+
+
+def _week_starts(datetimes):
+    """将时间序列转换为本地时区所在周的周一日期"""
+    local = pd.to_datetime(datetimes, utc=True).dt.tz_convert(
+        timezone.get_current_timezone_name()
+    ).dt.tz_localize(None).dt.normalize()
+    return (local - pd.to_timedelta(local.dt.weekday, unit='D')).dt.date
+
+
+def _week_ranges(weeks, field):
+    """
+    只覆盖指定周的时间条件
+
+    相邻的周合并为一个区间 [起始, 结束)，全量重算时通常只有一个区间；
+    增量刷新时一张旧试卷被修改也只读取该周的数据，而不是从该周到当前周的全部数据。
+    """
+    tz = timezone.get_current_timezone()
+    condition = Q()
+    ordered = sorted(weeks)
+    index = 0
+    while index < len(ordered):
+        first = last = ordered[index]
+        index += 1
+        while index < len(ordered) and ordered[index] == last + timedelta(days=7):
+            last = ordered[index]
+            index += 1
+        start = timezone.make_aware(pd.Timestamp(first).to_pydatetime(), tz)
+        end = timezone.make_aware(pd.Timestamp(last).to_pydatetime() + timedelta(days=7), tz)
+        condition |= Q(**{f'{field}__gte': start, f'{field}__lt': end})
+    return condition
+
+
+def _weeks_with_deletions(completed):
+    """
+    试卷数与立方体记录不一致的周
+
+    删除试卷（包括删除员工时级联删除）不会留下更新时间，按周比较已完成试卷数和
+    立方体全部标签单元格的考试数找出这些周。
+    """
+    actual = {
+        timezone.localtime(row['week']).date(): row['count']
+        for row in completed.annotate(
+            week=TruncWeek('completed_at', tzinfo=timezone.get_current_timezone())
+        ).values('week').annotate(count=Count('id')).order_by()
+    }
+    recorded = dict(
+        AnalyticsCubeCell.objects.filter(tag__isnull=True, exam_count__gt=0).values('week_start').annotate(
+            count=Sum('exam_count')
+        ).order_by().values_list('week_start', 'count')
+    )
+    return {week for week in set(actual) | set(recorded) if actual.get(week, 0) != recorded.get(week, 0)}
+
+
+def refresh_cube(full=False):
+    """
+    刷新统计立方体
+
+    Args:
+        full: 是否重算全部周；默认只重算上次刷新后有试卷完成、修改或删除的周和当前周
+
+    Returns:
+        dict: {'weeks': 重算的周数, 'cells': 写入的单元格数}
+    """
+    now = timezone.now()
+    current_week = week_start_of(now)
+
+    completed = ExamPaper.objects.filter(
+        status=ExamPaper.Status.COMPLETED,
+        completed_at__isnull=False,
+        user__is_staff=False
+    )
+    last_refreshed = None if full else AnalyticsCubeCell.objects.aggregate(last=Max('refreshed_at'))['last']
+    changed = completed if last_refreshed is None else completed.filter(updated_at__gt=last_refreshed)
+    changed_times = pd.Series(list(changed.values_list('completed_at', flat=True)), dtype='object')
+    weeks = set(_week_starts(changed_times)) if len(changed_times) else set()
+    if last_refreshed is not None:
+        weeks |= _weeks_with_deletions(completed)
+    weeks.add(current_week)
+
+    frames = []
+    histograms = None
+    papers = pd.DataFrame.from_records(
+        completed.filter(_week_ranges(weeks, 'completed_at')).values_list(
+            'id', 'user__department', 'user__position', 'completed_at', 'score_obtained', 'total_score'
+        ),
+        columns=['paper_id', 'department', 'position', 'completed_at', 'score_obtained', 'total_score']
+    )
+    if not papers.empty:
+        papers['week_start'] = _week_starts(papers['completed_at'])
+        papers = papers[papers['week_start'].isin(weeks)]
+    if not papers.empty:
+        paper_frame, histograms = _aggregate_papers(papers)
+        frames.append(paper_frame)
+        frames.extend(_aggregate_answers(papers, weeks))
+
+    frames.extend(_aggregate_mastery(current_week))
+    frames.append(_preserved_mastery(weeks - {current_week}))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if frames:
+        cube = pd.concat(frames, ignore_index=True)
+        cube = cube.reindex(columns=CUBE_KEYS + METRIC_FIELDS)
+        cube[METRIC_FIELDS] = cube[METRIC_FIELDS].fillna(0)
+        cube = cube.groupby(CUBE_KEYS, as_index=False)[METRIC_FIELDS].sum()
+        if histograms is not None:
+            cube = cube.merge(histograms, on=CUBE_KEYS, how='left')
+        cube = cube.reindex(columns=CUBE_KEYS + METRIC_FIELDS + HISTOGRAM_COLUMNS).fillna(
+            {column: 0 for column in HISTOGRAM_COLUMNS}
+        )
+    else:
+        cube = pd.DataFrame(columns=CUBE_KEYS + METRIC_FIELDS + HISTOGRAM_COLUMNS)
+
+    cells = [
+        AnalyticsCubeCell(
+            week_start=row.week_start,
+            department=row.department,
+            position=row.position,
+            tag_id=None if row.tag_id == ALL_TAGS else int(row.tag_id),
+            exam_count=int(row.exam_count),
+            pass_count=int(row.pass_count),
+            score_rate_sum=float(row.score_rate_sum),
+            score_histogram=[int(getattr(row, column)) for column in HISTOGRAM_COLUMNS],
+            answer_count=int(row.answer_count),
+            correct_count=int(row.correct_count),
+            mastery_sum=float(row.mastery_sum),
+            mastery_count=int(row.mastery_count),
+            refreshed_at=now,
+        )
+        for row in cube.itertuples(index=False)
+    ]
+
+    with transaction.atomic():
+        AnalyticsCubeCell.objects.filter(week_start__in=weeks).delete()
+        AnalyticsCubeCell.objects.bulk_create(cells, batch_size=1000)
+        if full:
+            # 全量重算时清理已不存在试卷的历史周（掌握度快照保留）
+            AnalyticsCubeCell.objects.exclude(week_start__in=weeks).filter(mastery_count=0).delete()
+
+    return {'weeks': len(weeks), 'cells': len(cells)}
+
+
+def _aggregate_papers(papers):
+    """试卷指标：考试数、及格数、得分率之和及得分率分布（只记录在全部标签单元格）"""
+    pass_rate = settings.ASSESSMENT_SETTINGS.get('PASS_SCORE_RATE', 60)
+    total = papers['total_score'].astype(float).replace(0, np.nan)
+    papers = papers.assign(
+        tag_id=ALL_TAGS,
+        score_rate=(papers['score_obtained'].astype(float).fillna(0) / total * 100).fillna(0).clip(0, 100),
+    )
+    papers['passed'] = papers['score_rate'] >= pass_rate
+    papers['score_bin'] = np.minimum(papers['score_rate'] // (100 / HISTOGRAM_BINS), HISTOGRAM_BINS - 1).astype(int)
+
+    grouped = papers.groupby(CUBE_KEYS)
+    paper_frame = grouped.agg(
+        exam_count=('paper_id', 'size'),
+        pass_count=('passed', 'sum'),
+        score_rate_sum=('score_rate', 'sum'),
+    ).reset_index()
+    histograms = grouped['score_bin'].value_counts().unstack(fill_value=0).reindex(
+        columns=range(HISTOGRAM_BINS), fill_value=0
+    )
+    histograms.columns = HISTOGRAM_COLUMNS
+    return paper_frame, histograms.reset_index()
+
+
+def _aggregate_answers(papers, weeks):
+    """答题指标：按标签及全部标签统计答题数和答对数"""
+    records = pd.DataFrame.from_records(
+        ExamRecord.objects.filter(
+            _week_ranges(weeks, 'paper__completed_at'),
+            paper__status=ExamPaper.Status.COMPLETED,
+        ).values_list('paper_id', 'question_id', 'is_correct'),
+        columns=['paper_id', 'question_id', 'is_correct']
+    )
+    if records.empty:
+        return []
+    records = records.merge(papers[['paper_id', 'week_start', 'department', 'position']], on='paper_id')
+    records['correct'] = records['is_correct'].fillna(False).astype(bool)
+
+    overall = records.assign(tag_id=ALL_TAGS).groupby(CUBE_KEYS).agg(
+        answer_count=('paper_id', 'size'),
+        correct_count=('correct', 'sum'),
+    ).reset_index()
+
+    question_tags = pd.DataFrame.from_records(
+        Question.tags.through.objects.exclude(tag__category='role').values_list('question_id', 'tag_id'),
+        columns=['question_id', 'tag_id']
+    )
+    by_tag = records.merge(question_tags, on='question_id').groupby(CUBE_KEYS).agg(
+        answer_count=('paper_id', 'size'),
+        correct_count=('correct', 'sum'),
+    ).reset_index()
+    return [overall, by_tag]
+
+
+def _aggregate_mastery(week):
+    """当前能力画像快照：按标签及全部标签统计掌握度之和与人数"""
+    profiles = pd.DataFrame.from_records(
+        CapabilityProfile.objects.filter(user__is_staff=False).exclude(tag__category='role').values_list(
+            'user__department', 'user__position', 'tag_id', 'mastery_level'
+        ),
+        columns=['department', 'position', 'tag_id', 'mastery_level']
+    )
+    if profiles.empty:
+        return []
+    profiles['week_start'] = week
+    by_tag = profiles.groupby(CUBE_KEYS).agg(
+        mastery_sum=('mastery_level', 'sum'),
+        mastery_count=('mastery_level', 'size'),
+    ).reset_index()
+    overall = profiles.assign(tag_id=ALL_TAGS).groupby(CUBE_KEYS).agg(
+        mastery_sum=('mastery_level', 'sum'),
+        mastery_count=('mastery_level', 'size'),
+    ).reset_index()
+    return [by_tag, overall]
+
+
+def _preserved_mastery(weeks):
+    """历史周的掌握度快照无法从原始数据重算，重算这些周时沿用已有值"""
+    if not weeks:
+        return pd.DataFrame()
+    preserved = pd.DataFrame.from_records(
+        AnalyticsCubeCell.objects.filter(week_start__in=weeks, mastery_count__gt=0).values_list(
+            'week_start', 'department', 'position', 'tag_id', 'mastery_sum', 'mastery_count'
+        ),
+        columns=CUBE_KEYS + ['mastery_sum', 'mastery_count']
+    )
+    preserved['tag_id'] = preserved['tag_id'].fillna(ALL_TAGS).astype(int)
+    return preserved
+
+
+def parse_cube_query(params):
+    """
+    解析切片查询参数
+
+    支持 department、position、tag（标签ID）、week_from、week_to（YYYY-MM-DD）筛选，
+    group_by 为逗号分隔的 week/department/position/tag 组合。
+
+    Raises:
+        ValueError: 参数错误
+    """
+    group_by = [field.strip() for field in (params.get('group_by') or '').split(',') if field.strip()]
+    invalid = [field for field in group_by if field not in GROUP_BY_FIELDS]
+    if invalid:
+        raise ValueError(f'不支持的分组维度: {", ".join(invalid)}')
+
+    query = {
+        'group_by': group_by,
+        'department': (params.get('department') or '').strip(),
+        'position': (params.get('position') or '').strip(),
+        'tag': None,
+        'week_from': None,
+        'week_to': None,
+    }
+    tag = (params.get('tag') or '').strip()
+    if tag:
+        if not tag.isdigit():
+            raise ValueError('tag 参数应为标签ID')
+        query['tag'] = int(tag)
+    for key in ('week_from', 'week_to'):
+        value = (params.get(key) or '').strip()
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'日期格式错误: {value}，应为YYYY-MM-DD')
+            query[key] = parsed
+    return query
+
+
+def query_cube(query):
+    """
+    按切片条件汇总立方体单元格
+
+    按 tag 分组时返回各标签单元格；指定 tag 时只汇总该标签；否则汇总全部标签单元格。
+    未按周分组时，掌握度为所选周快照的平均值。
+
+    Returns:
+        list: 汇总结果，每个分组一行
+    """
+    cells = AnalyticsCubeCell.objects.all()
+    if query['department']:
+        cells = cells.filter(department=query['department'])
+    if query['position']:
+        cells = cells.filter(position=query['position'])
+    if query['week_from']:
+        cells = cells.filter(week_start__gte=week_start_of_date(query['week_from']))
+    if query['week_to']:
+        cells = cells.filter(week_start__lte=query['week_to'])
+    if 'tag' in query['group_by']:
+        cells = cells.filter(tag__isnull=False)
+        if query['tag']:
+            cells = cells.filter(tag_id=query['tag'])
+    elif query['tag']:
+        cells = cells.filter(tag_id=query['tag'])
+    else:
+        cells = cells.filter(tag__isnull=True)
+
+    group_columns = [column for field in query['group_by'] for column in GROUP_BY_FIELDS[field]]
+    frame = pd.DataFrame.from_records(
+        cells.values_list(*(group_columns + METRIC_FIELDS + ['score_histogram'])),
+        columns=group_columns + METRIC_FIELDS + ['score_histogram']
+    )
+    if frame.empty:
+        return []
+
+    histogram = np.array(
+        [values if len(values) == HISTOGRAM_BINS else [0] * HISTOGRAM_BINS for values in frame['score_histogram']],
+        dtype=np.int64
+    )
+    frame[HISTOGRAM_COLUMNS] = histogram
+    value_columns = METRIC_FIELDS + HISTOGRAM_COLUMNS
+    if group_columns:
+        summary = frame.groupby(group_columns, as_index=False)[value_columns].sum().sort_values(group_columns)
+    else:
+        summary = frame[value_columns].sum().to_frame().T
+
+    results = []
+    for row in summary.to_dict('records'):
+        item = {column: row[column] for column in group_columns}
+        if 'week_start' in item:
+            item['week_start'] = item['week_start'].isoformat()
+        if 'tag__name' in item:
+            item['tag_name'] = item.pop('tag__name')
+        exam_count = int(row['exam_count'])
+        answer_count = int(row['answer_count'])
+        mastery_count = int(row['mastery_count'])
+        item.update({
+            'exam_count': exam_count,
+            'pass_count': int(row['pass_count']),
+            'pass_rate': round(row['pass_count'] / exam_count * 100, 2) if exam_count else None,
+            'avg_score_rate': round(row['score_rate_sum'] / exam_count, 2) if exam_count else None,
+            'score_histogram': [int(row[column]) for column in HISTOGRAM_COLUMNS],
+            'answer_count': answer_count,
+            'correct_count': int(row['correct_count']),
+            'accuracy': round(row['correct_count'] / answer_count * 100, 2) if answer_count else None,
+            'mastery_mean': round(row['mastery_sum'] / mastery_count, 2) if mastery_count else None,
+            'mastery_count': mastery_count,
+        })
+        results.append(item)
+    return results
@@ -0,0 +1,281 @@
+"""
+后台导出任务
+
+导出请求只创建 ExportJob 记录，由 run_export_jobs 命令在后台线程池中执行，
+不依赖外部消息队列。导出类型、格式、筛选条件相同且相关数据未变化（数据水位一致）时，
+直接复用已生成的文件。导出文件保存在 EXPORT_SETTINGS['EXPORT_ROOT']，过期后自动清理。
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.cache import QUESTION, USER, get_generations
+from core.models import ExamPaper, ExamRecord, Tag
+from .exports import (
+    EXPORT_KINDS, EXPORT_FORMATS, parse_export_filters, serialize_export_filters,
+    count_export_rows, export_rows, write_csv, write_xlsx
+)
+from .models import CapabilityProfile, ExportJob
+from .replica import replica_reads
+
+User = get_user_model()
+
+# 各导出类型依赖的数据表，任一表的行数或最后更新时间变化都会使已有导出失效
+WATERMARK_SOURCES = {
+    'papers': lambda: [ExamPaper.objects.filter(status=ExamPaper.Status.COMPLETED)],
+    'records': lambda: [
+        ExamPaper.objects.filter(status=ExamPaper.Status.COMPLETED),
+        ExamRecord.objects.all(),
+    ],
+    'capability': lambda: [CapabilityProfile.objects.all(), Tag.objects.all()],
+}
+
+# 没有更新时间字段的数据表用缓存版本号（core/cache.py）判断是否变化：
+# 导出内容和部门、岗位筛选都依赖员工信息，答题明细还包含题目内容
+WATERMARK_GENERATIONS = {
+    'papers': [USER],
+    'records': [USER, QUESTION],
+    'capability': [USER],
+}
+
+
+def get_export_settings():
+    export_settings = getattr(settings, 'EXPORT_SETTINGS', {})
+    return {
+        'EXPORT_ROOT': Path(export_settings.get('EXPORT_ROOT', Path(settings.BASE_DIR) / 'exports')),
+        'FILE_TTL_HOURS': export_settings.get('FILE_TTL_HOURS', 24),
+        'MAX_WORKERS': export_settings.get('MAX_WORKERS', 2),
+        'POLL_INTERVAL': export_settings.get('POLL_INTERVAL', 5),
+        'PROGRESS_INTERVAL': export_settings.get('PROGRESS_INTERVAL', 5000),
+        'STALE_JOB_MINUTES': export_settings.get('STALE_JOB_MINUTES', 60),
+    }
+
+
+def compute_params_hash(kind, file_format, params):
+    """导出类型、格式与筛选条件的摘要"""
+    payload = json.dumps([kind, file_format, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compute_watermark(kind):
+    """
+    计算导出相关数据的水位（各数据表的行数与最后更新时间，以及相关的缓存版本号）
+
+    Returns:
+        str: 水位摘要，数据未变化时保持不变
+    """
+    parts = []
+    for queryset in WATERMARK_SOURCES[kind]():
+        stats = queryset.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+        last_updated = stats['last_updated'].isoformat() if stats['last_updated'] else ''
+        parts.append(f"{queryset.model._meta.db_table}:{stats['count']}:{last_updated}")
+    names = WATERMARK_GENERATIONS[kind]
+    parts.extend(f'{name}:{value}' for name, value in zip(names, get_generations(names)))
+    return hashlib.sha1(';'.join(parts).encode('utf-8')).hexdigest()
+
+
+def request_export(kind, file_format, filters, user=None):
+    """
+    提交导出请求
+
+    优先复用相同参数的任务：排队中的任务执行时会读取最新数据，可直接复用；
+    导出中或已完成的任务要求数据水位一致，已完成的任务还要求文件未过期且仍然存在。
+
+    Returns:
+        tuple: (ExportJob, 是否复用已有任务)
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f'不支持的导出类型: {kind}')
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError('仅支持 csv 和 xlsx 格式')
+
+    params = serialize_export_filters(filters)
+    params_hash = compute_params_hash(kind, file_format, params)
+    watermark = compute_watermark(kind)
+    now = timezone.now()
+
+    candidates = ExportJob.objects.filter(params_hash=params_hash).exclude(
+        status=ExportJob.Status.FAILED
+    ).order_by('-created_at')[:5]
+    for job in candidates:
+        if job.status == ExportJob.Status.QUEUED:
+            return job, True
+        if job.watermark != watermark:
+            continue
+        if job.status == ExportJob.Status.RUNNING:
+            return job, True
+        if job.expires_at and job.expires_at > now and os.path.exists(job.file_path):
+            return job, True
+
+    job = ExportJob.objects.create(
+        kind=kind,
+        file_format=file_format,
+        params=params,
+        params_hash=params_hash,
+        requested_by=user,
+    )
+    return job, False
+
+
+def claim_next_job():
+    """
+    领取最早排队的任务
+
+    通过带状态条件的 UPDATE 领取，多个后台进程同时运行时同一任务只会被领取一次。
+
+    Returns:
+        int|None: 领取到的任务ID
+    """
+    while True:
+        job_id = ExportJob.objects.filter(
+            status=ExportJob.Status.QUEUED
+        ).order_by('created_at', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.Status.QUEUED).update(
+            status=ExportJob.Status.RUNNING,
+            started_at=timezone.now(),
+            progress=0,
+            error='',
+        )
+        if claimed:
+            return job_id
+
+
+def run_export_job(job_id):
+    """
+    执行单个已领取的导出任务：先写入临时文件，完成后再改名为正式文件
+
+    Returns:
+        bool: 是否导出成功
+    """
+    export_settings = get_export_settings()
+    job = ExportJob.objects.get(id=job_id)
+    export_root = export_settings['EXPORT_ROOT']
+    final_path = export_root / f'{job.id}_{job.params_hash[:12]}.{job.file_format}'
+    temp_path = final_path.with_name(final_path.name + '.part')
+
+    try:
+        filters = parse_export_filters(job.params)
+        # 数据从分析副本读取（副本过旧时读主库）；水位也在副本上计算，
+        # 副本落后于主库时水位不同，下次请求不会复用本次结果
+        with replica_reads():
+            # 先记录水位再读取数据，导出期间数据若有变化，下次请求不会复用本次结果
+            watermark = compute_watermark(job.kind)
+            total_rows = count_export_rows(job.kind, filters)
+            ExportJob.objects.filter(id=job.id).update(watermark=watermark, total_rows=total_rows)
+
+            export_root.mkdir(parents=True, exist_ok=True)
+            rows = _track_progress(export_rows(job.kind, filters), job.id, export_settings['PROGRESS_INTERVAL'])
+            if job.file_format == 'csv':
+                with open(temp_path, 'w', encoding='utf-8', newline='') as file:
+                    count = write_csv(rows, file)
+            else:
+                count = write_xlsx(rows, temp_path)
+        os.replace(temp_path, final_path)
+    except Exception as e:
+        if temp_path.exists():
+            temp_path.unlink()
+        ExportJob.objects.filter(id=job.id).update(
+            status=ExportJob.Status.FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+        print(f"[导出任务] 任务 {job.id} 导出失败: {str(e)}")
+        return False
+
+    now = timezone.now()
+    ExportJob.objects.filter(id=job.id).update(
+        status=ExportJob.Status.DONE,
+        progress=count,
+        total_rows=count,
+        file_path=str(final_path),
+        finished_at=now,
+        expires_at=now + timedelta(hours=export_settings['FILE_TTL_HOURS']),
+    )
+    return True
+
+
+def _track_progress(rows, job_id, interval):
+    """逐行透传，每隔 interval 行更新一次任务进度（表头不计入）"""
+    count = -1
+    for row in rows:
+        yield row
+        count += 1
+        if count and count % interval == 0:
+            ExportJob.objects.filter(id=job_id).update(progress=count)
+
+
+def _run_in_thread(job_id):
+    try:
+        return run_export_job(job_id)
+    finally:
+        # 每个线程使用独立的数据库连接（包括分析副本），任务结束后关闭
+        connections.close_all()
+
+
+def process_queued_jobs(max_workers=None):
+    """
+    以有限并发执行当前排队中的全部任务，执行过程中新提交的任务也会被领取
+
+    Returns:
+        tuple: (成功数, 失败数)
+    """
+    max_workers = max(1, max_workers or get_export_settings()['MAX_WORKERS'])
+    succeeded = failed = 0
+    futures = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            while len(futures) < max_workers:
+                job_id = claim_next_job()
+                if job_id is None:
+                    break
+                futures.add(executor.submit(_run_in_thread, job_id))
+            if not futures:
+                break
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    succeeded += 1
+                else:
+                    failed += 1
+    return succeeded, failed
+
+
+def requeue_stale_jobs():
+    """将长时间处于导出中的任务重新排队（后台进程被中断时遗留）"""
+    threshold = timezone.now() - timedelta(minutes=get_export_settings()['STALE_JOB_MINUTES'])
+    return ExportJob.objects.filter(
+        status=ExportJob.Status.RUNNING,
+        started_at__lt=threshold
+    ).update(status=ExportJob.Status.QUEUED, progress=0)
+
+
+def cleanup_expired_exports():
+    """
+    删除过期的导出文件和任务记录（失败任务保留同样的时长以便排查）
+
+    Returns:
+        int: 删除的任务数量
+    """
+    now = timezone.now()
+    ttl = timedelta(hours=get_export_settings()['FILE_TTL_HOURS'])
+    expired = ExportJob.objects.filter(status=ExportJob.Status.DONE, expires_at__lte=now)
+    for file_path in expired.values_list('file_path', flat=True):
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+    deleted, _ = expired.delete()
+    failed_deleted, _ = ExportJob.objects.filter(
+        status=ExportJob.Status.FAILED,
+        finished_at__lte=now - ttl
+    ).delete()
+    return deleted + failed_deleted
@@ -0,0 +1,272 @@
+"""
+考试结果与能力画像导出
+
+数据逐行生成：查询使用 values_list().iterator(chunk_size=...) 分批读取，
+CSV 直接以流的形式写出，XLSX 使用 openpyxl 的 write_only 工作簿，
+导出内存占用与数据行数无关。
+"""
+import csv
+from datetime import datetime, time
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.models import ExamPaper, ExamRecord, Question, Tag
+from .models import CapabilityProfile
+
+User = get_user_model()
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_KINDS = ('papers', 'records', 'capability')
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+PAPER_STATUS_LABELS = dict(ExamPaper.Status.choices)
+REASON_LABELS = dict(ExamPaper.GenerationReason.choices)
+QUESTION_TYPE_LABELS = dict(Question.QuestionType.choices)
+
+
+def serialize_export_filters(filters):
+    """将筛选条件转换为可JSON序列化、键顺序固定的字典"""
+    return {
+        'department': filters.get('department') or '',
+        'position': filters.get('position') or '',
+        'date_from': filters['date_from'].isoformat() if filters.get('date_from') else '',
+        'date_to': filters['date_to'].isoformat() if filters.get('date_to') else '',
+    }
+
+
+def parse_export_filters(params):
+    """
+    解析导出筛选条件
+
+    Args:
+        params: 类字典对象，支持 department、position、date_from、date_to（YYYY-MM-DD）
+
+    Returns:
+        dict: 筛选条件
+
+    Raises:
+        ValueError: 日期格式错误
+    """
+    filters = {
+        'department': (params.get('department') or '').strip(),
+        'position': (params.get('position') or '').strip(),
+        'date_from': None,
+        'date_to': None,
+    }
+    for key in ('date_from', 'date_to'):
+        value = (params.get(key) or '').strip()
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'日期格式错误: {value}，应为YYYY-MM-DD')
+            filters[key] = parsed
+    return filters
+
+
+def _apply_user_filters(queryset, filters, prefix):
+    """按部门和岗位筛选（prefix 为到用户模型的查询路径）"""
+    if filters.get('department'):
+        queryset = queryset.filter(**{f'{prefix}department': filters['department']})
+    if filters.get('position'):
+        queryset = queryset.filter(**{f'{prefix}position': filters['position']})
+    return queryset
+
+
+def _apply_date_filters(queryset, filters, field):
+    """按日期范围筛选（包含起止日期当天）"""
+    tz = timezone.get_current_timezone()
+    if filters.get('date_from'):
+        start = timezone.make_aware(datetime.combine(filters['date_from'], time.min), tz)
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if filters.get('date_to'):
+        end = timezone.make_aware(datetime.combine(filters['date_to'], time.max), tz)
+        queryset = queryset.filter(**{f'{field}__lte': end})
+    return queryset
+
+
+def _format_datetime(value):
+    if value is None:
+        return ''
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _full_name(first_name, last_name, username):
+    return f'{first_name}{last_name}' or username
+
+
+def paper_queryset(filters):
+    """已完成试卷（按筛选条件过滤）"""
+    papers = ExamPaper.objects.filter(status=ExamPaper.Status.COMPLETED)
+    papers = _apply_user_filters(papers, filters, 'user__')
+    return _apply_date_filters(papers, filters, 'completed_at')
+
+
+def record_queryset(filters):
+    """已完成试卷的答题记录（按筛选条件过滤）"""
+    records = ExamRecord.objects.filter(paper__status=ExamPaper.Status.COMPLETED)
+    records = _apply_user_filters(records, filters, 'paper__user__')
+    return _apply_date_filters(records, filters, 'paper__completed_at')
+
+
+def capability_user_queryset(filters):
+    """能力画像矩阵包含的员工（按部门、岗位过滤）"""
+    return _apply_user_filters(User.objects.filter(is_staff=False), filters, '')
+
+
+def paper_rows(filters):
+    """已完成试卷的成绩明细（第一行为表头）"""
+    yield ['试卷ID', '工号', '姓名', '部门', '岗位', '试卷标题', '生成原因',
+           '题目数', '总分', '得分', '得分率(%)', '开始时间', '完成时间']
+
+    papers = paper_queryset(filters).annotate(
+        question_count=Count('exam_records')
+    ).order_by('completed_at', 'id')
+
+    for (paper_id, job_number, first_name, last_name, username, department, position, title,
+         reason, question_count, total_score, score_obtained, started_at, completed_at) in papers.values_list(
+        'id', 'user__job_number', 'user__first_name', 'user__last_name', 'user__username',
+        'user__department', 'user__position', 'title', 'generation_reason', 'question_count',
+        'total_score', 'score_obtained', 'started_at', 'completed_at'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        score = score_obtained or 0
+        yield [
+            paper_id, job_number, _full_name(first_name, last_name, username), department, position,
+            title, REASON_LABELS.get(reason, reason), question_count, total_score, round(score, 2),
+            round(score / total_score * 100, 2) if total_score else 0,
+            _format_datetime(started_at), _format_datetime(completed_at),
+        ]
+
+
+def record_rows(filters):
+    """已完成试卷的逐题答题明细（第一行为表头）"""
+    yield ['试卷ID', '工号', '姓名', '部门', '岗位', '题目ID', '题型', '题干',
+           '用户答案', '是否正确', '得分', 'AI评分', '完成时间']
+
+    records = record_queryset(filters).order_by('paper_id', 'id')
+
+    for (paper_id, job_number, first_name, last_name, username, department, position, question_id,
+         question_type, content, user_answer, is_correct, score_gained, ai_score, completed_at) in records.values_list(
+        'paper_id', 'paper__user__job_number', 'paper__user__first_name', 'paper__user__last_name',
+        'paper__user__username', 'paper__user__department', 'paper__user__position', 'question_id',
+        'question__question_type', 'question__content', 'user_answer', 'is_correct', 'score_gained',
+        'ai_score', 'paper__completed_at'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            paper_id, job_number, _full_name(first_name, last_name, username), department, position,
+            question_id, QUESTION_TYPE_LABELS.get(question_type, question_type), content, user_answer,
+            '' if is_correct is None else ('是' if is_correct else '否'), round(score_gained, 2),
+            '' if ai_score is None else ai_score, _format_datetime(completed_at),
+        ]
+
+
+def capability_rows(filters):
+    """
+    能力画像矩阵（员工 × 能力标签，第一行为表头）
+
+    员工与能力画像均按用户ID顺序流式读取，再按用户ID归并为一行；
+    日期筛选条件按能力画像的最后更新时间过滤。
+    """
+    tags = list(Tag.objects.exclude(category='role').order_by('category', 'name').values_list('id', 'name'))
+    tag_index = {tag_id: index for index, (tag_id, _) in enumerate(tags)}
+    yield ['工号', '姓名', '部门', '岗位'] + [name for _, name in tags]
+
+    users = capability_user_queryset(filters).order_by('id')
+    profiles = CapabilityProfile.objects.filter(tag_id__in=tag_index.keys(), user__is_staff=False)
+    profiles = _apply_user_filters(profiles, filters, 'user__')
+    profiles = _apply_date_filters(profiles, filters, 'updated_at')
+
+    profile_iter = iter(profiles.order_by('user_id').values_list(
+        'user_id', 'tag_id', 'mastery_level'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    pending = next(profile_iter, None)
+
+    for user_id, job_number, first_name, last_name, username, department, position in users.values_list(
+        'id', 'job_number', 'first_name', 'last_name', 'username', 'department', 'position'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        levels = [''] * len(tags)
+        while pending is not None and pending[0] <= user_id:
+            if pending[0] == user_id:
+                levels[tag_index[pending[1]]] = round(pending[2], 2)
+            pending = next(profile_iter, None)
+        yield [job_number, _full_name(first_name, last_name, username), department, position] + levels
+
+
+ROW_GENERATORS = {
+    'papers': paper_rows,
+    'records': record_rows,
+    'capability': capability_rows,
+}
+
+
+def count_export_rows(kind, filters):
+    """统计导出的数据行数（不含表头），用于显示导出进度"""
+    querysets = {
+        'papers': paper_queryset,
+        'records': record_queryset,
+        'capability': capability_user_queryset,
+    }
+    if kind not in querysets:
+        raise ValueError(f'不支持的导出类型: {kind}')
+    return querysets[kind](filters).count()
+
+
+def export_rows(kind, filters):
+    """按导出类型返回行生成器"""
+    if kind not in ROW_GENERATORS:
+        raise ValueError(f'不支持的导出类型: {kind}')
+    return ROW_GENERATORS[kind](filters)
+
+
+class _Echo:
+    """只返回写入内容的伪文件对象，配合 csv.writer 逐行生成 CSV"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """将行序列转换为 CSV 文本块（带 BOM，便于 Excel 识别 UTF-8）"""
+    writer = csv.writer(_Echo())
+    yield '﻿'
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(rows, file):
+    """将行序列写入已打开的文本文件"""
+    writer = csv.writer(file)
+    file.write('﻿')
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return max(0, count - 1)
+
+
+def write_xlsx(rows, file, sheet_title='导出数据'):
+    """
+    使用 write_only 工作簿写入 XLSX，行数据直接写入临时文件而不驻留内存
+
+    Returns:
+        int: 写入的数据行数（不含表头）
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(file)
+    return max(0, count - 1)
+
+
+def export_filename(kind, file_format):
+    """生成导出文件名"""
+    labels = {'papers': '考试成绩', 'records': '答题明细', 'capability': '能力画像'}
+    return f"{labels.get(kind, kind)}_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.{file_format}"
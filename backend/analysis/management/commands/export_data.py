@@ -0,0 +1,54 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.exports import (
+    EXPORT_KINDS, EXPORT_FORMATS, parse_export_filters, export_rows,
+    export_filename, write_csv, write_xlsx
+)
+
+
+class Command(BaseCommand):
+    help = '导出考试成绩、答题明细或能力画像矩阵为 CSV/XLSX 文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORT_KINDS,
+                            help='导出类型：papers 考试成绩，records 答题明细，capability 能力画像')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, help='文件格式，默认根据输出文件扩展名判断，否则为csv')
+        parser.add_argument('--output', '-o', help='输出文件路径，默认在当前目录按类型和时间命名')
+        parser.add_argument('--department', help='按部门筛选')
+        parser.add_argument('--position', help='按岗位筛选')
+        parser.add_argument('--date-from', help='起始日期（YYYY-MM-DD）')
+        parser.add_argument('--date-to', help='截止日期（YYYY-MM-DD）')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        output = options['output']
+        file_format = options['format']
+        if not file_format:
+            extension = os.path.splitext(output)[1].lstrip('.').lower() if output else ''
+            file_format = extension if extension in EXPORT_FORMATS else 'csv'
+        if not output:
+            output = export_filename(kind, file_format)
+
+        try:
+            filters = parse_export_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        start = time.perf_counter()
+        rows = export_rows(kind, filters)
+        try:
+            if file_format == 'csv':
+                with open(output, 'w', encoding='utf-8', newline='') as file:
+                    count = write_csv(rows, file)
+            else:
+                count = write_xlsx(rows, output)
+        except OSError as e:
+            raise CommandError(f'导出失败: {str(e)}')
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导出完成：共 {count} 行，文件 {output}，耗时 {elapsed:.2f} 秒'
+        ))
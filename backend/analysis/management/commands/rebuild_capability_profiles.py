@@ -0,0 +1,68 @@
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.cohort import mark_cohort_stale
+from analysis.replay import rebuild_profiles
+from core.models import Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = '按完成时间重放全部已完成试卷，重建能力画像（修改能力更新权重后使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', metavar='JOB_NUMBER', help='只重建指定工号的用户')
+        parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认CPU核数，1表示不使用进程池）')
+        parser.add_argument('--chunk-size', type=int, default=500, help='每个进程任务处理的用户数')
+        parser.add_argument('--weight-old', type=float, default=None, help='覆盖 CAPABILITY_UPDATE_WEIGHT_OLD')
+        parser.add_argument('--weight-new', type=float, default=None, help='覆盖 CAPABILITY_UPDATE_WEIGHT_NEW')
+        parser.add_argument('--dry-run', action='store_true', help='只比较与现有能力画像的差异，不写入')
+        parser.add_argument('--top', type=int, default=10, help='列出变化最大的前N条')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            found = dict(User.objects.filter(job_number__in=options['users']).values_list('job_number', 'id'))
+            missing = sorted(set(options['users']) - set(found))
+            if missing:
+                raise CommandError(f"工号不存在: {', '.join(missing)}")
+            user_ids = list(found.values())
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers 必须大于0')
+
+        start = time.perf_counter()
+        result = rebuild_profiles(
+            user_ids=user_ids,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            weight_old=options['weight_old'],
+            weight_new=options['weight_new'],
+            dry_run=options['dry_run'],
+            top=options['top'],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"用户 {result.users} 人，(用户, 标签) {result.pairs} 对，其中变化 {result.changed} 对；"
+            f"平均变化 {result.mean_abs_diff:.4f}，最大变化 {result.max_diff:.4f}"
+        )
+        if result.largest:
+            job_numbers = dict(User.objects.filter(
+                id__in=[item[1] for item in result.largest]
+            ).values_list('id', 'job_number'))
+            tag_names = dict(Tag.objects.filter(id__in=[item[2] for item in result.largest]).values_list('id', 'name'))
+            self.stdout.write('变化最大的能力画像：')
+            for diff, user_id, tag_id, old_level, new_level in sorted(result.largest, reverse=True):
+                old_text = '无' if pd.isna(old_level) else f'{old_level:.2f}'
+                self.stdout.write(
+                    f"  {job_numbers.get(user_id, user_id)} / {tag_names.get(tag_id, tag_id)}: "
+                    f"{old_text} -> {new_level:.2f}"
+                )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'试运行，未写入（耗时 {elapsed:.2f} 秒）'))
+            return
+        mark_cohort_stale()
+        self.stdout.write(self.style.SUCCESS(f'重建完成：写入 {result.written} 条能力画像，耗时 {elapsed:.2f} 秒'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analysis.cube import refresh_cube
+
+
+class Command(BaseCommand):
+    help = '刷新部门/岗位统计立方体（默认增量刷新）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='重算全部周，而不只是有变动的周')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        result = refresh_cube(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"刷新完成：重算 {result['weeks']} 周，写入 {result['cells']} 个单元格，"
+            f"耗时 {time.perf_counter() - start:.2f} 秒"
+        ))
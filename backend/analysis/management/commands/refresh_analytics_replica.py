@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis.replica import get_replica_alias, get_replica_settings, refresh_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = '用在线备份把主库复制为分析查询使用的只读副本（SQLite）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='持续运行，按间隔重复复制')
+        parser.add_argument('--interval', type=float, help='复制间隔（秒），默认 REFRESH_INTERVAL')
+
+    def handle(self, *args, **options):
+        if get_replica_alias() is None:
+            raise CommandError('DATABASES 中没有配置分析副本')
+        replica_settings = get_replica_settings()
+        interval = options['interval'] or replica_settings.get('REFRESH_INTERVAL', 60)
+        if interval >= replica_settings.get('MAX_LAG_SECONDS', 300):
+            self.stdout.write(self.style.WARNING('复制间隔不小于 MAX_LAG_SECONDS，副本在两次复制之间会过期'))
+
+        while True:
+            try:
+                elapsed = refresh_sqlite_replica()
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"副本已更新：{replica_settings['SQLITE_PATH']}，耗时 {elapsed:.2f} 秒")
+            if not options['loop']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analysis.export_jobs import (
+    get_export_settings, process_queued_jobs, requeue_stale_jobs, cleanup_expired_exports
+)
+
+
+class Command(BaseCommand):
+    help = '执行排队中的后台导出任务，并清理过期的导出文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='同时执行的任务数，默认取 EXPORT_SETTINGS["MAX_WORKERS"]')
+        parser.add_argument('--once', action='store_true', help='执行完当前排队的任务后退出，不持续轮询')
+        parser.add_argument('--poll-interval', type=float, help='轮询新任务的间隔（秒）')
+        parser.add_argument('--cleanup-only', action='store_true', help='只清理过期文件，不执行任务')
+
+    def handle(self, *args, **options):
+        export_settings = get_export_settings()
+        workers = options['workers'] or export_settings['MAX_WORKERS']
+        poll_interval = options['poll_interval'] or export_settings['POLL_INTERVAL']
+
+        if options['cleanup_only']:
+            removed = cleanup_expired_exports()
+            self.stdout.write(self.style.SUCCESS(f'已清理 {removed} 个过期导出任务'))
+            return
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} 个中断的任务已重新排队'))
+
+        if not options['once']:
+            self.stdout.write(f'导出任务进程已启动（并发 {workers}，轮询间隔 {poll_interval} 秒），按 Ctrl+C 退出')
+
+        try:
+            while True:
+                removed = cleanup_expired_exports()
+                if removed:
+                    self.stdout.write(f'已清理 {removed} 个过期导出任务')
+
+                start = time.perf_counter()
+                succeeded, failed = process_queued_jobs(workers)
+                if succeeded or failed:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'完成 {succeeded} 个导出任务，失败 {failed} 个，耗时 {time.perf_counter() - start:.2f} 秒'
+                    ))
+
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write('导出任务进程已退出')
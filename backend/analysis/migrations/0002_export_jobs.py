@@ -0,0 +1,44 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analysis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('kind', models.CharField(max_length=20, verbose_name='导出类型')),
+                ('file_format', models.CharField(default='csv', max_length=10, verbose_name='文件格式')),
+                ('params', models.JSONField(default=dict, verbose_name='筛选条件')),
+                ('params_hash', models.CharField(db_index=True, help_text='导出类型、格式和筛选条件的摘要，用于复用相同的导出结果', max_length=64, verbose_name='参数摘要')),
+                ('watermark', models.CharField(blank=True, help_text='导出时相关数据的行数和最后更新时间，数据变化后不再复用', max_length=100, verbose_name='数据水位')),
+                ('status', models.CharField(choices=[('queued', '排队中'), ('running', '导出中'), ('done', '已完成'), ('failed', '失败')], db_index=True, default='queued', max_length=20, verbose_name='任务状态')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='已导出行数')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='总行数')),
+                ('file_path', models.CharField(blank=True, max_length=500, verbose_name='文件路径')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='发起人')),
+            ],
+            options={
+                'verbose_name': '导出任务',
+                'verbose_name_plural': '导出任务',
+                'db_table': 'export_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
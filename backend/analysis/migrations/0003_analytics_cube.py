@@ -0,0 +1,41 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_question_signatures'),
+        ('analysis', '0002_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCubeCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(verbose_name='周起始日期（周一）')),
+                ('department', models.CharField(max_length=100, verbose_name='部门')),
+                ('position', models.CharField(max_length=50, verbose_name='岗位')),
+                ('exam_count', models.PositiveIntegerField(default=0, verbose_name='完成考试数')),
+                ('pass_count', models.PositiveIntegerField(default=0, verbose_name='及格考试数')),
+                ('score_rate_sum', models.FloatField(default=0.0, verbose_name='得分率之和(%)')),
+                ('score_histogram', models.JSONField(default=list, help_text='按得分率0-10%、10-20%…90-100%分为10段的考试数', verbose_name='得分率分布')),
+                ('answer_count', models.PositiveIntegerField(default=0, verbose_name='答题数')),
+                ('correct_count', models.PositiveIntegerField(default=0, verbose_name='答对数')),
+                ('mastery_sum', models.FloatField(default=0.0, verbose_name='掌握度之和')),
+                ('mastery_count', models.PositiveIntegerField(default=0, verbose_name='能力画像数')),
+                ('refreshed_at', models.DateTimeField(verbose_name='刷新时间')),
+                ('tag', models.ForeignKey(blank=True, help_text='为空表示全部标签汇总', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cube_cells', to='core.tag', verbose_name='能力标签')),
+            ],
+            options={
+                'verbose_name': '统计立方体',
+                'verbose_name_plural': '统计立方体',
+                'db_table': 'analytics_cube',
+                'indexes': [models.Index(fields=['department', 'position', 'week_start'], name='cube_dept_pos_week_idx')],
+                'unique_together': {('week_start', 'department', 'position', 'tag')},
+            },
+        ),
+    ]
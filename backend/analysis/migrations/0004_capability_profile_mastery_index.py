@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0003_analytics_cube'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='capabilityprofile',
+            index=models.Index(fields=['user', 'mastery_level'], name='profile_user_mastery_idx'),
+        ),
+    ]
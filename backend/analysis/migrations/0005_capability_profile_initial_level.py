@@ -0,0 +1,40 @@
+# Generated by Django 4.2.27 on 2026-10-19 16:24
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Q, Subquery
+
+
+def backfill_initial_level(apps, schema_editor):
+    """
+    早于员工首次完成考试创建的能力画像视为预置画像：之后未被考核更新的，初始值即当前值；
+    已被考核更新的无法还原原值，按导入员工时的默认值 50 处理
+    """
+    CapabilityProfile = apps.get_model('analysis', 'CapabilityProfile')
+    ExamPaper = apps.get_model('core', 'ExamPaper')
+    first_completed = ExamPaper.objects.filter(
+        user_id=OuterRef('user_id'), status='completed', completed_at__isnull=False
+    ).order_by().values('user_id').annotate(first=Min('completed_at')).values('first')
+    profiles = CapabilityProfile.objects.annotate(first_completed=Subquery(first_completed))
+    predates = Q(first_completed__isnull=True) | Q(created_at__lt=models.F('first_completed'))
+    untouched = Q(first_completed__isnull=True) | Q(updated_at__lte=models.F('first_completed'))
+    ids = profiles.filter(predates & untouched).values_list('id', flat=True)
+    CapabilityProfile.objects.filter(id__in=list(ids)).update(initial_level=models.F('mastery_level'))
+    ids = profiles.filter(predates & ~untouched).values_list('id', flat=True)
+    CapabilityProfile.objects.filter(id__in=list(ids)).update(initial_level=50.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0004_capability_profile_mastery_index'),
+        ('core', '0013_question_type_active_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capabilityprofile',
+            name='initial_level',
+            field=models.FloatField(blank=True, help_text='考核前预置的初始值（批量导入员工、示例数据），为空表示由首次考核生成；重放历史时作为起点', null=True, verbose_name='初始掌握度'),
+        ),
+        migrations.RunPython(backfill_initial_level, migrations.RunPython.noop),
+    ]
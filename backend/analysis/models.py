@@ -24,6 +24,12 @@ class CapabilityProfile(BaseTimestampedModel):
         verbose_name='掌握度评分',
         help_text='0-100，数值越高表示掌握程度越好'
     )
+    initial_level = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='初始掌握度',
+        help_text='考核前预置的初始值（批量导入员工、示例数据），为空表示由首次考核生成；重放历史时作为起点'
+    )
 
     class Meta:
         verbose_name = '能力画像'
@@ -31,6 +37,10 @@ class CapabilityProfile(BaseTimestampedModel):
         db_table = 'capability_profiles'
         unique_together = ['user', 'tag']
         ordering = ['user', 'tag']
+        indexes = [
+            # 弱项标签：某员工掌握度低于阈值的标签
+            models.Index(fields=['user', 'mastery_level'], name='profile_user_mastery_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.job_number} - {self.tag.name}: {self.mastery_level:.1f}"
@@ -77,4 +87,115 @@ class TrainingMaterial(BaseTimestampedModel):
         ordering = ['-created_at']
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class ExportJob(BaseTimestampedModel):
+    """后台导出任务，由 run_export_jobs 命令在后台执行"""
+    class Status(models.TextChoices):
+        QUEUED = 'queued', '排队中'
+        RUNNING = 'running', '导出中'
+        DONE = 'done', '已完成'
+        FAILED = 'failed', '失败'
+
+    kind = models.CharField(max_length=20, verbose_name='导出类型')
+    file_format = models.CharField(max_length=10, default='csv', verbose_name='文件格式')
+    params = models.JSONField(default=dict, verbose_name='筛选条件')
+    params_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name='参数摘要',
+        help_text='导出类型、格式和筛选条件的摘要，用于复用相同的导出结果'
+    )
+    watermark = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='数据水位',
+        help_text='导出时相关数据的行数和最后更新时间，数据变化后不再复用'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        db_index=True,
+        verbose_name='任务状态'
+    )
+    progress = models.PositiveIntegerField(default=0, verbose_name='已导出行数')
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='总行数')
+    file_path = models.CharField(max_length=500, blank=True, verbose_name='文件路径')
+    error = models.TextField(blank=True, verbose_name='错误信息')
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='export_jobs',
+        verbose_name='发起人'
+    )
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name='过期时间')
+
+    class Meta:
+        verbose_name = '导出任务'
+        verbose_name_plural = '导出任务'
+        db_table = 'export_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind}.{self.file_format} ({self.get_status_display()})"
+
+    @property
+    def percent(self):
+        """导出进度百分比"""
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.progress * 100 / self.total_rows))
+
+
+class AnalyticsCubeCell(models.Model):
+    """
+    统计立方体单元格：部门 × 岗位 × 标签 × 周 的预聚合指标
+
+    tag 为空的单元格是该部门岗位当周所有标签的汇总；试卷相关指标只记录在汇总单元格上。
+    掌握度为每次刷新时的能力画像快照，记录在刷新当周。
+    """
+    week_start = models.DateField(verbose_name='周起始日期（周一）')
+    department = models.CharField(max_length=100, verbose_name='部门')
+    position = models.CharField(max_length=50, verbose_name='岗位')
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='cube_cells',
+        verbose_name='能力标签',
+        help_text='为空表示全部标签汇总'
+    )
+    exam_count = models.PositiveIntegerField(default=0, verbose_name='完成考试数')
+    pass_count = models.PositiveIntegerField(default=0, verbose_name='及格考试数')
+    score_rate_sum = models.FloatField(default=0.0, verbose_name='得分率之和(%)')
+    score_histogram = models.JSONField(
+        default=list,
+        verbose_name='得分率分布',
+        help_text='按得分率0-10%、10-20%…90-100%分为10段的考试数'
+    )
+    answer_count = models.PositiveIntegerField(default=0, verbose_name='答题数')
+    correct_count = models.PositiveIntegerField(default=0, verbose_name='答对数')
+    mastery_sum = models.FloatField(default=0.0, verbose_name='掌握度之和')
+    mastery_count = models.PositiveIntegerField(default=0, verbose_name='能力画像数')
+    refreshed_at = models.DateTimeField(verbose_name='刷新时间')
+
+    class Meta:
+        verbose_name = '统计立方体'
+        verbose_name_plural = '统计立方体'
+        db_table = 'analytics_cube'
+        unique_together = ['week_start', 'department', 'position', 'tag']
+        indexes = [
+            models.Index(fields=['department', 'position', 'week_start'], name='cube_dept_pos_week_idx'),
+        ]
+
+    def __str__(self):
+        tag_name = self.tag.name if self.tag_id else '全部标签'
+        return f"{self.week_start} {self.department}/{self.position} {tag_name}"
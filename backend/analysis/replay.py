@@ -0,0 +1,327 @@
+"""
+能力画像历史重放
+
+按完成时间顺序重放已完成试卷，计算每个 (用户, 标签) 的能力值。与交卷时的更新规则一致：
+交卷时该标签还没有能力画像的，首次考核直接取正确率×100；已有画像的（包括批量导入员工时
+预置的默认画像，见 users/importers.py），按 旧值×WEIGHT_OLD + 正确率×100×WEIGHT_NEW 加权。
+预置画像在 initial_level 中记录初始值，重放时以该值为起点，每次考核（包括第一次）都加权。
+
+加权递推的结果可以写成闭式：第k次（共n次）考核的权重为
+    k=1:  WEIGHT_OLD^(n-1)              （无初始值）
+    k=1:  WEIGHT_NEW × WEIGHT_OLD^(n-1)  （有初始值，另加 初始值 × WEIGHT_OLD^n）
+    k>1:  WEIGHT_NEW × WEIGHT_OLD^(n-k)
+因此只需按组计算序号后向量化求和，不需要逐条循环。
+（权重之和不超过1时每一步都不会越界，与逐步截断到0-100的结果相同。）
+"""
+import heapq
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.cache import CAPABILITY_PROFILE, bump_generations
+from core.models import ExamPaper, ExamRecord, Question
+from .models import CapabilityProfile
+
+PAIR_KEYS = ['user_id', 'tag_id']
+
+
+def _chunked(values, size=900):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_question_tags():
+    """题目与能力标签（排除role标签）的对应关系"""
+    return pd.DataFrame.from_records(
+        Question.tags.through.objects.exclude(tag__category='role').values_list('question_id', 'tag_id'),
+        columns=['question_id', 'tag_id']
+    )
+
+
+def load_observations(user_ids=None, question_tags=None):
+    """
+    读取已完成试卷中每卷每个标签的正确率
+
+    Args:
+        user_ids: 只读取这些用户的试卷，None 表示全部用户
+        question_tags: 预先加载的题目标签对应关系（多次调用时复用）
+
+    Returns:
+        pandas.DataFrame: user_id、tag_id、paper_id、completed_at、accuracy，按完成时间排序
+    """
+    columns = ['paper_id', 'user_id', 'completed_at', 'question_id', 'is_correct']
+    records = ExamRecord.objects.filter(
+        paper__status=ExamPaper.Status.COMPLETED,
+        paper__completed_at__isnull=False
+    )
+    fields = ('paper_id', 'paper__user_id', 'paper__completed_at', 'question_id', 'is_correct')
+    if user_ids is None:
+        rows = records.values_list(*fields).iterator(chunk_size=10000)
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+    else:
+        frame = pd.DataFrame.from_records(
+            [
+                row
+                for id_chunk in _chunked(user_ids)
+                for row in records.filter(paper__user_id__in=id_chunk).values_list(*fields)
+            ],
+            columns=columns
+        )
+    if frame.empty:
+        return pd.DataFrame(columns=PAIR_KEYS + ['paper_id', 'completed_at', 'accuracy'])
+
+    if question_tags is None:
+        question_tags = load_question_tags()
+    frame['correct'] = frame['is_correct'].fillna(False).astype(float)
+    frame = frame.merge(question_tags, on='question_id')
+    observations = frame.groupby(PAIR_KEYS + ['paper_id', 'completed_at'], as_index=False).agg(
+        accuracy=('correct', 'mean')
+    )
+    return observations.sort_values(['completed_at', 'paper_id'], kind='stable').reset_index(drop=True)
+
+
+def load_initial_levels(user_ids=None):
+    """
+    读取预置能力画像的初始值
+
+    Returns:
+        pandas.DataFrame: user_id、tag_id、initial_level
+    """
+    profiles = CapabilityProfile.objects.filter(initial_level__isnull=False)
+    fields = ('user_id', 'tag_id', 'initial_level')
+    if user_ids is None:
+        rows = list(profiles.values_list(*fields).iterator(chunk_size=10000))
+    else:
+        rows = [
+            row
+            for id_chunk in _chunked(user_ids)
+            for row in profiles.filter(user_id__in=id_chunk).values_list(*fields)
+        ]
+    return pd.DataFrame.from_records(rows, columns=PAIR_KEYS + ['initial_level'])
+
+
+def get_update_weights(weight_old=None, weight_new=None):
+    """获取加权移动平均的权重（未指定时使用配置值）"""
+    assessment_settings = settings.ASSESSMENT_SETTINGS
+    if weight_old is None:
+        weight_old = assessment_settings['CAPABILITY_UPDATE_WEIGHT_OLD']
+    if weight_new is None:
+        weight_new = assessment_settings['CAPABILITY_UPDATE_WEIGHT_NEW']
+    return float(weight_old), float(weight_new)
+
+
+def replay_capability(observations, weight_old=None, weight_new=None, initial_levels=None):
+    """
+    根据历史正确率计算每个 (用户, 标签) 的当前能力值
+
+    Args:
+        initial_levels: load_initial_levels() 的结果，有初始值的 (用户, 标签) 从初始值开始加权
+
+    Returns:
+        pandas.DataFrame: user_id、tag_id、mastery_level
+    """
+    weight_old, weight_new = get_update_weights(weight_old, weight_new)
+    if observations.empty:
+        return pd.DataFrame(columns=PAIR_KEYS + ['mastery_level'])
+
+    observations = observations.sort_values(['completed_at', 'paper_id'], kind='stable')
+    if initial_levels is not None and not initial_levels.empty:
+        observations = observations.merge(initial_levels, on=PAIR_KEYS, how='left', sort=False)
+    else:
+        observations = observations.assign(initial_level=np.nan)
+    initial = observations['initial_level'].to_numpy(dtype=float)
+    seeded = ~np.isnan(initial)
+
+    grouped = observations.groupby(PAIR_KEYS, sort=False)
+    remaining = grouped.cumcount(ascending=False).to_numpy()
+    is_first = grouped.cumcount().to_numpy() == 0
+    decay = np.power(float(weight_old), remaining)
+    weights = np.where(is_first & ~seeded, decay, weight_new * decay)
+
+    # 有初始值时，初始值在第一次考核前按 WEIGHT_OLD 衰减 n 次
+    baseline = np.where(is_first & seeded, np.nan_to_num(initial) * decay * weight_old, 0.0)
+    contributions = observations[PAIR_KEYS].assign(
+        mastery_level=weights * observations['accuracy'].to_numpy() * 100 + baseline
+    )
+    result = contributions.groupby(PAIR_KEYS, as_index=False)['mastery_level'].sum()
+    result['mastery_level'] = result['mastery_level'].clip(0, 100)
+    return result
+
+
+def write_profiles(levels, batch_size=1000):
+    """
+    以 (用户, 标签) 为唯一键批量写入能力值（已存在则更新）
+
+    Returns:
+        int: 写入的行数
+    """
+    if levels.empty:
+        return 0
+    now = timezone.now()
+    profiles = [
+        CapabilityProfile(
+            user_id=int(row.user_id),
+            tag_id=int(row.tag_id),
+            mastery_level=float(row.mastery_level),
+            created_at=now,
+            updated_at=now,
+        )
+        for row in levels.itertuples(index=False)
+    ]
+    CapabilityProfile.objects.bulk_create(
+        profiles,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'tag'],
+        update_fields=['mastery_level', 'updated_at'],
+    )
+    # bulk_create 不触发 post_save，需手动使这些用户的能力画像缓存失效
+    bump_generations(CAPABILITY_PROFILE, (profile.user_id for profile in profiles))
+    return len(profiles)
+
+
+def replay_pairs(pairs, user_chunk_size=200):
+    """
+    只重放受影响的 (用户, 标签)，按用户分批，每批一个短事务
+
+    Args:
+        pairs: [(user_id, tag_id), ...]
+
+    Returns:
+        int: 更新的能力画像数量
+    """
+    pairs = pd.DataFrame(list(set(pairs)), columns=PAIR_KEYS)
+    if pairs.empty:
+        return 0
+
+    question_tags = load_question_tags()
+    updated = 0
+    for user_chunk in _chunked(sorted(int(user_id) for user_id in pairs['user_id'].unique()), user_chunk_size):
+        observations = load_observations(user_chunk, question_tags=question_tags)
+        observations = observations.merge(pairs[pairs['user_id'].isin(user_chunk)], on=PAIR_KEYS)
+        levels = replay_capability(observations, initial_levels=load_initial_levels(user_chunk))
+        with transaction.atomic():
+            updated += write_profiles(levels)
+    return updated
+
+
+class RebuildResult:
+    """全量重建结果"""
+
+    def __init__(self, top=10):
+        self.users = 0
+        self.pairs = 0
+        self.changed = 0
+        self.written = 0
+        self.abs_diff_sum = 0.0
+        self.max_diff = 0.0
+        self.top = top
+        self.largest = []  # 小顶堆：[(变化幅度, user_id, tag_id, 旧值, 新值)]
+
+    @property
+    def mean_abs_diff(self):
+        return self.abs_diff_sum / self.changed if self.changed else 0.0
+
+    def add_changes(self, changes):
+        self.changed += len(changes)
+        if changes.empty:
+            return
+        diffs = changes['diff'].abs()
+        self.abs_diff_sum += float(diffs.sum())
+        self.max_diff = max(self.max_diff, float(diffs.max()))
+        for row in changes.assign(abs_diff=diffs).nlargest(self.top, 'abs_diff').itertuples(index=False):
+            item = (row.abs_diff, int(row.user_id), int(row.tag_id), row.old_level, row.mastery_level)
+            if len(self.largest) < self.top:
+                heapq.heappush(self.largest, item)
+            else:
+                heapq.heappushpop(self.largest, item)
+
+
+_worker_question_tags = None
+
+
+def _init_rebuild_worker():
+    import django
+    django.setup()
+
+
+def replay_user_chunk(user_ids, weight_old, weight_new):
+    """进程池任务：按完成时间重放一批用户的全部历史，返回这些用户的能力值"""
+    global _worker_question_tags
+    if _worker_question_tags is None:
+        _worker_question_tags = load_question_tags()
+    observations = load_observations(user_ids, question_tags=_worker_question_tags)
+    return user_ids, replay_capability(observations, weight_old, weight_new, load_initial_levels(user_ids))
+
+
+def rebuild_profiles(user_ids=None, chunk_size=500, workers=None, weight_old=None, weight_new=None,
+                     dry_run=False, tolerance=1e-6, top=10):
+    """
+    重放全部历史，重建能力画像
+
+    用户按ID分批交给进程池并行重放，结果在主进程中与现有能力画像比较，
+    只把有变化的 (用户, 标签) 批量写回（SQLite 只允许单个写入者）。
+
+    Args:
+        user_ids: 需要重建的用户ID，默认为所有有已完成试卷的用户
+        chunk_size: 每个进程任务处理的用户数
+        workers: 进程数，默认使用CPU核数；为1时在当前进程中执行
+        weight_old, weight_new: 加权移动平均的权重，默认使用配置值
+        dry_run: 只比较差异，不写入
+        tolerance: 变化小于该值视为未变化
+
+    Returns:
+        RebuildResult
+    """
+    weight_old, weight_new = get_update_weights(weight_old, weight_new)
+    if user_ids is None:
+        user_ids = ExamPaper.objects.filter(
+            status=ExamPaper.Status.COMPLETED
+        ).values_list('user_id', flat=True).distinct().order_by('user_id')
+    user_ids = sorted(set(int(user_id) for user_id in user_ids))
+
+    result = RebuildResult(top=top)
+    result.users = len(user_ids)
+    chunks = list(_chunked(user_ids, max(1, chunk_size)))
+    if not chunks:
+        return result
+
+    if workers == 1 or len(chunks) == 1:
+        question_tags = load_question_tags()
+        for chunk in chunks:
+            observations = load_observations(chunk, question_tags=question_tags)
+            levels = replay_capability(observations, weight_old, weight_new, load_initial_levels(chunk))
+            _apply_rebuilt_levels(chunk, levels, result, dry_run, tolerance)
+        return result
+
+    # 子进程不应继承父进程已打开的数据库连接
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_rebuild_worker) as executor:
+        futures = [executor.submit(replay_user_chunk, chunk, weight_old, weight_new) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk, levels = future.result()
+            _apply_rebuilt_levels(chunk, levels, result, dry_run, tolerance)
+    return result
+
+
+def _apply_rebuilt_levels(user_ids, levels, result, dry_run, tolerance):
+    """与现有能力画像比较，写回有变化的值"""
+    current = pd.DataFrame.from_records(
+        CapabilityProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'tag_id', 'mastery_level'),
+        columns=PAIR_KEYS + ['old_level']
+    )
+    merged = levels.merge(current, on=PAIR_KEYS, how='left')
+    # 尚无能力画像的 (用户, 标签) 视为从0开始变化
+    merged['diff'] = merged['mastery_level'] - merged['old_level'].fillna(0.0)
+    changes = merged[merged['old_level'].isna() | (merged['diff'].abs() > tolerance)]
+    result.pairs += len(merged)
+    result.add_changes(changes)
+
+    if not dry_run and not changes.empty:
+        with transaction.atomic():
+            result.written += write_profiles(changes[PAIR_KEYS + ['mastery_level']])
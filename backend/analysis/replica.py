@@ -0,0 +1,189 @@
+"""
+分析查询的只读副本
+
+趋势、能力总结、考试统计、导出等分析查询改为读取副本，不再与交卷争用主库：
+- SQLite：refresh_analytics_replica 命令用在线备份 API 定期把主库复制为另一个文件（写入临时文件后原子替换），
+  副本以只读方式打开，副本数据的时间点为该次备份开始的时刻
+- PostgreSQL：副本为流复制的备库，数据时间点为 pg_last_xact_replay_timestamp()
+
+读取副本的条件：
+- 副本延迟不超过 MAX_LAG_SECONDS，否则读主库
+- 读自己的写：请求涉及的用户（当前用户和 ?user_id= 指定的用户）在副本时间点之后有试卷或能力画像写入时读主库，
+  例如交卷后立即查看能力总结
+
+AnalyticsReplicaRouter 只在 read_from_replica 装饰的视图或 replica_reads() 范围内把读查询路由到副本，
+其余查询和所有写入都使用主库。
+"""
+import contextvars
+import functools
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import StreamingHttpResponse
+
+USER_WRITE_KEY = 'analytics_replica:user_write'
+
+_replica_alias = contextvars.ContextVar('analytics_replica_alias', default=None)
+
+
+def get_replica_settings():
+    return getattr(settings, 'ANALYTICS_REPLICA_SETTINGS', {})
+
+
+def get_replica_alias():
+    """已配置的副本别名，没有配置时返回 None"""
+    alias = get_replica_settings().get('ALIAS', 'analytics')
+    return alias if alias in settings.DATABASES else None
+
+
+class AnalyticsReplicaRouter:
+    """在分析读取范围内把读查询路由到副本"""
+
+    def db_for_read(self, model, **hints):
+        return _replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 副本是主库的复制品，不单独迁移
+        return db != get_replica_alias()
+
+
+def replica_timestamp(alias=None):
+    """
+    副本数据的时间点（Unix 时间戳），副本不可用时返回 None
+    """
+    alias = alias or get_replica_alias()
+    if alias is None:
+        return None
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        try:
+            return os.path.getmtime(get_replica_settings()['SQLITE_PATH'])
+        except (KeyError, OSError):
+            return None
+    if connection.vendor == 'postgresql':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT EXTRACT(EPOCH FROM pg_last_xact_replay_timestamp())')
+                replayed = cursor.fetchone()[0]
+        except Exception:
+            return None
+        # 不是备库（或尚未回放任何事务）时视为没有延迟
+        return float(replayed) if replayed is not None else time.time()
+    return time.time()
+
+
+def record_user_write(user_id):
+    """记录用户最近一次写入的时间，用于读自己的写"""
+    if user_id is None:
+        return
+    timeout = int(get_replica_settings().get('MAX_LAG_SECONDS', 300)) * 2
+    cache.set(f'{USER_WRITE_KEY}:{user_id}', time.time(), timeout)
+
+
+def choose_alias(user_ids=()):
+    """
+    本次分析读取使用的数据库别名：副本足够新且没有涉及用户的未同步写入时为副本，否则为主库
+    """
+    alias = get_replica_alias()
+    if alias is None:
+        return DEFAULT_DB_ALIAS
+    timestamp = replica_timestamp(alias)
+    if timestamp is None or time.time() - timestamp > get_replica_settings().get('MAX_LAG_SECONDS', 300):
+        return DEFAULT_DB_ALIAS
+
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        writes = cache.get_many([f'{USER_WRITE_KEY}:{user_id}' for user_id in user_ids])
+        if any(written >= timestamp for written in writes.values()):
+            return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def replica_reads(user_ids=()):
+    """在范围内把读查询路由到副本（条件不满足时仍读主库），返回实际使用的别名"""
+    alias = choose_alias(user_ids)
+    token = _replica_alias.set(alias if alias != DEFAULT_DB_ALIAS else None)
+    try:
+        yield alias
+    finally:
+        _replica_alias.reset(token)
+
+
+def _stream_from(alias, content):
+    """流式响应在视图返回后才读取数据，逐块恢复副本路由"""
+    iterator = iter(content)
+    while True:
+        token = _replica_alias.set(alias)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _replica_alias.reset(token)
+        yield chunk
+
+
+def read_from_replica(view):
+    """
+    视图装饰器（放在 @api_view 之下）：视图中的读查询使用副本
+
+    读自己的写涉及当前用户和查询参数 user_id 指定的用户。
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user_ids = [request.user.id if request.user.is_authenticated else None]
+        target_user_id = request.GET.get('user_id')
+        if target_user_id and target_user_id.isdigit():
+            user_ids.append(int(target_user_id))
+
+        with replica_reads(user_ids) as alias:
+            response = view(request, *args, **kwargs)
+        if alias != DEFAULT_DB_ALIAS and isinstance(response, StreamingHttpResponse):
+            response.streaming_content = _stream_from(alias, response.streaming_content)
+        return response
+    return wrapper
+
+
+def refresh_sqlite_replica():
+    """
+    用在线备份 API 把主库复制为副本文件
+
+    先写入临时文件，文件时间设为备份开始的时刻（即副本数据的时间点），再原子替换；
+    已打开旧副本的连接继续读取旧文件，新连接读取新文件。
+
+    Returns:
+        float: 耗时（秒）
+    """
+    replica_settings = get_replica_settings()
+    path = replica_settings['SQLITE_PATH']
+    temp_path = f'{path}.tmp'
+    source = connections[DEFAULT_DB_ALIAS]
+    if source.vendor != 'sqlite':
+        raise ValueError('主库不是 SQLite，副本由数据库复制维护')
+
+    started = time.time()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    source.ensure_connection()
+    target = sqlite3.connect(temp_path)
+    try:
+        source.connection.backup(target, pages=replica_settings.get('BACKUP_PAGES', -1))
+        # 副本只读且整体替换，使用回滚日志模式，不留下 -wal/-shm 文件
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+    os.utime(temp_path, (started, started))
+    os.replace(temp_path, path)
+    return time.time() - started
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CapabilityProfile, TrainingMaterial
+from .models import CapabilityProfile, TrainingMaterial, ExportJob
 from core.models import Tag
 from core.serializers import TagSerializer
 
@@ -61,4 +61,17 @@ class UserCapabilitySummarySerializer(serializers.Serializer):
         help_text="表现优秀的标签列表"
     )
     total_exams = serializers.IntegerField()
-    recent_accuracy = serializers.FloatField()
\ No newline at end of file
+    recent_accuracy = serializers.FloatField()
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """导出任务序列化器"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    percent = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ExportJob
+        fields = ('id', 'kind', 'file_format', 'params', 'status', 'status_display',
+                 'progress', 'total_rows', 'percent', 'error', 'created_at',
+                 'started_at', 'finished_at', 'expires_at')
+        read_only_fields = fields
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import CAPABILITY_PROFILE, TRAINING_MATERIAL, bump_generation
+from core.models import ExamPaper
+from .models import CapabilityProfile, TrainingMaterial
+from .replica import record_user_write
+
+
+@receiver(post_save, sender=CapabilityProfile)
+@receiver(post_delete, sender=CapabilityProfile)
+def bump_capability_profile_generation(sender, instance, raw=False, **kwargs):
+    """能力画像变化后使该用户的雷达图、能力总结等缓存失效"""
+    if raw:
+        return
+    bump_generation(CAPABILITY_PROFILE, instance.user_id)
+
+
+@receiver(post_save, sender=TrainingMaterial)
+@receiver(post_delete, sender=TrainingMaterial)
+@receiver(m2m_changed, sender=TrainingMaterial.tags.through)
+def bump_training_material_generation(sender, **kwargs):
+    if kwargs.get('raw') or kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    bump_generation(TRAINING_MATERIAL)
+
+
+@receiver(post_save, sender=ExamPaper)
+@receiver(post_save, sender=CapabilityProfile)
+def record_replica_user_write(sender, instance, raw=False, **kwargs):
+    """试卷或能力画像写入提交后，该用户的分析查询读主库直到副本同步"""
+    if raw:
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: record_user_write(user_id))
@@ -10,9 +10,15 @@ urlpatterns = [
     path('summary/', views.capability_summary, name='capability-summary'),
     path('trend/', views.trend_data, name='trend-data'),
     path('recommendations/', views.weak_tag_recommendations, name='weak-recommendations'),
+    path('cohort-percentiles/', views.cohort_percentile_data, name='cohort-percentiles'),
 
     # 用户管理相关（管理员专用）
     path('users/', views.user_list, name='user-list'),
+    path('analytics/cube/', views.analytics_cube, name='analytics-cube'),
+    path('export/jobs/', views.create_export_job, name='create-export-job'),
+    path('export/jobs/<int:pk>/', views.export_job_detail, name='export-job-detail'),
+    path('export/jobs/<int:pk>/download/', views.download_export_job, name='download-export-job'),
+    path('export/<str:kind>/', views.export_data, name='export-data'),
 
     # 培训资料相关
     path('materials/', views.TrainingMaterialListView.as_view(), name='training-materials'),
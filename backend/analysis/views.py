@@ -1,18 +1,31 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Prefetch, Q
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import timedelta
+import os
+import tempfile
+from urllib.parse import quote
 
 from core.models import ExamPaper, Tag
-from .models import CapabilityProfile, TrainingMaterial
+from core.cache import CAPABILITY_PROFILE, EXAM_PAPER, TAG, TRAINING_MATERIAL, cached, generation_name
+from .models import CapabilityProfile, TrainingMaterial, ExportJob
+from .exports import (
+    EXPORT_KINDS, EXPORT_FORMATS, parse_export_filters, export_rows,
+    export_filename, iter_csv, write_xlsx
+)
+from .export_jobs import request_export
+from .cube import parse_cube_query, query_cube
+from .cohort import cohort_percentiles
+from .replica import read_from_replica
 from .serializers import (
     CapabilityProfileSerializer, RadarChartDataSerializer,
     TrendChartDataSerializer, TrainingMaterialSerializer,
-    UserCapabilitySummarySerializer
+    UserCapabilitySummarySerializer, ExportJobSerializer
 )
-from core.serializers import TagSerializer
+from core.serializers import TagSerializer, with_questions_count
 
 
 class CapabilityProfileListView(generics.ListAPIView):
@@ -27,7 +40,9 @@ class CapabilityProfileListView(generics.ListAPIView):
 
 class TrainingMaterialListView(generics.ListAPIView):
     """培训资料列表"""
-    queryset = TrainingMaterial.objects.filter(is_active=True)
+    queryset = TrainingMaterial.objects.filter(is_active=True).select_related('creator').prefetch_related(
+        Prefetch('tags', queryset=with_questions_count(Tag.objects.all()))
+    )
     serializer_class = TrainingMaterialSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -42,33 +57,8 @@ class TrainingMaterialListView(generics.ListAPIView):
             )
 
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def radar_chart_data(request):
-    """获取用户能力雷达图数据"""
-    # 检查是否为管理员查看其他用户
-    target_user_id = request.GET.get('user_id')
-
-    if target_user_id:
-        # 管理员权限检查
-        if not request.user.is_staff:
-            return Response({
-                'error': '无权限查看其他用户数据'
-            }, status=status.HTTP_403_FORBIDDEN)
-
-        # 管理员查看指定用户
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        try:
-            user = User.objects.get(id=target_user_id)
-        except User.DoesNotExist:
-            return Response({
-                'error': '用户不存在'
-            }, status=status.HTTP_404_NOT_FOUND)
-    else:
-        # 普通用户查看自己的数据
-        user = request.user
-
+def _radar_data(user):
+    """雷达图数据（能力画像或标签变化时缓存失效）"""
     # 获取用户的能力画像数据（排除role标签）
     profiles = CapabilityProfile.objects.filter(
         user=user
@@ -90,14 +80,13 @@ def radar_chart_data(request):
             for profile in profiles
         ]
 
-    serializer = RadarChartDataSerializer(data, many=True)
-    return Response(serializer.data)
+    return data
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def capability_summary(request):
-    """获取用户能力总结"""
+def radar_chart_data(request):
+    """获取用户能力雷达图数据"""
     # 检查是否为管理员查看其他用户
     target_user_id = request.GET.get('user_id')
 
@@ -121,10 +110,22 @@ def capability_summary(request):
         # 普通用户查看自己的数据
         user = request.user
 
+    data = cached(
+        'radar', user.id,
+        [generation_name(CAPABILITY_PROFILE, user.id), TAG],
+        lambda: _radar_data(user)
+    )
+
+    serializer = RadarChartDataSerializer(data, many=True)
+    return Response(serializer.data)
+
+
+def _summary_scores(user):
+    """能力总结中的得分部分"""
     # 计算总体平均分（排除role标签）
     profiles = CapabilityProfile.objects.filter(
         user=user
-    ).exclude(tag__category='role')  # 排除role标签
+    ).exclude(tag__category='role').select_related('tag')  # 排除role标签
 
     if profiles.exists():
         overall_score = profiles.aggregate(avg_score=Avg('mastery_level'))['avg_score']
@@ -157,10 +158,7 @@ def capability_summary(request):
         if max_score > 0:
             recent_accuracy = (total_score / max_score) * 100
 
-    summary_data = {
-        'user_id': user.id,
-        'username': user.username,
-        'job_number': user.job_number,
+    return {
         'overall_score': round(overall_score, 2),
         'weak_tags': weak_tags,
         'strong_tags': strong_tags,
@@ -168,12 +166,54 @@ def capability_summary(request):
         'recent_accuracy': round(recent_accuracy, 2)
     }
 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@read_from_replica
+def capability_summary(request):
+    """获取用户能力总结"""
+    # 检查是否为管理员查看其他用户
+    target_user_id = request.GET.get('user_id')
+
+    if target_user_id:
+        # 管理员权限检查
+        if not request.user.is_staff:
+            return Response({
+                'error': '无权限查看其他用户数据'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        # 管理员查看指定用户
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        try:
+            user = User.objects.get(id=target_user_id)
+        except User.DoesNotExist:
+            return Response({
+                'error': '用户不存在'
+            }, status=status.HTTP_404_NOT_FOUND)
+    else:
+        # 普通用户查看自己的数据
+        user = request.user
+
+    # 能力画像、试卷或标签变化时缓存失效；最近30天准确率随时间变化，由缓存时间限定陈旧程度
+    summary_data = {
+        'user_id': user.id,
+        'username': user.username,
+        'job_number': user.job_number,
+        **cached(
+            'summary', user.id,
+            [generation_name(CAPABILITY_PROFILE, user.id), generation_name(EXAM_PAPER, user.id), TAG],
+            lambda: _summary_scores(user)
+        )
+    }
+
     serializer = UserCapabilitySummarySerializer(summary_data)
     return Response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def trend_data(request):
     """获取能力变化趋势数据"""
     # 检查是否为管理员查看其他用户
@@ -268,6 +308,14 @@ def create_training_material(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _material_counts():
+    """{标签ID: 启用的培训资料数}"""
+    return dict(
+        TrainingMaterial.objects.filter(is_active=True, tags__isnull=False)
+        .values('tags').annotate(count=Count('id', distinct=True)).values_list('tags', 'count')
+    )
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def weak_tag_recommendations(request):
@@ -283,20 +331,17 @@ def weak_tag_recommendations(request):
         tag__category='role'  # 排除role标签
     ).select_related('tag').order_by('mastery_level')
 
+    # 各标签的启用培训资料数（培训资料变化时缓存失效）
+    material_counts = cached('material_counts', 'active', [TRAINING_MATERIAL], _material_counts)
+
     recommendations = []
 
     for profile in weak_profiles:
-        # 查找相关的培训资料
-        materials = TrainingMaterial.objects.filter(
-            tags=profile.tag,
-            is_active=True
-        ).count()
-
         recommendations.append({
             'tag_name': profile.tag.name,
             'tag_category': profile.tag.category,
             'current_level': profile.mastery_level,
-            'available_materials': materials,
+            'available_materials': material_counts.get(profile.tag_id, 0),
             'priority': '高' if profile.mastery_level < 40 else '中'
         })
 
@@ -331,4 +376,177 @@ def user_list(request):
         for user in users
     ]
 
-    return Response(user_data)
\ No newline at end of file
+    return Response(user_data)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+@read_from_replica
+def export_data(request, kind):
+    """
+    导出考试成绩、答题明细或能力画像矩阵（管理员专用）
+
+    kind: papers（考试成绩）、records（答题明细）、capability（能力画像）
+    查询参数: file_format（csv/xlsx，默认csv）、department、position、date_from、date_to
+    """
+    if kind not in EXPORT_KINDS:
+        return Response({
+            'error': f'不支持的导出类型: {kind}'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # 注意：format 参数被DRF用于内容协商，这里使用 file_format
+    file_format = request.GET.get('file_format', 'csv').lower()
+    if file_format not in EXPORT_FORMATS:
+        return Response({
+            'error': '仅支持 csv 和 xlsx 格式'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        filters = parse_export_filters(request.GET)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    filename = export_filename(kind, file_format)
+    rows = export_rows(kind, filters)
+
+    if file_format == 'csv':
+        # 边查询边输出，不在内存中拼接完整文件
+        response = StreamingHttpResponse(
+            (chunk.encode('utf-8') for chunk in iter_csv(rows)),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        return response
+
+    # XLSX 为zip格式无法边生成边发送：先写入临时文件，再由 FileResponse 分块读取
+    temp_file = tempfile.TemporaryFile()
+    write_xlsx(rows, temp_file)
+    temp_file.seek(0)
+    return FileResponse(
+        temp_file,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def create_export_job(request):
+    """
+    提交后台导出任务（管理员专用）
+
+    参数: kind、file_format（csv/xlsx，默认csv）、department、position、date_from、date_to
+    相同参数且数据未变化时复用已有任务，返回200；否则新建任务，返回201
+    """
+    kind = request.data.get('kind', '')
+    file_format = (request.data.get('file_format') or 'csv').lower()
+    try:
+        filters = parse_export_filters(request.data)
+        job, reused = request_export(kind, file_format, filters, user=request.user)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    data = ExportJobSerializer(job).data
+    data['reused'] = reused
+    return Response(data, status=status.HTTP_200_OK if reused else status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_job_detail(request, pk):
+    """查询导出任务状态和进度（管理员专用）"""
+    try:
+        job = ExportJob.objects.get(pk=pk)
+    except ExportJob.DoesNotExist:
+        return Response({
+            'error': '导出任务不存在或已过期'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(ExportJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def download_export_job(request, pk):
+    """下载已完成的导出文件（管理员专用）"""
+    try:
+        job = ExportJob.objects.get(pk=pk)
+    except ExportJob.DoesNotExist:
+        return Response({
+            'error': '导出任务不存在或已过期'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if job.status != ExportJob.Status.DONE:
+        return Response({
+            'error': f'导出任务尚未完成，当前状态: {job.get_status_display()}'
+        }, status=status.HTTP_409_CONFLICT)
+    if (job.expires_at and job.expires_at <= timezone.now()) or not os.path.exists(job.file_path):
+        return Response({
+            'error': '导出文件已过期，请重新导出'
+        }, status=status.HTTP_410_GONE)
+
+    return FileResponse(
+        open(job.file_path, 'rb'),
+        as_attachment=True,
+        filename=export_filename(job.kind, job.file_format)
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def analytics_cube(request):
+    """
+    部门/岗位统计切片查询（管理员专用）
+
+    查询参数: group_by（week/department/position/tag，逗号分隔）、department、position、
+    tag（标签ID）、week_from、week_to（YYYY-MM-DD）
+    数据来自预聚合的统计立方体，由 refresh_analytics_cube 命令定期刷新
+    """
+    try:
+        query = parse_cube_query(request.GET)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'group_by': query['group_by'],
+        'results': query_cube(query)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def cohort_percentile_data(request):
+    """获取用户各能力标签在同岗位员工中的百分位排名，以及同岗位均值和四分位数"""
+    # 检查是否为管理员查看其他用户
+    target_user_id = request.GET.get('user_id')
+
+    if target_user_id:
+        if not request.user.is_staff:
+            return Response({
+                'error': '无权限查看其他用户数据'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        try:
+            user = User.objects.get(id=target_user_id)
+        except User.DoesNotExist:
+            return Response({
+                'error': '用户不存在'
+            }, status=status.HTTP_404_NOT_FOUND)
+    else:
+        user = request.user
+
+    # 排除role标签
+    tags = Tag.objects.exclude(category='role').order_by('id')
+
+    return Response({
+        'user_id': user.id,
+        'position': user.position,
+        'tags': cohort_percentiles(user, tags)
+    })
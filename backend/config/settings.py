@@ -95,8 +95,59 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Django 自带 SQLite 后端 + SQLITE_SETTINGS 中的连接参数（core/backends/sqlite3）
+        'ENGINE': 'core.backends.sqlite3',
+        # WAL 模式下数据库旁还有 -wal、-shm 文件，容器部署时需挂载所在目录而不是单个文件
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+    },
+    # 分析查询的只读副本（analysis/replica.py）：由 refresh_analytics_replica 定期从主库复制，
+    # 副本文件不存在或过旧时自动读主库；使用 PostgreSQL 时改为备库的连接配置
+    'analytics': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': f"file:{os.environ.get('ANALYTICS_REPLICA_PATH', BASE_DIR / 'analytics.sqlite3')}?mode=ro",
+        'SQLITE': {'JOURNAL_MODE': None, 'SYNCHRONOUS': None, 'TRANSACTION_MODE': None},
+    },
+}
+
+DATABASE_ROUTERS = ['analysis.replica.AnalyticsReplicaRouter']
+
+# 分析副本配置
+ANALYTICS_REPLICA_SETTINGS = {
+    'ALIAS': 'analytics',       # 副本的数据库别名
+    'SQLITE_PATH': str(os.environ.get('ANALYTICS_REPLICA_PATH', BASE_DIR / 'analytics.sqlite3')),  # SQLite 副本文件
+    'MAX_LAG_SECONDS': 300,     # 副本最大允许延迟（秒），超过后分析查询读主库
+    'REFRESH_INTERVAL': 60,     # refresh_analytics_replica --loop 的复制间隔（秒）
+}
+
+# SQLite 连接配置（多个工作进程共用一个数据库文件）
+SQLITE_SETTINGS = {
+    'JOURNAL_MODE': 'WAL',         # 读写互不阻塞
+    'SYNCHRONOUS': 'NORMAL',       # WAL 模式下只在检查点时同步磁盘，断电最多丢失最近的事务，不会损坏数据库
+    'BUSY_TIMEOUT': 20,            # 等待写锁的最长时间（秒）
+    'MMAP_SIZE': 268435456,        # 以内存映射方式读取数据库文件的大小上限（字节）
+    'TRANSACTION_MODE': 'IMMEDIATE',  # 事务开始时即取得写锁，避免读后写的事务升级锁时直接失败
+}
+
+# 非交互写入（作答统计、组卷计数、错题本）的后台批量写入配置（core/write_behind.py）
+WRITE_BEHIND_SETTINGS = {
+    'ENABLED': True,            # 关闭时在业务事务提交后直接写入
+    'BATCH_SIZE': 100,          # 每个事务最多合并的写入数
+    'FLUSH_INTERVAL': 0.5,      # 等待凑批的最长时间（秒）
+    'MAX_QUEUE': 10000,         # 队列上限，队列满时在请求线程中直接写入
+}
+
+# Cache
+# 使用本机文件缓存，同一台机器上的多个 gunicorn 工作进程共享（考试监控对账间隔、令牌缓存、读自己的写标记、
+# core/cache.py 缓存层）；后台任务容器需与 Web 容器使用同一目录（环境变量 DJANGO_CACHE_DIR）。
+# 有 Redis/Memcached 时可直接替换
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / 'cache'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
     }
 }
 
@@ -154,7 +205,7 @@ AUTHENTICATION_BACKENDS = [
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -193,6 +244,78 @@ ASSESSMENT_SETTINGS = {
     'WEAK_CAPABILITY_THRESHOLD': 60,
     # 排除时间（小时）
     'EXCLUDE_RECENT_HOURS': 1,
+    # 及格线（得分率，%）
+    'PASS_SCORE_RATE': 60,
+    # 同岗位能力分布缓存时间（秒），考试提交后该岗位缓存立即失效
+    'COHORT_CACHE_SECONDS': 300,
+    # 题目实测难度的最少作答样本数
+    'ITEM_STATS_MIN_SAMPLE': 30,
+    # 错题复习间隔（天）：答错后按第一个间隔复习，每答对一次进入下一个间隔，全部答对后移出错题本
+    'ERROR_REVIEW_INTERVAL_DAYS': (1, 3, 7),
+}
+
+# 近似重复题目检测配置（MinHash/LSH）
+QUESTION_DEDUP_SETTINGS = {
+    'SHINGLE_SIZE': 3,         # 字符shingle长度（中文按字切分）
+    'NUM_PERM': 128,           # MinHash签名长度
+    'BANDS': 16,               # LSH分段数，NUM_PERM需能被BANDS整除
+    'SIMILARITY_THRESHOLD': 0.8,  # 判定为近似重复的相似度阈值
+}
+
+# 后台导出任务配置
+EXPORT_SETTINGS = {
+    'EXPORT_ROOT': os.environ.get('EXPORT_ROOT', BASE_DIR / 'exports'),  # 导出文件存放目录，后台任务进程与 Web 进程需共用
+    'FILE_TTL_HOURS': 24,      # 导出文件保留时间（小时），过期后删除
+    'MAX_WORKERS': 2,          # 同时执行的导出任务数
+    'POLL_INTERVAL': 5,        # 后台进程轮询新任务的间隔（秒）
+    'PROGRESS_INTERVAL': 5000, # 每导出多少行更新一次进度
+    'STALE_JOB_MINUTES': 60,   # 运行超过该时间仍未结束的任务视为进程已中断，重新排队
+}
+
+# 登录配置
+LOGIN_SETTINGS = {
+    'JOB_NUMBER_PATTERN': r'^[A-Za-z]*\d+$',  # 符合该格式的登录名先按工号查找，否则先按用户名查找
+    'HASH_WORKERS': 4,         # 校验密码的线程数（PBKDF2 计算时释放 GIL，可多核并行）
+    'HASH_QUEUE': 32,          # 线程池满时最多排队的登录请求数
+    'QUEUE_TIMEOUT': 5,        # 排队超过该时间（秒）返回"登录繁忙"
+}
+
+# 缓存层配置（core/cache.py）
+CACHE_LAYER_SETTINGS = {
+    'DEFAULT_TIMEOUT': 300,     # 缓存时间（秒），同时限定随时间变化的数据的最长陈旧时间
+    'LOCAL_MAX_ENTRIES': 2000,  # 每个进程内 LRU 的最大条目数
+}
+
+# 题库快照配置（core/snapshot.py）
+QUESTION_SNAPSHOT_SETTINGS = {
+    'ENABLED': True,            # 是否在组卷和题目列表中使用快照（快照不存在或过期时自动查询数据库）
+    'PATH': BASE_DIR / 'snapshots',  # 快照文件和版本文件所在目录
+    'CHECK_INTERVAL': 5,        # 各进程检查版本文件的间隔（秒）
+    'KEEP': 3,                  # 保留的历史快照文件数
+}
+
+# 令牌认证缓存配置
+AUTH_TOKEN_CACHE_SETTINGS = {
+    'TTL_SECONDS': 60,          # 令牌→用户 在进程内缓存的时间（秒），为0时不缓存；其他进程通过令牌版本号立即感知失效
+    'MAX_ENTRIES': 10000,       # 每个进程最多缓存的令牌数（LRU淘汰）
+    'USE_SHARED_CACHE': False,  # 是否同时写入 Django 缓存（CACHES 为 Redis/Memcached 时可在进程间共享）
+    'TOKEN_EXPIRE_HOURS': None, # 令牌有效期（小时），None 表示永不过期
+}
+
+# 考试时限配置
+EXAM_DEADLINE_SETTINGS = {
+    'GRACE_SECONDS': 60,       # 超过时限后仍接受保存/提交的宽限时间（秒），用于抵消网络延迟
+    'SWEEP_BATCH_SIZE': 20,    # 超时扫描每批自动交卷的试卷数
+    'SWEEP_BATCH_PAUSE': 2,    # 每批之间的暂停时间（秒），避免集中交卷时评分和能力更新挤占数据库
+    'SWEEP_INTERVAL': 30,      # 持续运行时两次扫描的间隔（秒）
+}
+
+# 考试实时监控配置
+EXAM_MONITOR_SETTINGS = {
+    'PUSH_INTERVAL': 2,         # 推送连接检查计数变化的间隔（秒）
+    'HEARTBEAT_SECONDS': 15,    # 计数无变化时发送心跳的间隔（秒），防止代理断开空闲连接
+    'RECONCILE_SECONDS': 60,    # 按数据库对账纠正计数偏差的间隔（秒）
+    'STREAM_MAX_SECONDS': 600,  # 单个推送连接的最长时间（秒），到期后由浏览器自动重连；连接期间占用一个处理线程，需 gthread 工作进程（gunicorn.conf.py）
 }
 
 # AI 评分配置
@@ -200,7 +323,7 @@ AI_GRADING_SETTINGS = {
     'ENABLED': True,  # 是否启用AI评分
     'API_KEY': os.environ.get('DEEPSEEK_API_KEY', ''),  # AI服务的API密钥，从环境变量读取
     'MODEL_NAME': 'deepseek-chat',  # 使用的模型名称
-    'BASE_URL': 'https://api.deepseek.com/v1',  # API基础URL
+    'BASE_URL': os.environ.get('AI_BASE_URL', 'https://api.deepseek.com/v1'),  # API基础URL，压测时可用环境变量指向本机模拟服务
     'MAX_RETRIES': 3,  # 最大重试次数
     'TIMEOUT': 10,  # 请求超时时间（秒）
     'PROMPT_TEMPLATE': """
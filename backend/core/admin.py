@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Tag, Question, ExamPaper, ExamRecord
+from .models import Tag, Question, QuestionStats, ExamPaper, ExamRecord, WrongQuestion
+from .search import search_questions, fulltext_available
 
 
 @admin.register(Tag)
@@ -10,18 +11,59 @@ class TagAdmin(admin.ModelAdmin):
     ordering = ('category', 'name')
 
 
+class QuestionStatsInline(admin.StackedInline):
+    model = QuestionStats
+    can_delete = False
+    readonly_fields = ('served_count', 'answered_count', 'correct_count', 'ai_score_sum', 'ai_score_count',
+                       'duration_sum', 'duration_count', 'sample_size', 'p_value', 'discrimination',
+                       'empirical_difficulty', 'analyzed_at')
+
+    def has_add_permission(self, request, obj=None):
+        # 统计由组卷、交卷和 compute_item_stats 命令自动维护
+        return False
+
+
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('content_short', 'question_type', 'difficulty', 'is_active', 'created_at')
+    list_display = ('content_short', 'question_type', 'difficulty', 'empirical_difficulty', 'p_value',
+                    'discrimination', 'is_active', 'created_at')
+    list_select_related = ('stats',)
+    inlines = [QuestionStatsInline]
     list_filter = ('question_type', 'difficulty', 'is_active', 'tags', 'created_at')
     search_fields = ('content', 'explanation')
     filter_horizontal = ('tags',)
     readonly_fields = ('created_at', 'updated_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        """题干和解析的检索走全文索引，避免 LIKE 全表扫描"""
+        if search_term.strip() and fulltext_available():
+            return search_questions(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
     def content_short(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_short.short_description = '题目内容'
 
+    def _stats_value(self, obj, field):
+        # 没有统计记录时 obj.stats 抛出的异常是 AttributeError 的子类
+        return getattr(getattr(obj, 'stats', None), field, None)
+
+    def empirical_difficulty(self, obj):
+        return self._stats_value(obj, 'empirical_difficulty')
+    empirical_difficulty.short_description = '实测难度'
+    empirical_difficulty.admin_order_field = 'stats__empirical_difficulty'
+
+    def p_value(self, obj):
+        value = self._stats_value(obj, 'p_value')
+        return None if value is None else round(value, 3)
+    p_value.short_description = '通过率(p值)'
+    p_value.admin_order_field = 'stats__p_value'
+
+    def discrimination(self, obj):
+        return self._stats_value(obj, 'discrimination')
+    discrimination.short_description = '区分度'
+    discrimination.admin_order_field = 'stats__discrimination'
+
     fieldsets = (
         ('基本信息', {
             'fields': ('content', 'question_type', 'difficulty', 'is_active')
@@ -71,4 +113,13 @@ class ExamRecordAdmin(admin.ModelAdmin):
 
     def question_short(self, obj):
         return obj.question.content[:30] + '...' if len(obj.question.content) > 30 else obj.question.content
-    question_short.short_description = '题目内容'
\ No newline at end of file
+    question_short.short_description = '题目内容'
+
+
+@admin.register(WrongQuestion)
+class WrongQuestionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'question_id', 'wrong_count', 'review_stage', 'last_wrong_at', 'due_at')
+    list_filter = ('review_stage',)
+    search_fields = ('user__job_number',)
+    raw_id_fields = ('user', 'question')
+    list_select_related = ('user',)
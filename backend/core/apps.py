@@ -1,7 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_fulltext_index(sender, using, **kwargs):
+    """迁移完成后确保题库全文索引及同步触发器存在"""
+    from .search import ensure_fulltext_index
+    ensure_fulltext_index(using=using)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
-    verbose_name = '题库与考核'
\ No newline at end of file
+    verbose_name = '题库与考核'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(_ensure_fulltext_index, sender=self)
@@ -0,0 +1,50 @@
+"""
+SQLite 生产配置
+
+docker-compose 部署时所有 gunicorn 工作进程共用一个 db.sqlite3。在 Django 自带的 SQLite 后端基础上：
+- 打开连接时按 SQLITE_SETTINGS 设置 journal_mode（WAL：读写互不阻塞）、synchronous、mmap_size
+- 等锁时间 BUSY_TIMEOUT：写锁被占用时等待而不是立即报 database is locked
+- 事务以 BEGIN IMMEDIATE 开始：默认的 BEGIN（DEFERRED）在事务中第一次写入时才申请写锁，
+  两个都已读过数据的事务同时升级时其中一个会立即失败且不经过等锁；IMMEDIATE 在事务开始时取得写锁，
+  冲突的事务改为排队等待
+
+DATABASES 中某个库的 'SQLITE' 项可覆盖 SQLITE_SETTINGS（如只读副本不设置 journal_mode），值为 None 时不设置。
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = (
+    ('JOURNAL_MODE', 'journal_mode'),
+    ('SYNCHRONOUS', 'synchronous'),
+    ('MMAP_SIZE', 'mmap_size'),
+)
+
+
+def get_sqlite_settings():
+    return getattr(settings, 'SQLITE_SETTINGS', {})
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_sqlite_settings(self):
+        return {**get_sqlite_settings(), **self.settings_dict.get('SQLITE', {})}
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        busy_timeout = self.get_sqlite_settings().get('BUSY_TIMEOUT')
+        if busy_timeout is not None and 'timeout' not in self.settings_dict['OPTIONS']:
+            params['timeout'] = busy_timeout
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        sqlite_settings = self.get_sqlite_settings()
+        for key, pragma in PRAGMAS:
+            value = sqlite_settings.get(key)
+            if value is not None:
+                conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.get_sqlite_settings().get('TRANSACTION_MODE') or 'DEFERRED'
+        self.cursor().execute(f'BEGIN {mode}')
@@ -0,0 +1,170 @@
+"""
+跨进程缓存
+
+多个 gunicorn 工作进程部署在同一台机器上且没有 Redis 时使用：
+- 第一层：进程内 LRU，命中时不做任何 I/O（版本号查询除外）
+- 第二层：Django 默认缓存（本机文件缓存），各工作进程共享，一个进程算过的结果其他进程可直接使用
+- 失效：题目、标签、能力画像、培训资料、试卷、员工信息写入时把 cache_generations 表中对应的版本号加一，
+  读取缓存前用一条小查询取得所依赖的版本号，版本号不一致的缓存视为过期
+
+版本号可按范围区分（如每个用户的能力画像单独计数），避免一个人交卷使所有人的缓存失效。
+命中率按命名空间统计，统计值为当前进程的数据。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CacheGeneration
+
+QUESTION = 'question'
+TAG = 'tag'
+CAPABILITY_PROFILE = 'capability_profile'
+TRAINING_MATERIAL = 'training_material'
+EXAM_PAPER = 'exam_paper'
+USER = 'user'  # 员工信息（部门、岗位、姓名等），导出文件依赖
+USER_TOKEN = 'user_token'  # 按用户计数：令牌删除、密码或启用状态变化，令牌认证缓存依赖
+
+
+def get_cache_settings():
+    return getattr(settings, 'CACHE_LAYER_SETTINGS', {})
+
+
+def generation_name(name, scope=None):
+    return name if scope is None else f'{name}:{scope}'
+
+
+def bump_generation(name, scope=None):
+    """数据写入后将版本号加一（在写入数据的同一事务中执行）"""
+    key = generation_name(name, scope)
+    if not CacheGeneration.objects.filter(name=key).update(value=F('value') + 1, updated_at=timezone.now()):
+        generation, created = CacheGeneration.objects.get_or_create(name=key, defaults={'value': 1})
+        if not created:
+            CacheGeneration.objects.filter(name=key).update(value=F('value') + 1, updated_at=timezone.now())
+
+
+def bump_generations(name, scopes):
+    """批量写入后按范围将版本号加一"""
+    for scope in set(scopes):
+        bump_generation(name, scope)
+
+
+def get_generations(names):
+    """一次查询取得多个版本号，未出现过的名称为0"""
+    values = dict(CacheGeneration.objects.filter(name__in=names).values_list('name', 'value'))
+    return tuple(values.get(name, 0) for name in names)
+
+
+class CacheStats:
+    """各命名空间的命中统计（当前进程）"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def incr(self, namespace, field):
+        with self._lock:
+            counts = self._counts.setdefault(namespace, {'local_hits': 0, 'shared_hits': 0, 'misses': 0})
+            counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for namespace, counts in sorted(self._counts.items()):
+                total = sum(counts.values())
+                result[namespace] = {
+                    **counts,
+                    'requests': total,
+                    'hit_rate': round((counts['local_hits'] + counts['shared_hits']) / total * 100, 2) if total else None,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class LocalCache:
+    """进程内 LRU：{键: (版本号, 过期时刻, 值)}"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generations):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] != generations or entry[1] < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[2]
+
+    def set(self, key, generations, value, timeout, max_entries):
+        with self._lock:
+            self._entries[key] = (generations, time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalCache()
+stats = CacheStats()
+
+
+def cached(namespace, key, depends_on, compute, timeout=None):
+    """
+    读取缓存，缺失或过期时调用 compute() 计算并写入两层缓存
+
+    Args:
+        namespace: 命名空间，用于统计命中率
+        key: 命名空间内的键
+        depends_on: 所依赖的版本号名称列表（generation_name 的结果）
+        compute: 无参函数，返回可被 pickle 的值
+        timeout: 缓存时间（秒），默认 CACHE_LAYER_SETTINGS['DEFAULT_TIMEOUT']；
+                 数据随时间变化（如"最近30天"）时用它限定最长陈旧时间
+    """
+    cache_settings = get_cache_settings()
+    if timeout is None:
+        timeout = cache_settings.get('DEFAULT_TIMEOUT', 300)
+    full_key = f'{namespace}:{key}'
+    generations = get_generations(list(depends_on))
+
+    found, value = local_cache.get(full_key, generations)
+    if found:
+        stats.incr(namespace, 'local_hits')
+        return value
+
+    shared_key = f"layer:{full_key}:{'.'.join(str(value) for value in generations)}"
+    entry = shared_cache.get(shared_key)
+    if entry is not None:
+        stats.incr(namespace, 'shared_hits')
+        value = entry[0]
+    else:
+        stats.incr(namespace, 'misses')
+        value = compute()
+        shared_cache.set(shared_key, (value,), timeout)
+    local_cache.set(full_key, generations, value, timeout, cache_settings.get('LOCAL_MAX_ENTRIES', 2000))
+    return value
+
+
+def get_cache_stats():
+    return {
+        'pid': os.getpid(),
+        'local_entries': len(local_cache),
+        'namespaces': stats.snapshot(),
+    }
@@ -0,0 +1,111 @@
+"""
+考试时限
+
+进行中的试卷超过 started_at + time_limit（再加宽限时间）即视为超时，不再接受保存和提交。
+超时试卷由 sweep_expired_exams 命令按 (status, started_at) 索引分批查找，
+用已保存的答案自动交卷；每批之间暂停，集中结束的考试不会同时触发大量评分和能力更新。
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ExamPaper
+from .services import ExamAlreadySubmitted, ExamScoringService
+
+
+def get_deadline_settings():
+    return getattr(settings, 'EXAM_DEADLINE_SETTINGS', {})
+
+
+def get_grace():
+    return timedelta(seconds=get_deadline_settings().get('GRACE_SECONDS', 60))
+
+
+def paper_deadline(paper):
+    """试卷的作答截止时间（未开始的试卷返回 None）"""
+    if paper.started_at is None:
+        return None
+    return paper.started_at + timedelta(seconds=paper.time_limit)
+
+
+def is_expired(paper, now=None):
+    """进行中的试卷是否已超过截止时间和宽限时间"""
+    if paper.status != ExamPaper.Status.IN_PROGRESS or paper.started_at is None:
+        return False
+    now = now or timezone.now()
+    return now > paper_deadline(paper) + get_grace()
+
+
+def find_expired_papers(limit, now=None):
+    """
+    查找超时的进行中试卷，按开始时间先后返回
+
+    开始时间早于 now - 宽限时间 的进行中试卷走索引范围扫描，
+    各试卷时限不同，截止时间在取出后逐条判断。
+
+    Returns:
+        list[int]: 试卷ID
+    """
+    now = now or timezone.now()
+    candidates = ExamPaper.objects.filter(
+        status=ExamPaper.Status.IN_PROGRESS,
+        started_at__lte=now - get_grace()
+    ).order_by('started_at').values_list('id', 'started_at', 'time_limit')
+
+    expired = []
+    for paper_id, started_at, time_limit in candidates.iterator(chunk_size=500):
+        if now > started_at + timedelta(seconds=time_limit) + get_grace():
+            expired.append(paper_id)
+            if len(expired) >= limit:
+                break
+    return expired
+
+
+def sweep_expired_papers(batch_size=None, batch_pause=None, max_papers=None):
+    """
+    用已保存的答案自动提交超时试卷
+
+    Args:
+        batch_size: 每批提交的试卷数
+        batch_pause: 每批之间暂停的秒数
+        max_papers: 本次最多提交的试卷数，None 表示直到没有超时试卷
+
+    Returns:
+        tuple: (提交成功数, 失败数)
+    """
+    deadline_settings = get_deadline_settings()
+    batch_size = batch_size or deadline_settings.get('SWEEP_BATCH_SIZE', 20)
+    if batch_pause is None:
+        batch_pause = deadline_settings.get('SWEEP_BATCH_PAUSE', 2)
+
+    scoring_service = ExamScoringService()
+    submitted = failed = 0
+    failed_ids = set()
+    while max_papers is None or submitted + failed < max_papers:
+        limit = batch_size if max_papers is None else min(batch_size, max_papers - submitted - failed)
+        # 本轮提交失败的试卷不再重复尝试，留到下一次扫描
+        paper_ids = [
+            paper_id for paper_id in find_expired_papers(limit + len(failed_ids))
+            if paper_id not in failed_ids
+        ][:limit]
+        if not paper_ids:
+            break
+
+        for paper_id in paper_ids:
+            try:
+                scoring_service.submit_exam(paper_id, {}, auto_submitted=True)
+                submitted += 1
+            except ExamAlreadySubmitted:
+                # 考生在扫描期间自行提交了
+                pass
+            except Exception as e:
+                failed += 1
+                failed_ids.add(paper_id)
+                print(f"[超时交卷] 试卷{paper_id}自动提交失败: {e}")
+
+        print(f"[超时交卷] 本批处理 {len(paper_ids)} 张试卷，累计提交 {submitted} 张")
+        if len(paper_ids) == limit and batch_pause:
+            time.sleep(batch_pause)
+    return submitted, failed
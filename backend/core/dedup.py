@@ -0,0 +1,327 @@
+"""
+近似重复题目检测
+
+对规范化后的题干按字符切分 shingle，计算 MinHash 签名并按 band 做 LSH 分桶。
+新题只需查询与其落入相同桶的候选题，无需与全部题目两两比较；
+全库聚类同样只比较桶内碰撞的题目对。
+"""
+import hashlib
+import unicodedata
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Question, QuestionSignature, QuestionLSHBucket
+
+# Mersenne 素数 2^31-1，哈希值与系数乘积不会溢出 uint64
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_PERMUTATION_SEED = 20240601
+
+
+class MinHasher:
+    """MinHash 签名计算器"""
+
+    def __init__(self, dedup_settings=None):
+        dedup_settings = dedup_settings or getattr(settings, 'QUESTION_DEDUP_SETTINGS', {})
+        self.shingle_size = dedup_settings.get('SHINGLE_SIZE', 3)
+        self.num_perm = dedup_settings.get('NUM_PERM', 128)
+        self.bands = dedup_settings.get('BANDS', 16)
+        self.threshold = dedup_settings.get('SIMILARITY_THRESHOLD', 0.8)
+        if self.num_perm % self.bands:
+            raise ValueError('NUM_PERM 必须能被 BANDS 整除')
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(_PERMUTATION_SEED)
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=self.num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def normalize(text):
+        """规范化文本：全角转半角、转小写，去除空白和标点符号"""
+        text = unicodedata.normalize('NFKC', text or '').lower()
+        return ''.join(
+            char for char in text
+            if not char.isspace() and unicodedata.category(char)[0] not in ('P', 'S')
+        )
+
+    def digest(self, text):
+        """规范化题干的摘要，用于判断题干是否变化"""
+        return hashlib.sha1(self.normalize(text).encode('utf-8')).hexdigest()
+
+    def shingles(self, text):
+        """按字符切分 shingle（中文无需分词）"""
+        normalized = self.normalize(text)
+        if len(normalized) <= self.shingle_size:
+            return {normalized} if normalized else set()
+        return {
+            normalized[i:i + self.shingle_size]
+            for i in range(len(normalized) - self.shingle_size + 1)
+        }
+
+    def signature(self, text):
+        """计算 MinHash 签名（uint32 数组）"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def bucket_keys(self, signature):
+        """计算签名在各 band 下的桶哈希（band 序号参与哈希，不同 band 不会互相碰撞）"""
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(chunk, digest_size=8, salt=band.to_bytes(2, 'little')).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """用签名估计两段文本的 Jaccard 相似度"""
+        return float(np.mean(signature_a == signature_b))
+
+    @staticmethod
+    def load_signature(raw):
+        return np.frombuffer(bytes(raw), dtype=np.uint32)
+
+
+_hasher = None
+
+
+def get_hasher():
+    """获取进程内共享的签名计算器"""
+    global _hasher
+    if _hasher is None:
+        _hasher = MinHasher()
+    return _hasher
+
+
+def index_questions(questions, force=False, signatures=None):
+    """
+    批量维护题目的签名和 LSH 分桶
+
+    Args:
+        questions: 题目对象列表（需包含 id 和 content）
+        force: 是否忽略题干摘要强制重算
+        signatures: 可选，与 questions 一一对应的预先计算好的签名
+
+    Returns:
+        int: 实际重新计算签名的题目数量
+    """
+    hasher = get_hasher()
+    if signatures is None:
+        signatures = [None] * len(questions)
+    pairs = [(question, signature) for question, signature in zip(questions, signatures) if question.id]
+    if not pairs:
+        return 0
+
+    existing = {}
+    if not force:
+        existing = dict(
+            QuestionSignature.objects.filter(
+                question_id__in=[question.id for question, _ in pairs]
+            ).values_list('question_id', 'content_digest')
+        )
+
+    signature_rows = []
+    bucket_rows = []
+    for question, signature in pairs:
+        digest = hasher.digest(question.content)
+        if existing.get(question.id) == digest:
+            continue
+        if signature is None:
+            signature = hasher.signature(question.content)
+        signature_rows.append(QuestionSignature(
+            question_id=question.id,
+            content_digest=digest,
+            signature=signature.tobytes()
+        ))
+        bucket_rows.extend(
+            (question.id, band, key)
+            for band, key in enumerate(hasher.bucket_keys(signature))
+        )
+
+    if not signature_rows:
+        return 0
+
+    changed_ids = [row.question_id for row in signature_rows]
+    with transaction.atomic():
+        QuestionSignature.objects.filter(question_id__in=changed_ids).delete()
+        QuestionLSHBucket.objects.filter(question_id__in=changed_ids).delete()
+        QuestionSignature.objects.bulk_create(signature_rows, batch_size=500)
+        # 分桶行数是题目数的 BANDS 倍，直接批量插入以避免构造大量模型实例
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {QuestionLSHBucket._meta.db_table} (question_id, band, bucket) VALUES (%s, %s, %s)',
+                bucket_rows
+            )
+
+    return len(signature_rows)
+
+
+def find_near_duplicates(content, exclude_ids=None, threshold=None):
+    """
+    查找与给定题干近似重复的已有题目（用于导入前检查）
+
+    只查询与新题落入相同桶的候选题并校验签名相似度，不与全部题目逐一比较。
+
+    Returns:
+        list: [(question_id, similarity), ...]，按相似度从高到低排序
+    """
+    return find_near_duplicates_bulk([content], exclude_ids=exclude_ids, threshold=threshold)[0]
+
+
+def find_near_duplicates_bulk(contents, exclude_ids=None, threshold=None, signatures=None):
+    """
+    批量查找近似重复题目：整批题干的桶只查询一次，候选题签名也只加载一次
+
+    同一批次内彼此重复的题干也会被标记，候选ID为负数的批内序号（-1表示第1条）。
+
+    Args:
+        signatures: 可选，与 contents 一一对应的预先计算好的签名
+
+    Returns:
+        list: 与 contents 一一对应的 [(question_id, similarity), ...] 列表
+    """
+    hasher = get_hasher()
+    threshold = hasher.threshold if threshold is None else threshold
+    exclude_ids = set(exclude_ids or [])
+
+    if signatures is None:
+        signatures = [hasher.signature(content) for content in contents]
+    keys = [hasher.bucket_keys(signature) for signature in signatures]
+    all_keys = {key for item_keys in keys for key in item_keys}
+
+    bucket_members = {}
+    for key_chunk in _chunked(all_keys):
+        for bucket, question_id in QuestionLSHBucket.objects.filter(
+            bucket__in=key_chunk
+        ).values_list('bucket', 'question_id'):
+            if question_id not in exclude_ids:
+                bucket_members.setdefault(bucket, set()).add(question_id)
+
+    candidate_ids = {question_id for members in bucket_members.values() for question_id in members}
+    existing = {}
+    for id_chunk in _chunked(candidate_ids):
+        for question_id, raw in QuestionSignature.objects.filter(
+            question_id__in=id_chunk
+        ).values_list('question_id', 'signature'):
+            existing[question_id] = hasher.load_signature(raw)
+
+    results = []
+    batch_buckets = {}
+    for index, (signature, item_keys) in enumerate(zip(signatures, keys)):
+        duplicates = {}
+        for key in item_keys:
+            for question_id in bucket_members.get(key, ()):
+                if question_id not in duplicates and question_id in existing:
+                    duplicates[question_id] = hasher.similarity(signature, existing[question_id])
+            for other in batch_buckets.get(key, ()):
+                if -(other + 1) not in duplicates:
+                    duplicates[-(other + 1)] = hasher.similarity(signature, signatures[other])
+        for key in item_keys:
+            batch_buckets.setdefault(key, []).append(index)
+
+        matched = [(question_id, sim) for question_id, sim in duplicates.items() if sim >= threshold]
+        matched.sort(key=lambda item: item[1], reverse=True)
+        results.append(matched)
+
+    return results
+
+
+def find_duplicate_clusters(threshold=None, active_only=True):
+    """
+    全库近似重复聚类
+
+    按桶哈希排序扫描分桶表，只对同桶的题目对校验签名相似度，再用并查集合并为簇。
+
+    Returns:
+        list: 重复簇列表，每个簇为 [(question_id, ...)]，按簇大小从大到小排序
+    """
+    hasher = get_hasher()
+    threshold = hasher.threshold if threshold is None else threshold
+
+    bucket_rows = QuestionLSHBucket.objects.all()
+    signature_rows = QuestionSignature.objects.all()
+    if active_only:
+        bucket_rows = bucket_rows.filter(question__is_active=True)
+        signature_rows = signature_rows.filter(question__is_active=True)
+
+    # 收集桶内碰撞的候选题目对
+    candidate_pairs = set()
+    current_bucket, members = None, []
+    for bucket, question_id in bucket_rows.order_by('bucket', 'question_id').values_list(
+        'bucket', 'question_id'
+    ).iterator(chunk_size=5000):
+        if bucket != current_bucket:
+            _collect_pairs(members, candidate_pairs)
+            current_bucket, members = bucket, []
+        members.append(question_id)
+    _collect_pairs(members, candidate_pairs)
+
+    if not candidate_pairs:
+        return []
+
+    involved_ids = {question_id for pair in candidate_pairs for question_id in pair}
+    signatures = {}
+    for id_chunk in _chunked(involved_ids):
+        for question_id, raw in signature_rows.filter(
+            question_id__in=id_chunk
+        ).values_list('question_id', 'signature'):
+            signatures[question_id] = hasher.load_signature(raw)
+
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for first, second in candidate_pairs:
+        if first not in signatures or second not in signatures:
+            continue
+        if hasher.similarity(signatures[first], signatures[second]) >= threshold:
+            parent[find(first)] = find(second)
+
+    clusters = {}
+    for node in parent:
+        clusters.setdefault(find(node), []).append(node)
+
+    return sorted(
+        (sorted(members) for members in clusters.values() if len(members) > 1),
+        key=len,
+        reverse=True
+    )
+
+
+def _chunked(values, size=900):
+    """按 SQLite 参数数量上限拆分 IN 查询的参数"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _collect_pairs(members, candidate_pairs):
+    """将同一个桶内的题目两两组成候选对"""
+    for i in range(len(members)):
+        for j in range(i + 1, len(members)):
+            candidate_pairs.add((members[i], members[j]))
+
+
+def load_question_summaries(question_ids):
+    """获取题目的简要信息，用于报告输出"""
+    return {
+        question.id: question
+        for question in Question.objects.filter(id__in=question_ids).only(
+            'id', 'content', 'question_type', 'is_active'
+        )
+    }
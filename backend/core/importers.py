@@ -0,0 +1,405 @@
+"""
+题库批量导入
+
+以流式方式读取 Excel(.xlsx)/CSV 文件，逐行校验后按批次 bulk_create 写入题目，
+标签关联直接批量写入多对多中间表。单行校验失败只记录错误，不影响整批导入。
+"""
+import csv
+import json
+import os
+import re
+
+from django.db import transaction
+
+from .models import Tag, Question
+from .dedup import get_hasher, index_questions, find_near_duplicates_bulk
+from .cache import QUESTION, TAG, bump_generation
+
+# 表头别名（支持中英文表头）
+HEADER_ALIASES = {
+    'content': ('content', '题干', '题目', '题目题干', '题目内容'),
+    'question_type': ('question_type', 'type', '题型', '题目类型'),
+    'options': ('options', '选项', '选项列表'),
+    'correct_answer': ('correct_answer', 'answer', '答案', '正确答案', '参考答案'),
+    'difficulty': ('difficulty', '难度', '难度系数'),
+    'explanation': ('explanation', '解析', '答案解析'),
+    'tags': ('tags', '标签', '关联标签'),
+    'is_active': ('is_active', '是否启用'),
+}
+
+# 单独的选项列：A/B/C... 或 选项A/选项B...
+OPTION_COLUMN_PATTERN = re.compile(r'^(?:选项|option[_ ]?)?([A-Ha-h])$')
+
+QUESTION_TYPE_ALIASES = {
+    'single': Question.QuestionType.SINGLE,
+    '单选': Question.QuestionType.SINGLE,
+    '单选题': Question.QuestionType.SINGLE,
+    'multiple': Question.QuestionType.MULTIPLE,
+    '多选': Question.QuestionType.MULTIPLE,
+    '多选题': Question.QuestionType.MULTIPLE,
+    'true_false': Question.QuestionType.TRUE_FALSE,
+    '判断': Question.QuestionType.TRUE_FALSE,
+    '判断题': Question.QuestionType.TRUE_FALSE,
+    'subjective': Question.QuestionType.SUBJECTIVE,
+    '主观': Question.QuestionType.SUBJECTIVE,
+    '主观题': Question.QuestionType.SUBJECTIVE,
+    '简答题': Question.QuestionType.SUBJECTIVE,
+}
+
+TRUE_VALUES = ('TRUE', 'T', '对', '正确', '是', '√', 'Y', 'YES', '1')
+FALSE_VALUES = ('FALSE', 'F', '错', '错误', '否', '×', 'X', 'N', 'NO', '0')
+
+DEFAULT_TRUE_FALSE_OPTIONS = [
+    {'key': 'True', 'text': '正确'},
+    {'key': 'False', 'text': '错误'},
+]
+
+# 文本选项格式：A. 内容 / A、内容 / A:内容，多个选项用换行或 | 分隔
+OPTION_TEXT_PATTERN = re.compile(r'^\s*([A-Ha-h])\s*[\.．、:：\)）]\s*(.*)$')
+TAG_SEPARATOR_PATTERN = re.compile(r'[,，;；、|]')
+
+
+class QuestionImportResult:
+    """导入结果"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.errors = []       # [(行号, 错误信息)]
+        self.duplicates = []   # [(行号, [('question'或'row', 题目ID或文件行号, 相似度)])]
+        self.skipped_duplicates = 0
+        self.created_tags = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def to_dict(self, max_items=200):
+        return {
+            'total_rows': self.total_rows,
+            'created': self.created,
+            'error_count': len(self.errors),
+            'errors': [
+                {'row': row, 'error': message} for row, message in self.errors[:max_items]
+            ],
+            'duplicate_count': len(self.duplicates),
+            'duplicates': [
+                {
+                    'row': row,
+                    'matches': [
+                        {
+                            'question_id' if kind == 'question' else 'row': match_id,
+                            'similarity': round(similarity, 3),
+                        }
+                        for kind, match_id, similarity in matches
+                    ],
+                }
+                for row, matches in self.duplicates[:max_items]
+            ],
+            'skipped_duplicates': self.skipped_duplicates,
+            'created_tags': self.created_tags,
+        }
+
+
+class QuestionImporter:
+    """题库批量导入器"""
+
+    def __init__(self, chunk_size=500, create_missing_tags=False, check_duplicates=True,
+                 skip_duplicates=False, dry_run=False):
+        self.chunk_size = max(1, chunk_size)
+        self.create_missing_tags = create_missing_tags
+        self.check_duplicates = check_duplicates
+        self.skip_duplicates = skip_duplicates
+        self.dry_run = dry_run
+        self.tag_ids = {}
+
+    def import_file(self, path, file_format=None):
+        """
+        导入题库文件
+
+        Args:
+            path: 文件路径
+            file_format: 'xlsx' 或 'csv'，默认根据扩展名判断
+
+        Returns:
+            QuestionImportResult: 导入结果
+        """
+        return self.import_rows(self._iter_rows(path, file_format))
+
+    def import_rows(self, rows):
+        """导入 (行号, 行数据字典) 序列"""
+        result = QuestionImportResult()
+        # 一次性加载标签名称到ID的映射
+        self.tag_ids = dict(Tag.objects.values_list('name', 'id'))
+
+        chunk = []
+        for row_number, row in rows:
+            if not row.get('option_columns') and all(
+                cell_text(value) == '' for key, value in row.items() if key != 'option_columns'
+            ):
+                continue
+            result.total_rows += 1
+            try:
+                chunk.append((row_number,) + self.parse_row(row))
+            except ValueError as e:
+                result.add_error(row_number, str(e))
+                continue
+
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, result)
+                chunk = []
+
+        self._flush(chunk, result)
+        return result
+
+    def _iter_rows(self, path, file_format):
+        """读取表头后逐行组装行数据"""
+        rows = iter_table_rows(path, file_format)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _map_header(header[1])
+        for row_number, values in rows:
+            yield row_number, _build_row(columns, values)
+
+    def parse_row(self, row):
+        """
+        解析并校验单行数据
+
+        Returns:
+            tuple: (未保存的题目对象, 标签名称列表)
+
+        Raises:
+            ValueError: 数据不合法
+        """
+        content = cell_text(row.get('content'))
+        if not content:
+            raise ValueError('题干不能为空')
+
+        raw_type = cell_text(row.get('question_type')) or Question.QuestionType.SINGLE
+        question_type = QUESTION_TYPE_ALIASES.get(raw_type.lower(), QUESTION_TYPE_ALIASES.get(raw_type))
+        if not question_type:
+            raise ValueError(f'未知题型: {raw_type}')
+
+        options = self._parse_options(row)
+        answer = cell_text(row.get('correct_answer'))
+        if not answer:
+            raise ValueError('答案不能为空')
+
+        if question_type in (Question.QuestionType.SINGLE, Question.QuestionType.MULTIPLE):
+            if len(options) < 2:
+                raise ValueError('选择题至少需要两个选项')
+            option_keys = {option['key'].upper() for option in options}
+            answer_keys = sorted(set(re.findall(r'[A-Za-z]', answer.upper())))
+            if not answer_keys or not set(answer_keys) <= option_keys:
+                raise ValueError(f'答案 {answer} 不在选项 {",".join(sorted(option_keys))} 中')
+            if question_type == Question.QuestionType.SINGLE and len(answer_keys) != 1:
+                raise ValueError('单选题只能有一个正确答案')
+            if question_type == Question.QuestionType.MULTIPLE and len(answer_keys) < 2:
+                raise ValueError('多选题至少需要两个正确答案')
+            answer = ','.join(answer_keys)
+        elif question_type == Question.QuestionType.TRUE_FALSE:
+            normalized = answer.upper()
+            if normalized in TRUE_VALUES:
+                answer = 'True'
+            elif normalized in FALSE_VALUES:
+                answer = 'False'
+            else:
+                raise ValueError(f'判断题答案不合法: {answer}')
+            options = options or DEFAULT_TRUE_FALSE_OPTIONS
+
+        difficulty = cell_text(row.get('difficulty')) or '3'
+        try:
+            difficulty = int(float(difficulty))
+        except ValueError:
+            raise ValueError(f'难度必须是1-5的整数: {difficulty}')
+        if not 1 <= difficulty <= 5:
+            raise ValueError(f'难度必须是1-5的整数: {difficulty}')
+
+        is_active = cell_text(row.get('is_active'))
+        question = Question(
+            content=content,
+            question_type=question_type,
+            options=options or None,
+            correct_answer=answer,
+            difficulty=difficulty,
+            explanation=cell_text(row.get('explanation')),
+            is_active=not is_active or is_active.upper() in TRUE_VALUES,
+        )
+
+        tag_names = [
+            name.strip() for name in TAG_SEPARATOR_PATTERN.split(cell_text(row.get('tags')))
+            if name.strip()
+        ]
+        if not self.create_missing_tags:
+            unknown = [name for name in tag_names if name not in self.tag_ids]
+            if unknown:
+                raise ValueError(f'未知标签: {", ".join(unknown)}')
+
+        return question, tag_names
+
+    def _parse_options(self, row):
+        """解析选项：支持JSON、多行文本，以及 A/B/C... 独立列"""
+        raw = row.get('options')
+        if isinstance(raw, str) and raw.strip():
+            raw = raw.strip()
+            if raw.startswith('['):
+                try:
+                    options = json.loads(raw)
+                except json.JSONDecodeError:
+                    raise ValueError('选项JSON格式错误')
+                if not all(isinstance(option, dict) and 'key' in option for option in options):
+                    raise ValueError('选项JSON格式应为 [{"key": "A", "text": "..."}]')
+                return options
+
+            options = []
+            for part in re.split(r'[\n|]', raw):
+                if not part.strip():
+                    continue
+                match = OPTION_TEXT_PATTERN.match(part)
+                if not match:
+                    raise ValueError(f'无法识别的选项: {part.strip()}')
+                options.append({'key': match.group(1).upper(), 'text': match.group(2).strip()})
+            return options
+
+        return [
+            {'key': key, 'text': text}
+            for key, text in sorted(row.get('option_columns', {}).items())
+            if text
+        ]
+
+    def _flush(self, chunk, result):
+        """校验重复后批量写入一批题目及其标签关联"""
+        if not chunk:
+            return
+
+        hasher = get_hasher()
+        signatures = [hasher.signature(question.content) for _, question, _ in chunk]
+
+        if self.check_duplicates:
+            matches = find_near_duplicates_bulk(
+                [question.content for _, question, _ in chunk], signatures=signatures
+            )
+            kept = []
+            kept_signatures = []
+            for (row_number, question, tag_names), signature, duplicates in zip(chunk, signatures, matches):
+                if duplicates:
+                    # 批内重复以负数序号表示，转换为对应的文件行号
+                    duplicates = [
+                        ('row', chunk[-match_id - 1][0], similarity) if match_id < 0
+                        else ('question', match_id, similarity)
+                        for match_id, similarity in duplicates
+                    ]
+                    result.duplicates.append((row_number, duplicates))
+                    if self.skip_duplicates:
+                        result.skipped_duplicates += 1
+                        continue
+                kept.append((row_number, question, tag_names))
+                kept_signatures.append(signature)
+            chunk, signatures = kept, kept_signatures
+
+        if self.dry_run or not chunk:
+            return
+
+        self._resolve_missing_tags(chunk, result)
+
+        try:
+            with transaction.atomic():
+                questions = Question.objects.bulk_create([question for _, question, _ in chunk])
+                Through = Question.tags.through
+                Through.objects.bulk_create([
+                    Through(question_id=question.id, tag_id=self.tag_ids[name])
+                    for question, (_, _, tag_names) in zip(questions, chunk)
+                    for name in dict.fromkeys(tag_names)
+                ], batch_size=2000)
+                # bulk_create 不触发 post_save，需手动维护重复检测索引并使题目缓存失效
+                index_questions(questions, force=True, signatures=signatures)
+                bump_generation(QUESTION)
+        except Exception as e:
+            for row_number, _, _ in chunk:
+                result.add_error(row_number, f'写入数据库失败: {str(e)}')
+            return
+
+        result.created += len(questions)
+
+    def _resolve_missing_tags(self, chunk, result):
+        """批量创建缺失的标签并刷新名称到ID的映射"""
+        missing = {
+            name for _, _, tag_names in chunk for name in tag_names
+            if name not in self.tag_ids
+        }
+        if not missing:
+            return
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        bump_generation(TAG)
+        self.tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+        result.created_tags.extend(sorted(missing))
+
+
+def iter_table_rows(path, file_format=None):
+    """
+    流式读取 Excel(.xlsx)/CSV 文件
+
+    Yields:
+        tuple: (行号, 单元格值列表)，第1行为表头
+    """
+    file_format = (file_format or os.path.splitext(path)[1].lstrip('.')).lower()
+    if file_format not in ('xlsx', 'csv'):
+        raise ValueError(f'不支持的文件格式: {file_format}，仅支持 xlsx 和 csv')
+
+    if file_format == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from enumerate(csv.reader(f), start=1)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from enumerate(workbook.active.iter_rows(values_only=True), start=1)
+    finally:
+        workbook.close()
+
+
+def cell_text(value):
+    """将单元格值转换为去除首尾空白的字符串"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    return str(value).strip()
+
+
+def _map_header(header):
+    """将表头映射为 [(列序号, 字段名或('option', 选项字母))]"""
+    alias_lookup = {
+        alias.lower(): field for field, aliases in HEADER_ALIASES.items() for alias in aliases
+    }
+    columns = []
+    for index, name in enumerate(header):
+        name = cell_text(name)
+        if name.lower() in alias_lookup:
+            columns.append((index, alias_lookup[name.lower()]))
+            continue
+        match = OPTION_COLUMN_PATTERN.match(name)
+        if match:
+            columns.append((index, ('option', match.group(1).upper())))
+
+    if not any(field == 'content' for _, field in columns):
+        raise ValueError('文件缺少题干列（content/题干）')
+    return columns
+
+
+def _build_row(columns, values):
+    """按表头映射组装行数据"""
+    row = {'option_columns': {}}
+    for index, field in columns:
+        value = values[index] if index < len(values) else None
+        if isinstance(field, tuple):
+            text = cell_text(value)
+            if text:
+                row['option_columns'][field[1]] = text
+        else:
+            row[field] = value
+    return row
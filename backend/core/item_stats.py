@@ -0,0 +1,183 @@
+"""
+题目项目分析
+
+组卷、交卷时用 F 表达式批量累加各题的作答计数；compute_item_statistics 基于全部已完成试卷的
+答题记录，用 pandas 分组求和向量化计算通过率(p值)和点二列区分度。
+"""
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import ExamPaper, ExamRecord, Question, QuestionStats
+from .cache import QUESTION, bump_generation
+
+# p值到1-5级难度的换算下限：p≥0.85为1级（最易），p<0.3为5级（最难）
+DIFFICULTY_P_THRESHOLDS = (0.85, 0.7, 0.5, 0.3)
+
+
+def _ensure_stats_rows(question_ids):
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=question_id) for question_id in question_ids],
+        ignore_conflicts=True
+    )
+
+
+def record_questions_served(question_ids):
+    """组卷后累加题目的组卷次数"""
+    question_ids = list(question_ids)
+    if not question_ids:
+        return
+    _ensure_stats_rows(question_ids)
+    QuestionStats.objects.filter(question_id__in=question_ids).update(served_count=F('served_count') + 1)
+
+
+def record_submission(records):
+    """
+    交卷后用一条 UPDATE 批量累加本卷各题的作答统计
+
+    Args:
+        records: 已评分的答题记录列表（同一试卷内每道题只出现一次）
+    """
+    records = [record for record in records if record.question_id]
+    if not records:
+        return
+    question_ids = [record.question_id for record in records]
+    _ensure_stats_rows(question_ids)
+
+    answered = [record.question_id for record in records if record.user_answer]
+    correct = [record.question_id for record in records if record.is_correct]
+    scored = [record for record in records if record.ai_score is not None]
+    timed = [record for record in records if record.duration]
+
+    def increment(ids):
+        return Case(When(question_id__in=ids, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+    updates = {
+        'answered_count': F('answered_count') + increment(answered),
+        'correct_count': F('correct_count') + increment(correct),
+        'ai_score_count': F('ai_score_count') + increment([record.question_id for record in scored]),
+        'duration_count': F('duration_count') + increment([record.question_id for record in timed]),
+    }
+    if scored:
+        updates['ai_score_sum'] = F('ai_score_sum') + Case(
+            *[When(question_id=record.question_id, then=Value(float(record.ai_score))) for record in scored],
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    if timed:
+        updates['duration_sum'] = F('duration_sum') + Case(
+            *[When(question_id=record.question_id, then=Value(record.duration)) for record in timed],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    QuestionStats.objects.filter(question_id__in=question_ids).update(**updates)
+
+
+def empirical_difficulty(p_values):
+    """将p值数组换算为1-5级难度"""
+    return 1 + np.searchsorted(-np.asarray(DIFFICULTY_P_THRESHOLDS), -np.asarray(p_values), side='left')
+
+
+def compute_item_statistics(min_sample=None):
+    """
+    基于已完成试卷的全部答题记录计算题目的p值和区分度
+
+    区分度为本题对错(0/1)与同卷其余题目正确率的点二列相关系数（即皮尔逊相关），
+    对每道题按分组求和一次算出，不逐题循环。
+
+    Args:
+        min_sample: 样本数少于该值的题目不给出实测难度
+
+    Returns:
+        pandas.DataFrame: 以题目ID为索引，包含 sample_size、p_value、discrimination、empirical_difficulty
+    """
+    if min_sample is None:
+        min_sample = settings.ASSESSMENT_SETTINGS.get('ITEM_STATS_MIN_SAMPLE', 30)
+
+    records = pd.DataFrame.from_records(
+        ExamRecord.objects.filter(paper__status=ExamPaper.Status.COMPLETED).values_list(
+            'paper_id', 'question_id', 'is_correct'
+        ).iterator(chunk_size=10000),
+        columns=['paper_id', 'question_id', 'is_correct']
+    )
+    if records.empty:
+        return pd.DataFrame(columns=['sample_size', 'p_value', 'discrimination', 'empirical_difficulty'])
+
+    # 未作答或未评分按答错计
+    records['x'] = records['is_correct'].fillna(False).astype(float)
+    paper = records.groupby('paper_id')['x'].agg(['sum', 'size'])
+    records = records.join(paper, on='paper_id')
+    # 只有一道题的试卷没有"其余题目"，不参与区分度计算
+    rest_size = records['size'] - 1
+    records['y'] = np.where(rest_size > 0, (records['sum'] - records['x']) / rest_size.where(rest_size > 0, 1), np.nan)
+
+    valid = records.dropna(subset=['y']).assign(
+        xy=lambda frame: frame['x'] * frame['y'],
+        yy=lambda frame: frame['y'] ** 2,
+    )
+    sums = valid.groupby('question_id').agg(
+        n=('x', 'size'), sx=('x', 'sum'), sy=('y', 'sum'), sxy=('xy', 'sum'), syy=('yy', 'sum')
+    )
+    # x 为0/1变量，Σx² = Σx
+    covariance = sums['n'] * sums['sxy'] - sums['sx'] * sums['sy']
+    variance_x = sums['n'] * sums['sx'] - sums['sx'] ** 2
+    variance_y = sums['n'] * sums['syy'] - sums['sy'] ** 2
+    denominator = np.sqrt(variance_x * variance_y)
+    discrimination = (covariance / denominator.where(denominator > 1e-12)).clip(-1, 1)
+
+    stats = records.groupby('question_id')['x'].agg(sample_size='size', p_value='mean')
+    stats['discrimination'] = discrimination
+    stats['empirical_difficulty'] = np.where(
+        stats['sample_size'] >= min_sample,
+        empirical_difficulty(stats['p_value'].to_numpy()),
+        np.nan
+    )
+    return stats
+
+
+def save_item_statistics(stats, apply_difficulty=False):
+    """
+    保存分析结果
+
+    Args:
+        stats: compute_item_statistics 的结果
+        apply_difficulty: 是否将实测难度写回题目的难度系数（仅限样本数足够的题目）
+
+    Returns:
+        int: 更新的题目数量
+    """
+    if stats.empty:
+        return 0
+    now = timezone.now()
+    question_ids = [int(question_id) for question_id in stats.index]
+    _ensure_stats_rows(question_ids)
+
+    rows = []
+    for question_id, row in zip(question_ids, stats.itertuples(index=False)):
+        rows.append(QuestionStats(
+            question_id=question_id,
+            sample_size=int(row.sample_size),
+            p_value=float(row.p_value),
+            discrimination=None if pd.isna(row.discrimination) else round(float(row.discrimination), 4),
+            empirical_difficulty=None if pd.isna(row.empirical_difficulty) else int(row.empirical_difficulty),
+            analyzed_at=now,
+        ))
+    QuestionStats.objects.bulk_update(
+        rows,
+        ['sample_size', 'p_value', 'discrimination', 'empirical_difficulty', 'analyzed_at'],
+        batch_size=500
+    )
+
+    if apply_difficulty:
+        Question.objects.bulk_update(
+            [
+                Question(id=row.question_id, difficulty=row.empirical_difficulty)
+                for row in rows if row.empirical_difficulty is not None
+            ],
+            ['difficulty'],
+            batch_size=500
+        )
+        bump_generation(QUESTION)
+    return len(rows)
@@ -0,0 +1,114 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import Tag, Question, ExamPaper, ExamRecord
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """用于在基准测试结束后回滚临时数据"""
+
+
+class Command(BaseCommand):
+    help = '试卷详情接口基准测试：统计不同题目数量下的SQL查询数和响应耗时（临时数据会回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,50,100', help='试卷题目数量，逗号分隔')
+        parser.add_argument('--repeat', type=int, default=20, help='每种情况的请求次数')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        repeat = max(1, options['repeat'])
+
+        results = []
+        try:
+            with transaction.atomic():
+                user, tags = self.create_fixture_base()
+                client = APIClient()
+                client.force_authenticate(user=user)
+
+                for size in sizes:
+                    paper = self.create_paper(user, tags, size)
+                    for status in (ExamPaper.Status.IN_PROGRESS, ExamPaper.Status.COMPLETED):
+                        ExamPaper.objects.filter(id=paper.id).update(status=status)
+                        results.append((size, status) + self.measure(client, paper.id, repeat))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'题目数':>6} {'状态':<12} {'查询数':>6} {'中位耗时(ms)':>12} {'最大耗时(ms)':>12}")
+        for size, status, queries, median_ms, max_ms in results:
+            self.stdout.write(f'{size:>6} {status:<12} {queries:>6} {median_ms:>12.2f} {max_ms:>12.2f}')
+
+        # 查询数量必须与题目数量无关
+        for status in (ExamPaper.Status.IN_PROGRESS, ExamPaper.Status.COMPLETED):
+            counts = {queries for _, s, queries, _, _ in results if s == status}
+            if len(counts) > 1:
+                raise CommandError(f'状态 {status} 下查询数量随题目数量变化: {sorted(counts)}')
+
+        self.stdout.write(self.style.SUCCESS('查询数量与题目数量无关'))
+
+    def create_fixture_base(self):
+        """创建基准测试用的考生和标签"""
+        user = User.objects.create_user(
+            username='__bench_detail__',
+            password=None,
+            job_number='__BENCH_DETAIL__',
+            position='站务员',
+            department='基准测试',
+        )
+        tags = [
+            Tag.objects.create(name=f'__bench_tag_{index}__', category=Tag.Category.POSITION)
+            for index in range(3)
+        ]
+        tags.append(Tag.objects.create(name='__bench_role__', category=Tag.Category.ROLE))
+        return user, tags
+
+    def create_paper(self, user, tags, size):
+        """创建指定题目数量的试卷"""
+        questions = Question.objects.bulk_create([
+            Question(
+                content=f'基准测试题目 {size}-{index}',
+                question_type=Question.QuestionType.SINGLE,
+                options=[{'key': 'A', 'text': '选项A'}, {'key': 'B', 'text': '选项B'}],
+                correct_answer='A',
+            )
+            for index in range(size)
+        ])
+        Through = Question.tags.through
+        Through.objects.bulk_create([
+            Through(question_id=question.id, tag_id=tag.id)
+            for question in questions
+            for tag in (tags[question.id % 3], tags[-1])
+        ])
+        paper = ExamPaper.objects.create(user=user, title=f'基准测试试卷-{size}')
+        ExamRecord.objects.bulk_create([
+            ExamRecord(paper=paper, question=question, user_answer='A', is_correct=True)
+            for question in questions
+        ])
+        return paper
+
+    def measure(self, client, paper_id, repeat):
+        """请求试卷详情接口，返回（查询数，中位耗时，最大耗时）"""
+        url = f'/api/exam/{paper_id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'请求 {url} 失败: {response.status_code}')
+        # 后续请求会重置查询日志，需立即取出查询数
+        query_count = len(context.captured_queries)
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return query_count, statistics.median(timings), max(timings)
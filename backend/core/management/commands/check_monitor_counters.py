@@ -0,0 +1,59 @@
+import threading
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import ExamMonitorCounter
+from core.monitor import add_counts
+
+# 检查使用的日期和部门，不与真实计数重叠，结束后删除
+CHECK_DAY = date(2000, 1, 1)
+CHECK_DEPARTMENT = 'CHECK-MONITOR'
+
+
+class Command(BaseCommand):
+    help = '考试监控计数并发检查：多个线程同时累加同一组计数，结果必须等于累加总数（检查数据会删除）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+        parser.add_argument('--events', type=int, default=50, help='每个线程的事件数')
+
+    def handle(self, *args, **options):
+        threads, events = options['threads'], options['events']
+        changes = {'in_progress': 1, 'started': 1, 'score_sum': 3}
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(events):
+                    add_counts(CHECK_DAY, CHECK_DEPARTMENT, changes)
+            except Exception as e:
+                errors.append(str(e))
+            finally:
+                connection.close()
+
+        counters = ExamMonitorCounter.objects.filter(day=CHECK_DAY, department=CHECK_DEPARTMENT)
+        counters.delete()
+        try:
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            values = dict(counters.values_list('field', 'value'))
+        finally:
+            counters.delete()
+
+        failures = []
+        for field, delta in changes.items():
+            expected = delta * threads * events
+            passed = values.get(field) == expected
+            self.stdout.write(f'{"✓" if passed else "✗"} {field}: {values.get(field)} / {expected}')
+            if not passed:
+                failures.append(field)
+        if errors:
+            self.stdout.write(self.style.ERROR(f'{len(errors)} 个线程写入失败: {errors[0]}'))
+        if failures or errors:
+            raise CommandError(f'并发累加丢失计数: {", ".join(failures) or "写入失败"}')
+        self.stdout.write(self.style.SUCCESS(f'{threads} 个线程 × {events} 次事件的计数全部累加'))
@@ -0,0 +1,366 @@
+import importlib
+import os
+import re
+import sys
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from analysis.cohort import mark_cohort_stale
+from analysis.models import CapabilityProfile, ExportJob, TrainingMaterial
+from core.cache import local_cache
+from core.models import ExamPaper, ExamRecord, Question, Tag
+
+User = get_user_model()
+
+URL_MODULES = ('core.urls', 'analysis.urls', 'users.urls')
+
+# 不做查询预算检查的接口及原因
+SKIPPED_ROUTES = {
+    'core:exam-monitor-stream': 'SSE 长连接，推送内容与 exam-monitor 相同',
+}
+
+PASSWORD = 'budget-check'
+
+# 规范化 SQL 时替换的常量：字符串、数字、保存点名称、IN 列表、批量更新的 CASE 分支
+SQL_LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), "'?'"),
+    (re.compile(r'"s\d+_x\d+"'), '"?"'),
+    (re.compile(r'\b\d+(?:\.\d+)?(?:e[+-]\d+)?\b'), '?'),
+    (re.compile(r'\((?:\?, )+\?\)'), '(?...)'),
+    (re.compile(r'(?:WHEN \([^)]*\) THEN \S+ )+'), 'WHEN ... '),
+)
+
+
+class _Rollback(Exception):
+    """用于在检查结束后回滚临时数据"""
+
+
+def normalize_sql(sql):
+    """去掉 SQL 中的常量，同一条语句模板的多次执行归为一类"""
+    for pattern, replacement in SQL_LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def route_names():
+    """core、analysis、users 三个应用的全部路由名称"""
+    names = set()
+    for module_name in URL_MODULES:
+        module = importlib.import_module(module_name)
+        names.update(f'{module.app_name}:{pattern.name}' for pattern in module.urlpatterns)
+    return names
+
+
+class Fixture:
+    """按规模生成的临时数据：规模为 n 时标签、题目、试卷、员工、培训资料数量均与 n 成正比"""
+
+    def __init__(self, scale):
+        self.scale = scale
+        prefix = f'__budget_{scale}'
+        self.position = f'{prefix}_岗位__'
+        self.role_tag = Tag.objects.create(name=self.position, category=Tag.Category.ROLE)
+        categories = [Tag.Category.POSITION, Tag.Category.EMERGENCY, Tag.Category.COMPREHENSIVE]
+        self.tags = [
+            Tag.objects.create(name=f'{prefix}_tag_{index}__', category=categories[index % len(categories)])
+            for index in range(4 * scale)
+        ]
+
+        self.questions = Question.objects.bulk_create([
+            Question(
+                content=f'查询预算题目 {scale}-{index}',
+                question_type=Question.QuestionType.SINGLE,
+                options=[{'key': 'A', 'text': '选项A'}, {'key': 'B', 'text': '选项B'}],
+                correct_answer='A',
+                difficulty=index % 5 + 1,
+            )
+            for index in range(30 * scale)
+        ] + [
+            Question(
+                content=f'查询预算主观题 {scale}-{index}',
+                question_type=Question.QuestionType.SUBJECTIVE,
+                correct_answer='参考答案',
+            )
+            for index in range(2 * scale)
+        ])
+        Through = Question.tags.through
+        Through.objects.bulk_create([
+            Through(question_id=question.id, tag_id=tag.id)
+            for index, question in enumerate(self.questions)
+            for tag in (self.tags[index % len(self.tags)], self.tags[(index + 1) % len(self.tags)], self.role_tag)
+        ])
+
+        self.employee = self.create_user(f'{prefix}_emp__', is_staff=False)
+        self.admin = self.create_user(f'{prefix}_admin__', is_staff=True)
+        self.colleagues = [self.create_user(f'{prefix}_emp{index}__', is_staff=False) for index in range(2 * scale)]
+
+        CapabilityProfile.objects.bulk_create([
+            CapabilityProfile(user=user, tag=tag, mastery_level=(index * 37 + offset * 11) % 100)
+            for offset, user in enumerate([self.employee] + self.colleagues)
+            for index, tag in enumerate(self.tags + [self.role_tag])
+        ])
+
+        now = timezone.now()
+        self.papers = []
+        for index in range(3 * scale):
+            paper = ExamPaper.objects.create(
+                user=self.employee,
+                title=f'查询预算试卷 {scale}-{index}',
+                status=ExamPaper.Status.COMPLETED,
+                score_obtained=3,
+                total_score=5,
+                started_at=now - timedelta(days=index % 20, minutes=30),
+                completed_at=now - timedelta(days=index % 20),
+            )
+            ExamRecord.objects.bulk_create([
+                ExamRecord(paper=paper, question=question, user_answer='A', is_correct=offset % 2 == 0)
+                for offset, question in enumerate(self.questions[index * 5 % len(self.questions):][:5])
+            ])
+            self.papers.append(paper)
+
+        for index in range(3 * scale):
+            material = TrainingMaterial.objects.create(
+                title=f'查询预算资料 {scale}-{index}',
+                url='https://example.com/material',
+                creator=self.admin,
+                is_public=True,
+            )
+            material.tags.set([self.tags[index % len(self.tags)], self.tags[(index + 1) % len(self.tags)]])
+
+        self.download_path = tempfile.NamedTemporaryFile(suffix='.csv', delete=False).name
+        self.done_job = ExportJob.objects.create(
+            kind='papers',
+            file_format='csv',
+            params={},
+            params_hash=f'{prefix}__',
+            status=ExportJob.Status.DONE,
+            file_path=self.download_path,
+            expires_at=now + timedelta(hours=1),
+            requested_by=self.admin,
+        )
+
+    def create_user(self, job_number, is_staff):
+        user = User.objects.create_user(
+            username=job_number,
+            password=PASSWORD,
+            job_number=job_number,
+            position='系统管理员' if is_staff else self.position,
+            department='查询预算',
+            is_staff=is_staff,
+        )
+        Token.objects.create(user=user)
+        return user
+
+    def cleanup(self):
+        if os.path.exists(self.download_path):
+            os.remove(self.download_path)
+
+
+def import_file(fixture):
+    content = (
+        '题干,题型,A,B,答案,标签\n'
+        f'查询预算导入题目一,单选,甲,乙,A,{fixture.tags[0].name}\n'
+        f'查询预算导入题目二,单选,甲,乙,B,{fixture.tags[-1].name}\n'
+    )
+    return SimpleUploadedFile('questions.csv', content.encode('utf-8'), content_type='text/csv')
+
+
+def build_cases(fixture, state):
+    """
+    (名称, 路由, 身份, 方法, 路径参数, 请求数据) 列表，按顺序执行
+
+    身份为 employee/admin/None（匿名）；路径参数和请求数据可以是以 state 为参数的函数，
+    用于引用前面请求的结果（如组卷得到的试卷ID）。
+    """
+    paper_id = lambda s: {'paper_id': s['paper_id']}
+    return [
+        ('登录', 'users:login', None, 'post', {}, {'job_number': fixture.employee.job_number, 'password': PASSWORD}),
+        ('注册', 'users:register', None, 'post', {}, {
+            'job_number': f'__budget_{fixture.scale}_new__', 'username': f'__budget_{fixture.scale}_new__',
+            'password': PASSWORD, 'password_confirm': PASSWORD,
+            'position': fixture.position, 'department': '查询预算',
+        }),
+        ('个人信息', 'users:profile', 'employee', 'get', {}, None),
+        ('题目列表', 'core:question-list', 'admin', 'get', {}, None),
+        ('题目列表（标签筛选）', 'core:question-list', 'admin', 'get', {}, {'tag': fixture.tags[0].id}),
+        ('题目详情', 'core:question-detail', 'admin', 'get', {'pk': fixture.questions[0].id}, None),
+        ('导入题目（试运行）', 'core:question-import', 'admin', 'multipart',
+         {}, lambda s: {'file': import_file(fixture), 'dry_run': 'true'}),
+        ('试卷列表（员工）', 'core:exam-list', 'employee', 'get', {}, None),
+        ('试卷列表（管理员）', 'core:exam-list', 'admin', 'get', {}, None),
+        ('试卷详情（已完成）', 'core:exam-detail', 'employee', 'get', {'pk': fixture.papers[0].id}, None),
+        ('组卷', 'core:exam-generate', 'employee', 'post', {}, {'reason': 'daily_practice'}),
+        ('开始考试', 'core:exam-start', 'employee', 'post', paper_id, None),
+        ('保存答案', 'core:exam-save-answers', 'employee', 'post', paper_id,
+         lambda s: {'answers': {str(question_id): 'A' for question_id in s['question_ids']}}),
+        ('交卷', 'core:exam-submit', 'employee', 'post', paper_id,
+         lambda s: {'answers': {str(question_id): 'A' for question_id in s['question_ids']}}),
+        ('考试统计', 'core:exam-stats', 'admin', 'get', {}, None),
+        ('考试监控', 'core:exam-monitor', 'admin', 'get', {}, None),
+        ('缓存统计', 'core:cache-stats', 'admin', 'get', {}, None),
+        ('雷达图', 'analysis:radar-data', 'employee', 'get', {}, None),
+        ('能力画像列表', 'analysis:capability-profiles', 'employee', 'get', {}, None),
+        ('能力总结', 'analysis:capability-summary', 'employee', 'get', {}, None),
+        ('能力总结（管理员查看）', 'analysis:capability-summary', 'admin', 'get', {},
+         {'user_id': fixture.employee.id}),
+        ('能力趋势', 'analysis:trend-data', 'employee', 'get', {}, None),
+        ('学习建议', 'analysis:weak-recommendations', 'employee', 'get', {}, None),
+        ('同岗位百分位', 'analysis:cohort-percentiles', 'employee', 'get', {}, None),
+        ('用户列表', 'analysis:user-list', 'admin', 'get', {}, None),
+        ('统计立方体', 'analysis:analytics-cube', 'admin', 'get', {}, {'group_by': 'department'}),
+        ('导出考试成绩', 'analysis:export-data', 'admin', 'get', {'kind': 'papers'}, None),
+        ('导出答题明细', 'analysis:export-data', 'admin', 'get', {'kind': 'records'}, None),
+        ('导出能力画像', 'analysis:export-data', 'admin', 'get', {'kind': 'capability'}, None),
+        ('提交导出任务', 'analysis:create-export-job', 'admin', 'post', {}, {'kind': 'papers'}),
+        ('导出任务详情', 'analysis:export-job-detail', 'admin', 'get', lambda s: {'pk': s['job_id']}, None),
+        ('下载导出文件', 'analysis:download-export-job', 'admin', 'get', {'pk': fixture.done_job.id}, None),
+        ('培训资料列表', 'analysis:training-materials', 'employee', 'get', {}, None),
+        ('培训资料列表（管理员）', 'analysis:training-materials', 'admin', 'get', {}, None),
+        ('创建培训资料', 'analysis:create-training-material', 'admin', 'post', {}, {
+            'title': '查询预算新资料', 'url': 'https://example.com/new',
+            'tags': [tag.id for tag in fixture.tags[:2]],
+        }),
+        ('删除试卷', 'core:exam-delete', 'admin', 'delete', lambda s: {'paper_id': fixture.papers[-1].id}, None),
+        ('登出', 'users:logout', 'employee', 'post', {}, None),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        '接口查询预算检查：按多个数据规模生成临时数据，依次请求 core、analysis、users 的全部接口，'
+        '任一接口的SQL查询数随数据规模变化时失败并输出多出的查询（临时数据会回滚）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,3,6', help='数据规模，逗号分隔（标签、题目、试卷等数量与之成正比）')
+
+    def handle(self, *args, **options):
+        sizes = sorted({int(size) for size in options['sizes'].split(',') if size.strip()})
+        if len(sizes) < 2 or sizes[0] < 1:
+            raise CommandError('至少需要两个大于0的数据规模')
+
+        # 每次请求都走完整的查询路径：不使用共享缓存、题库快照和分析副本，关闭 AI 评分
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+            QUESTION_SNAPSHOT_SETTINGS={'ENABLED': False},
+            ANALYTICS_REPLICA_SETTINGS={'ALIAS': None},
+            WRITE_BEHIND_SETTINGS={'ENABLED': False},
+            AI_GRADING_SETTINGS={**settings.AI_GRADING_SETTINGS, 'ENABLED': False},
+        ):
+            # 第一轮用于预热（ContentType 等进程内只查询一次的数据），不计入结果
+            self.run_size(sizes[0])
+            results = {size: self.run_size(size) for size in sizes}
+
+        self.report(sizes, results)
+
+    def run_size(self, scale):
+        """生成规模为 scale 的数据并请求全部接口，返回 {名称: (路由, SQL列表)}"""
+        stdout = sys.stdout
+        results = {}
+        try:
+            with transaction.atomic():
+                fixture = Fixture(scale)
+                try:
+                    cases = build_cases(fixture, {})
+                    self.check_coverage(cases)
+                    # 组卷、评分过程中的 print
+                    sys.stdout = open(os.devnull, 'w')
+                    results = self.run_cases(fixture, cases)
+                finally:
+                    if sys.stdout is not stdout:
+                        sys.stdout.close()
+                        sys.stdout = stdout
+                    fixture.cleanup()
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return results
+
+    def check_coverage(self, cases):
+        missing = route_names() - {case[1] for case in cases} - set(SKIPPED_ROUTES)
+        if missing:
+            raise CommandError(f'以下接口没有查询预算用例，请在 build_cases 中补充: {", ".join(sorted(missing))}')
+
+    def run_cases(self, fixture, cases):
+        clients = {'employee': APIClient(), 'admin': APIClient(), None: APIClient()}
+        clients['employee'].force_authenticate(user=fixture.employee)
+        clients['admin'].force_authenticate(user=fixture.admin)
+
+        state = {}
+        results = {}
+        for name, route, who, method, kwargs, data in cases:
+            kwargs = kwargs(state) if callable(kwargs) else kwargs
+            data = data(state) if callable(data) else data
+            url = reverse(route, kwargs=kwargs)
+            client = clients[who]
+
+            local_cache.clear()
+            mark_cohort_stale()
+            with CaptureQueriesContext(connection) as context:
+                if method == 'get':
+                    response = client.get(url, data)
+                elif method == 'multipart':
+                    response = client.post(url, data, format='multipart')
+                else:
+                    response = getattr(client, method)(url, data, format='json')
+                # 测试客户端在响应结束时调用 close()，流式响应在读完内容时调用
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+            if response.status_code >= 400:
+                raise CommandError(f'{name}（{url}）请求失败: {response.status_code} {content[:200]!r}')
+            results[name] = (route, [query['sql'] for query in context.captured_queries])
+
+            if route == 'core:exam-generate':
+                state['paper_id'] = response.data['id']
+                state['question_ids'] = list(
+                    ExamRecord.objects.filter(paper_id=state['paper_id']).values_list('question_id', flat=True)
+                )
+            elif route == 'analysis:create-export-job':
+                state['job_id'] = response.data['id']
+        return results
+
+    def report(self, sizes, results):
+        names = list(results[sizes[0]])
+        header = ''.join(f'{f"规模{size}":>8}' for size in sizes)
+        self.stdout.write(f'{"接口":<24}{header}')
+
+        failures = []
+        for name in names:
+            counts = [len(results[size][name][1]) for size in sizes]
+            line = f'{name:<24}' + ''.join(f'{count:>10}' for count in counts)
+            if len(set(counts)) > 1:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        for route, reason in SKIPPED_ROUTES.items():
+            self.stdout.write(f'跳过 {route}：{reason}')
+
+        for name in failures:
+            route, smallest = results[sizes[0]][name]
+            largest = results[sizes[-1]][name][1]
+            self.stdout.write(self.style.ERROR(
+                f'\n{name}（{route}）：查询数 {len(smallest)} → {len(largest)}，随数据规模增加的语句：'
+            ))
+            before = Counter(normalize_sql(sql) for sql in smallest)
+            after = Counter(normalize_sql(sql) for sql in largest)
+            examples = {normalize_sql(sql): sql for sql in largest}
+            for template, count in after.items():
+                if count != before.get(template, 0):
+                    self.stdout.write(f'  {before.get(template, 0)} → {count} 次: {examples[template]}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} 个接口的查询数随数据规模变化')
+        self.stdout.write(self.style.SUCCESS('所有接口的查询数与数据规模无关'))
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from analysis.models import CapabilityProfile
+from core.models import ExamPaper, ExamRecord, Question, WrongQuestion
+from users.models import User
+
+# 允许全表扫描的小表（标签只有几十行）
+ALLOWED_SCANS = {'tags'}
+
+
+def hot_queries(user_id):
+    """
+    热点查询：(名称, QuerySet)
+
+    与业务代码中的筛选条件保持一致，修改相关查询时同步更新此处。
+    """
+    now = timezone.now()
+    return [
+        ('组卷：员工最近做过的题目', ExamRecord.objects.filter(
+            paper__user_id=user_id, created_at__gte=now - timedelta(hours=24)
+        ).values('question_id')),
+        ('组卷：按启用状态和题型筛选题目', Question.objects.filter(
+            is_active=True, question_type=Question.QuestionType.SUBJECTIVE
+        ).values('id')),
+        ('组卷：员工的弱项标签', CapabilityProfile.objects.filter(
+            user_id=user_id, mastery_level__lt=60
+        ).exclude(tag__category='role').values('tag_id')),
+        ('能力总结：员工近30天已完成的试卷', ExamPaper.objects.filter(
+            user_id=user_id, status=ExamPaper.Status.COMPLETED, completed_at__gte=now - timedelta(days=30)
+        ).values('score_obtained', 'total_score')),
+        ('趋势：员工指定天数内已完成的试卷', ExamPaper.objects.filter(
+            user_id=user_id, status=ExamPaper.Status.COMPLETED, completed_at__gte=now - timedelta(days=90)
+        ).order_by('completed_at').values('id')),
+        ('考试统计：已完成试卷', ExamPaper.objects.filter(
+            status=ExamPaper.Status.COMPLETED, score_obtained__isnull=False
+        ).values('score_obtained')),
+        ('考试统计：近7天的试卷', ExamPaper.objects.filter(
+            created_at__gte=now - timedelta(days=7)
+        ).values('id')),
+        ('试卷列表：员工的试卷', ExamPaper.objects.filter(user_id=user_id).values('id')),
+        ('超时交卷：进行中的试卷', ExamPaper.objects.filter(
+            status=ExamPaper.Status.IN_PROGRESS, started_at__lte=now - timedelta(minutes=1)
+        ).order_by('started_at').values('id')),
+        ('考试监控：当天的试卷', ExamPaper.objects.filter(
+            created_at__gte=now - timedelta(days=1), created_at__lt=now
+        ).values('status')),
+        ('错题回顾：员工到期的错题', WrongQuestion.objects.filter(
+            user_id=user_id
+        ).order_by('due_at').values('question_id')),
+    ]
+
+
+def full_scans(plan):
+    """从 EXPLAIN QUERY PLAN 的输出中找出全表扫描的表"""
+    tables = []
+    for line in plan.splitlines():
+        detail = line.split(' ', 3)[-1].strip() if line[:1].isdigit() else line.strip()
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            table = detail.split()[1]
+            if table not in ALLOWED_SCANS:
+                tables.append(table)
+    return tables
+
+
+class Command(BaseCommand):
+    help = '对热点查询执行 EXPLAIN QUERY PLAN，出现全表扫描时失败（用于检查索引是否生效）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='检查前执行 ANALYZE 更新统计信息')
+        parser.add_argument('--verbose-plans', action='store_true', help='输出每个查询的完整执行计划')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('执行计划检查仅适用于 SQLite')
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        # 使用有试卷的员工作为查询参数，数据库为空时使用不存在的ID（执行计划与参数值无关）
+        user_id = ExamPaper.objects.values_list('user_id', flat=True).first() or User.objects.values_list(
+            'id', flat=True
+        ).first() or 0
+
+        failures = []
+        for name, queryset in hot_queries(user_id):
+            plan = queryset.explain()
+            scans = full_scans(plan)
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'✗ {name}：全表扫描 {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'✓ {name}')
+            if scans or options['verbose_plans']:
+                self.stdout.write(f'    SQL: {queryset.query}')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} 个热点查询出现全表扫描')
+        self.stdout.write(self.style.SUCCESS('所有热点查询均使用索引'))
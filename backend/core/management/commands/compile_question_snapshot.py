@@ -0,0 +1,33 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.snapshot import compile_snapshot, get_snapshot, get_snapshot_dir
+
+
+class Command(BaseCommand):
+    help = '将题库编译为各工作进程共享映射的二进制快照，并原子切换当前版本'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true',
+                            help='仅在快照不存在或编译后题目、标签有写入时重新编译（适合定时任务）')
+        parser.add_argument('--path', help='快照目录，默认 QUESTION_SNAPSHOT_SETTINGS["PATH"]')
+
+    def handle(self, *args, **options):
+        directory = options['path'] or get_snapshot_dir()
+        if options['if_stale'] and not options['path']:
+            snapshot = get_snapshot()
+            if snapshot is not None and snapshot.is_current():
+                self.stdout.write(f'快照 {snapshot.version} 与题库一致，无需编译')
+                return
+
+        start = time.perf_counter()
+        meta = compile_snapshot(directory)
+        elapsed = time.perf_counter() - start
+        path = os.path.join(directory, f"questions-{meta['version']}.bin")
+        self.stdout.write(self.style.SUCCESS(
+            f"编译完成：{meta['count']} 道题目、{len(meta['tags'])} 个标签，"
+            f"文件 {os.path.getsize(path) / 1024 / 1024:.1f} MB，耗时 {elapsed:.2f} 秒"
+        ))
+        self.stdout.write(f'当前版本：{path}')
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.item_stats import compute_item_statistics, save_item_statistics
+
+
+class Command(BaseCommand):
+    help = '基于全部答题记录计算题目的通过率(p值)、区分度和实测难度'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-sample', type=int, help='给出实测难度所需的最少作答样本数')
+        parser.add_argument('--apply-difficulty', action='store_true',
+                            help='将实测难度写回题目的难度系数（仅限样本数足够的题目）')
+        parser.add_argument('--show-worst', type=int, default=10, help='列出区分度最低的题目数量')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = compute_item_statistics(min_sample=options['min_sample'])
+        updated = save_item_statistics(stats, apply_difficulty=options['apply_difficulty'])
+        elapsed = time.perf_counter() - start
+
+        if updated and options['show_worst']:
+            worst = stats.dropna(subset=['discrimination']).sort_values('discrimination').head(options['show_worst'])
+            if len(worst):
+                self.stdout.write('区分度最低的题目:')
+                for question_id, row in worst.iterrows():
+                    self.stdout.write(
+                        f'  题目{question_id}: 样本 {int(row.sample_size)}，p值 {row.p_value:.2f}，'
+                        f'区分度 {row.discrimination:.3f}'
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'分析完成：更新 {updated} 道题目的统计'
+            f'{"并写回实测难度" if options["apply_difficulty"] else ""}，耗时 {elapsed:.2f} 秒'
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Question
+from core.dedup import index_questions, find_duplicate_clusters, load_question_summaries
+
+
+class Command(BaseCommand):
+    help = '基于MinHash/LSH检测题库中的近似重复题目并输出重复簇'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=None, help='相似度阈值，默认使用配置')
+        parser.add_argument('--rebuild', action='store_true', help='先为全部题目重新计算签名')
+        parser.add_argument('--include-inactive', action='store_true', help='同时检测已停用的题目')
+        parser.add_argument('--batch-size', type=int, default=1000, help='重建签名时每批处理的题目数')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.rebuild_signatures(options['batch_size'])
+
+        clusters = find_duplicate_clusters(
+            threshold=options['threshold'],
+            active_only=not options['include_inactive']
+        )
+        if not clusters:
+            self.stdout.write(self.style.SUCCESS('未发现近似重复题目'))
+            return
+
+        questions = load_question_summaries({question_id for cluster in clusters for question_id in cluster})
+        for index, cluster in enumerate(clusters, start=1):
+            self.stdout.write(self.style.WARNING(f'重复簇 {index}（{len(cluster)} 道题）:'))
+            for question_id in cluster:
+                question = questions.get(question_id)
+                if question:
+                    self.stdout.write(f'  [{question_id}] {question.content[:60]}')
+
+        duplicate_count = sum(len(cluster) - 1 for cluster in clusters)
+        self.stdout.write(self.style.SUCCESS(
+            f'共发现 {len(clusters)} 个重复簇，可清理 {duplicate_count} 道重复题目'
+        ))
+
+    def rebuild_signatures(self, batch_size):
+        """分批为全部题目计算签名（题干未变化的题目会被跳过）"""
+        total = 0
+        batch = []
+        for question in Question.objects.only('id', 'content').order_by('id').iterator(chunk_size=batch_size):
+            batch.append(question)
+            if len(batch) >= batch_size:
+                total += index_questions(batch)
+                batch = []
+        total += index_questions(batch)
+        self.stdout.write(f'已更新 {total} 道题目的签名')
@@ -0,0 +1,502 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as day_time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from analysis.models import CapabilityProfile
+from core.cache import QUESTION, TAG, USER, bump_generation
+from core.dedup import index_questions
+from core.models import ExamPaper, ExamRecord, Question, Tag
+
+User = get_user_model()
+
+# 能力标签（与 init_sample_data 一致），标签数超过时加序号扩展
+BASE_TAGS = (
+    ('票务处理', Tag.Category.POSITION),
+    ('乘客服务', Tag.Category.POSITION),
+    ('安全检查', Tag.Category.POSITION),
+    ('应急处理', Tag.Category.EMERGENCY),
+    ('设备故障', Tag.Category.EMERGENCY),
+    ('沟通协调', Tag.Category.COMPREHENSIVE),
+    ('规章制度', Tag.Category.COMPREHENSIVE),
+)
+
+# (岗位, 人数占比)
+POSITIONS = (
+    ('站务员', 0.45),
+    ('客运值班员', 0.20),
+    ('售票员', 0.15),
+    ('安检员', 0.12),
+    ('值班站长', 0.08),
+)
+
+# 车站按排名递减分配人数
+DEPARTMENTS = (
+    '北京西站', '北京南站', '北京站', '北京北站', '北京朝阳站', '丰台站',
+    '清河站', '大兴机场站', '通州站', '昌平站', '怀柔北站', '密云站',
+)
+
+SURNAMES = '王李张刘陈杨赵黄周吴徐孙胡朱高林何郭马罗'
+GIVEN_NAMES = ('伟', '芳', '娜', '敏', '静', '磊', '洋', '勇', '艳', '杰', '军', '强', '丽', '涛', '明', '超')
+
+QUESTION_TYPES = (
+    (Question.QuestionType.SINGLE, 0.50),
+    (Question.QuestionType.MULTIPLE, 0.20),
+    (Question.QuestionType.TRUE_FALSE, 0.20),
+    (Question.QuestionType.SUBJECTIVE, 0.10),
+)
+DIFFICULTY_WEIGHTS = (0.10, 0.25, 0.35, 0.20, 0.10)  # 难度 1-5
+REASON_WEIGHTS = (
+    (ExamPaper.GenerationReason.DAILY_PRACTICE, 0.70),
+    (ExamPaper.GenerationReason.ERROR_REVIEW, 0.20),
+    (ExamPaper.GenerationReason.MANDATORY_ASSESSMENT, 0.10),
+)
+# 开考时刻（小时）：早班、白班交接前后最集中
+START_HOURS = np.arange(7, 21)
+START_HOUR_WEIGHTS = np.array([4, 8, 10, 8, 5, 3, 5, 8, 9, 7, 5, 3, 2, 1], dtype=np.float64)
+
+SCENARIOS = (
+    '遇到该情况时，首先应当如何处理？',
+    '以下哪项做法符合作业规范？',
+    '处理过程中需要向哪些岗位报告？',
+    '该情形下旅客提出异议，应如何答复？',
+    '夜间客流低峰时段出现该情况，正确的处置顺序是？',
+    '设备巡检中发现异常，下一步应当？',
+)
+SUBJECTIVE_ANSWER = '按规定程序处置，及时报告值班站长并做好记录'
+OPTION_KEYS = np.array(list('ABCD'))
+
+
+class _Progress:
+    """批量写入进度"""
+
+    def __init__(self, stdout, label, total):
+        self.stdout, self.label, self.total = stdout, label, total
+        self.done = 0
+        self.started = self.last = time.perf_counter()
+
+    def add(self, count):
+        self.done += count
+        now = time.perf_counter()
+        if now - self.last >= 5 or self.done >= self.total:
+            rate = self.done / max(now - self.started, 1e-6)
+            self.stdout.write(f'  {self.label}: {self.done}/{self.total}（{rate:.0f} 行/秒）')
+            self.last = now
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """bulk_create 默认用当前时间覆盖 created_at/updated_at，生成历史数据时保留指定的时间"""
+    fields = [model._meta.get_field(name) for model in models for name in ('created_at', 'updated_at')]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def sample_distinct(rng, population_size, rows, count):
+    """每行从 [0, population_size) 中不重复地抽取 count 个（先有放回抽取，只对出现重复的行重抽）"""
+    picks = rng.integers(0, population_size, size=(rows, count))
+    ordered = np.sort(picks, axis=1)
+    for row in np.flatnonzero((np.diff(ordered, axis=1) == 0).any(axis=1)):
+        picks[row] = rng.choice(population_size, count, replace=False)
+    return picks
+
+
+def zipf_weights(count, exponent=0.8):
+    weights = 1 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+class Command(BaseCommand):
+    help = (
+        '生成基准测试数据：按规模参数批量写入员工、题目、试卷和答题记录，分布接近实际'
+        '（岗位、车站、题型、难度、答题正确率），相同随机种子生成相同的数据'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='员工数')
+        parser.add_argument('--questions', type=int, default=2000, help='题目数')
+        parser.add_argument('--tags', type=int, default=len(BASE_TAGS), help='能力标签数（岗位标签按岗位另建）')
+        parser.add_argument('--papers-per-user', type=float, default=20, help='每名员工的平均试卷数（泊松分布）')
+        parser.add_argument('--questions-per-paper', type=int, default=None,
+                            help='每张试卷的题目数，默认 DEFAULT_EXAM_QUESTION_COUNT')
+        parser.add_argument('--days', type=int, default=180, help='考试历史跨度（天）')
+        parser.add_argument('--until', default=None, help='历史截止日期 YYYY-MM-DD（不含当天），默认今天')
+        parser.add_argument('--seed', type=int, default=20240601, help='随机种子')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每个事务写入的答题记录数')
+        parser.add_argument('--prefix', default='BM', help='工号前缀（字母），也用于标记生成的题目')
+        parser.add_argument('--password', default='benchmark123', help='生成的员工账号的密码')
+        parser.add_argument('--clear', action='store_true', help='先删除相同前缀的基准数据')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if not prefix.isalpha():
+            raise CommandError('--prefix 只能包含字母（工号需符合 字母+数字 的格式）')
+        self.prefix = prefix
+        self.question_marker = f'[{prefix}] '
+        self.chunk_size = max(100, options['chunk_size'])
+        per_paper = options['questions_per_paper'] or settings.ASSESSMENT_SETTINGS['DEFAULT_EXAM_QUESTION_COUNT']
+        if options['questions'] * 0.9 < per_paper:
+            raise CommandError('题目数太少，不足以组成试卷')
+
+        until = datetime.strptime(options['until'], '%Y-%m-%d').date() if options['until'] else timezone.localdate()
+        self.until = timezone.make_aware(datetime.combine(until, day_time.min))
+
+        started = time.perf_counter()
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(job_number__startswith=prefix).exists():
+            raise CommandError(f'已存在工号前缀为 {prefix} 的数据，使用 --clear 删除后重新生成')
+
+        rng = np.random.default_rng(options['seed'])
+        tags, role_tags = self.create_tags(options['tags'])
+        questions = self.create_questions(rng, options['questions'], tags, role_tags, options['days'])
+        users = self.draw_users(rng, options['users'], len(tags))
+        papers = self.draw_papers(rng, users, options['papers_per_user'], options['days'])
+        self.create_users(users, papers, options['password'])
+        totals = self.create_papers(rng, users, papers, questions, per_paper)
+        profiles = self.create_capability_profiles(users, tags, totals)
+
+        bump_generation(QUESTION)
+        bump_generation(TAG)
+        bump_generation(USER)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'生成完成（{time.perf_counter() - started:.1f} 秒）：员工 {len(users["ids"])}，'
+            f'题目 {len(questions["ids"])}，试卷 {len(papers["user"])}，'
+            f'答题记录 {len(papers["user"]) * per_paper}，能力画像 {profiles}'
+        ))
+        self.stdout.write(
+            f'员工工号 {prefix}000001 起，密码 {options["password"]}。'
+            '题目作答统计和错题本可分别用 compute_item_stats、rebuild_wrong_questions 命令生成。'
+        )
+
+    def clear(self):
+        """删除相同前缀的员工（及其试卷、答题记录、能力画像、错题本）和题目，标签保留"""
+        users = User.objects.filter(job_number__startswith=self.prefix)
+        user_sql, user_params = users.values('id').query.sql_with_params()
+        papers_sql = f'SELECT id FROM {ExamPaper._meta.db_table} WHERE user_id IN ({user_sql})'
+        # 答题记录、试卷数量大，直接按子查询删除，不逐行加载和发送删除信号
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {ExamRecord._meta.db_table} WHERE paper_id IN ({papers_sql})', user_params
+            )
+            records = cursor.rowcount
+            for model in (ExamPaper, CapabilityProfile):
+                cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE user_id IN ({user_sql})', user_params)
+            deleted_users = users.delete()[1].get(User._meta.label, 0)
+            deleted_questions = Question.objects.filter(
+                content__startswith=self.question_marker
+            ).delete()[1].get(Question._meta.label, 0)
+        self.stdout.write(f'已删除员工 {deleted_users}，题目 {deleted_questions}，答题记录 {records}')
+
+    def create_tags(self, count):
+        """能力标签和各岗位的 role 标签（已存在同名标签时复用）"""
+        tags = []
+        for index in range(count):
+            name, category = BASE_TAGS[index % len(BASE_TAGS)]
+            if index >= len(BASE_TAGS):
+                name = f'{name}{index // len(BASE_TAGS) + 1}'
+            tags.append(Tag.objects.get_or_create(name=name, defaults={'category': category})[0])
+        role_tags = [
+            Tag.objects.get_or_create(name=position, defaults={'category': Tag.Category.ROLE})[0]
+            for position, _ in POSITIONS
+        ]
+        return tags, role_tags
+
+    def create_questions(self, rng, count, tags, role_tags, days):
+        """
+        批量写入题目，题型和难度按比例分布；每题一个主能力标签，部分题目另有一个能力标签，
+        主观题和部分客观题关联岗位标签
+
+        Returns:
+            dict: 题目ID、题型、难度、主能力标签序号、正确答案/错误答案、是否启用（numpy 数组）
+        """
+        type_values = np.array([value for value, _ in QUESTION_TYPES])
+        types = rng.choice(type_values, size=count, p=[weight for _, weight in QUESTION_TYPES])
+        difficulty = rng.choice(np.arange(1, 6), size=count, p=DIFFICULTY_WEIGHTS)
+        primary = rng.choice(len(tags), size=count, p=zipf_weights(len(tags), 0.5))
+        secondary = (primary + rng.integers(1, max(len(tags), 2), size=count)) % len(tags)
+        has_secondary = (rng.random(count) < 0.3) & (len(tags) > 1)
+        position_weights = [weight for _, weight in POSITIONS]
+        role = rng.choice(len(role_tags), size=count, p=position_weights)
+        has_role = (types == Question.QuestionType.SUBJECTIVE) | (rng.random(count) < 0.4)
+        active = rng.random(count) < 0.97
+        scenario = rng.integers(0, len(SCENARIOS), size=count)
+        single_answer = rng.integers(0, 4, size=count)
+        multiple_answer = rng.random((count, 4)) < 0.5
+        multiple_answer[np.arange(count), single_answer] = True
+        true_answer = rng.random(count) < 0.5
+        created_offsets = rng.uniform(days, days + 90, size=count) * 86400
+
+        correct, wrong = [], []
+        for index in range(count):
+            question_type = types[index]
+            if question_type == Question.QuestionType.SINGLE:
+                key = OPTION_KEYS[single_answer[index]]
+                correct.append(key)
+                wrong.append(OPTION_KEYS[(single_answer[index] + 1) % 4])
+            elif question_type == Question.QuestionType.MULTIPLE:
+                keys = OPTION_KEYS[multiple_answer[index]]
+                correct.append(','.join(keys))
+                wrong.append(keys[0])
+            elif question_type == Question.QuestionType.TRUE_FALSE:
+                correct.append('True' if true_answer[index] else 'False')
+                wrong.append('False' if true_answer[index] else 'True')
+            else:
+                correct.append('答题要点：及时报告、按预案处置、做好旅客安抚和记录')
+                wrong.append(SUBJECTIVE_ANSWER)
+
+        ids = []
+        progress = _Progress(self.stdout, '题目', count)
+        Through = Question.tags.through
+        with preserve_timestamps(Question):
+            for start in range(0, count, self.chunk_size):
+                batch = range(start, min(start + self.chunk_size, count))
+                objects = [
+                    Question(
+                        content=(
+                            f'{self.question_marker}【{tags[primary[index]].name}】'
+                            f'{SCENARIOS[scenario[index]]}（第{index + 1}题）'
+                        ),
+                        question_type=types[index],
+                        options=self.question_options(types[index]),
+                        correct_answer=correct[index],
+                        difficulty=int(difficulty[index]),
+                        is_active=bool(active[index]),
+                        created_at=self.until - timedelta(seconds=float(created_offsets[index])),
+                        updated_at=self.until - timedelta(seconds=float(created_offsets[index])),
+                    )
+                    for index in batch
+                ]
+                with transaction.atomic():
+                    created = Question.objects.bulk_create(objects)
+                    links = []
+                    for index, question in zip(batch, created):
+                        links.append((question.id, tags[primary[index]].id))
+                        if has_secondary[index]:
+                            links.append((question.id, tags[secondary[index]].id))
+                        if has_role[index]:
+                            links.append((question.id, role_tags[role[index]].id))
+                    # 关联表直接批量插入，不实例化中间模型
+                    with connection.cursor() as cursor:
+                        cursor.executemany(
+                            f'INSERT INTO {Through._meta.db_table} (question_id, tag_id) VALUES (%s, %s)', links
+                        )
+                    # bulk_create 不触发 post_save，需手动维护重复检测索引
+                    index_questions(created, force=True)
+                ids.extend(question.id for question in created)
+                progress.add(len(created))
+
+        return {
+            'ids': np.array(ids, dtype=np.int64),
+            'types': types,
+            'difficulty': difficulty,
+            'primary': primary,
+            'correct': np.array(correct, dtype=object),
+            'wrong': np.array(wrong, dtype=object),
+            'active': active,
+        }
+
+    def question_options(self, question_type):
+        if question_type == Question.QuestionType.TRUE_FALSE:
+            return [{'key': 'True', 'text': '正确'}, {'key': 'False', 'text': '错误'}]
+        if question_type == Question.QuestionType.SUBJECTIVE:
+            return []
+        return [{'key': key, 'text': f'选项{key}'} for key in OPTION_KEYS]
+
+    def draw_users(self, rng, count, tag_count):
+        """员工属性：岗位、车站、姓名、总体能力和各标签能力（标准正态）"""
+        return {
+            'position': rng.choice(len(POSITIONS), size=count, p=[weight for _, weight in POSITIONS]),
+            'department': rng.choice(len(DEPARTMENTS), size=count, p=zipf_weights(len(DEPARTMENTS))),
+            'surname': rng.integers(0, len(SURNAMES), size=count),
+            'given_name': rng.integers(0, len(GIVEN_NAMES), size=count),
+            'ability': rng.normal(0, 1, size=count),
+            'skill': rng.normal(0, 0.6, size=(count, tag_count)),
+            'joined_days': rng.integers(0, 365, size=count),
+        }
+
+    def draw_papers(self, rng, users, per_user, days):
+        """试卷属性：所属员工、创建时间、开考延迟、状态和生成原因"""
+        counts = np.maximum(rng.poisson(per_user, size=len(users['position'])), 1)
+        owner = np.repeat(np.arange(len(counts)), counts)
+        total = len(owner)
+        day_offsets = rng.integers(1, days + 1, size=total)
+        hours = rng.choice(START_HOURS, size=total, p=START_HOUR_WEIGHTS / START_HOUR_WEIGHTS.sum())
+        created = -day_offsets * 86400 + hours * 3600 + rng.integers(0, 3600, size=total)
+        order = np.lexsort((created, owner))  # 每名员工的试卷按时间顺序
+        return {
+            'user': owner[order],
+            'created': created[order],
+            'start_delay': rng.exponential(600, size=total),
+            'completed': rng.random(total) < 0.95,
+            'reason': rng.choice(
+                np.array([value for value, _ in REASON_WEIGHTS]), size=total,
+                p=[weight for _, weight in REASON_WEIGHTS]
+            ),
+        }
+
+    def create_users(self, users, papers, password):
+        """批量写入员工，所有账号使用同一个密码哈希；最后登录时间为最后一次考试的时间"""
+        count = len(users['position'])
+        password_hash = make_password(password)
+        last_created = np.full(count, np.nan)
+        last_created[papers['user']] = papers['created']  # 每名员工的试卷已按时间排序，最后赋值的即最近一次
+
+        ids = []
+        progress = _Progress(self.stdout, '员工', count)
+        for start in range(0, count, self.chunk_size):
+            objects = []
+            for index in range(start, min(start + self.chunk_size, count)):
+                job_number = f'{self.prefix}{index + 1:06d}'
+                objects.append(User(
+                    username=job_number.lower(),
+                    job_number=job_number,
+                    password=password_hash,
+                    first_name=SURNAMES[users['surname'][index]],
+                    last_name=GIVEN_NAMES[users['given_name'][index]],
+                    position=POSITIONS[users['position'][index]][0],
+                    department=DEPARTMENTS[users['department'][index]],
+                    date_joined=self.until - timedelta(days=int(users['joined_days'][index]) + 180),
+                    last_login=(
+                        self.until + timedelta(seconds=float(last_created[index]))
+                        if not np.isnan(last_created[index]) else None
+                    ),
+                ))
+            with transaction.atomic():
+                ids.extend(user.id for user in User.objects.bulk_create(objects))
+            progress.add(len(objects))
+        users['ids'] = np.array(ids, dtype=np.int64)
+
+    def create_papers(self, rng, users, papers, questions, per_paper):
+        """
+        按批写入试卷和答题记录
+
+        答对概率按 Rasch 模型：logistic(1.2 × (总体能力 + 标签能力) − 0.8 × (难度 − 3) + 0.8)，
+        平均正确率约六成；主观题的 AI 评分与能力正相关，60 分以上算合格。
+
+        Returns:
+            tuple: 已完成试卷中各 (员工, 能力标签) 的 (答对数, 作答数)
+        """
+        active = np.flatnonzero(questions['active'])
+        tag_count = users['skill'].shape[1]
+        correct_totals = np.zeros((len(users['ids']), tag_count))
+        answer_totals = np.zeros((len(users['ids']), tag_count))
+        total_score = 100.0
+        score_per_question = total_score / per_paper
+
+        total_papers = len(papers['user'])
+        papers_per_batch = max(1, self.chunk_size // per_paper)
+        progress = _Progress(self.stdout, '答题记录', total_papers * per_paper)
+        with preserve_timestamps(ExamPaper, ExamRecord):
+            for start in range(0, total_papers, papers_per_batch):
+                stop = min(start + papers_per_batch, total_papers)
+                size = stop - start
+                owner = papers['user'][start:stop]
+                completed = papers['completed'][start:stop]
+
+                picked = active[sample_distinct(rng, len(active), size, per_paper)]
+                primary = questions['primary'][picked]
+                theta = users['ability'][owner][:, None] + users['skill'][owner[:, None], primary]
+                logit = 1.2 * theta - 0.8 * (questions['difficulty'][picked] - 3) + 0.8
+                is_correct = rng.random((size, per_paper)) < 1 / (1 + np.exp(-logit))
+                subjective = questions['types'][picked] == Question.QuestionType.SUBJECTIVE
+                ai_score = np.clip(rng.normal(55 + 15 * theta, 12), 0, 100).round(1)
+                is_correct = np.where(subjective, ai_score >= 60, is_correct)
+                score = np.where(
+                    subjective, score_per_question * ai_score / 100, np.where(is_correct, score_per_question, 0.0)
+                )
+                durations = np.clip(rng.lognormal(3.4, 0.6, size=(size, per_paper)), 5, 600).astype(np.int64)
+
+                created_at = [self.until + timedelta(seconds=int(value)) for value in papers['created'][start:stop]]
+                started_at = [
+                    value + timedelta(seconds=float(delay))
+                    for value, delay in zip(created_at, papers['start_delay'][start:stop])
+                ]
+                completed_at = [
+                    value + timedelta(seconds=int(total)) for value, total in zip(started_at, durations.sum(axis=1))
+                ]
+
+                paper_objects = [
+                    ExamPaper(
+                        user_id=int(users['ids'][owner[row]]),
+                        title=f'{ExamPaper.GenerationReason(papers["reason"][start + row]).label}试卷',
+                        total_score=total_score,
+                        score_obtained=float(score[row].sum()) if completed[row] else None,
+                        status=ExamPaper.Status.COMPLETED if completed[row] else ExamPaper.Status.NOT_STARTED,
+                        generation_reason=papers['reason'][start + row],
+                        started_at=started_at[row] if completed[row] else None,
+                        completed_at=completed_at[row] if completed[row] else None,
+                        created_at=created_at[row],
+                        updated_at=completed_at[row] if completed[row] else created_at[row],
+                    )
+                    for row in range(size)
+                ]
+
+                with transaction.atomic():
+                    paper_ids = [paper.id for paper in ExamPaper.objects.bulk_create(paper_objects)]
+                    record_objects = []
+                    for row in range(size):
+                        done = completed[row]
+                        for column in range(per_paper):
+                            question = picked[row, column]
+                            if not done:
+                                answer, correct, gained, ai, duration = '', None, 0.0, None, 0
+                            else:
+                                correct = bool(is_correct[row, column])
+                                answer = questions['correct' if correct else 'wrong'][question]
+                                if subjective[row, column]:
+                                    answer, ai = SUBJECTIVE_ANSWER, float(ai_score[row, column])
+                                else:
+                                    ai = None
+                                gained = float(score[row, column])
+                                duration = int(durations[row, column])
+                            record_objects.append(ExamRecord(
+                                paper_id=paper_ids[row],
+                                question_id=int(questions['ids'][question]),
+                                user_answer=answer,
+                                is_correct=correct,
+                                score_gained=gained,
+                                ai_score=ai,
+                                duration=duration,
+                                created_at=created_at[row],
+                                updated_at=completed_at[row] if done else created_at[row],
+                            ))
+                    ExamRecord.objects.bulk_create(record_objects)
+                progress.add(len(record_objects))
+
+                done_rows = np.flatnonzero(completed)
+                np.add.at(correct_totals, (owner[done_rows][:, None], primary[done_rows]), is_correct[done_rows])
+                np.add.at(answer_totals, (owner[done_rows][:, None], primary[done_rows]), 1)
+        return correct_totals, answer_totals
+
+    def create_capability_profiles(self, users, tags, totals):
+        """按已完成试卷中各能力标签的正确率（加平滑）生成能力画像"""
+        correct_totals, answer_totals = totals
+        mastery = (correct_totals + 1) / (answer_totals + 2) * 100
+        rows, columns = np.nonzero(answer_totals)
+        objects = [
+            CapabilityProfile(
+                user_id=int(users['ids'][row]),
+                tag_id=tags[column].id,
+                mastery_level=round(float(mastery[row, column]), 2),
+            )
+            for row, column in zip(rows, columns)
+        ]
+        for start in range(0, len(objects), self.chunk_size):
+            with transaction.atomic():
+                CapabilityProfile.objects.bulk_create(objects[start:start + self.chunk_size])
+        return len(objects)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import QuestionImporter
+
+
+class Command(BaseCommand):
+    help = '从Excel(.xlsx)/CSV文件批量导入题目'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='题库文件路径')
+        parser.add_argument('--format', choices=['xlsx', 'csv'], help='文件格式，默认根据扩展名判断')
+        parser.add_argument('--chunk-size', type=int, default=500, help='每批写入的题目数量')
+        parser.add_argument('--create-tags', action='store_true', help='自动创建文件中不存在的标签')
+        parser.add_argument('--skip-duplicates', action='store_true', help='跳过与已有题目近似重复的题目')
+        parser.add_argument('--no-duplicate-check', action='store_true', help='不做近似重复检查')
+        parser.add_argument('--dry-run', action='store_true', help='只校验不写入')
+
+    def handle(self, *args, **options):
+        importer = QuestionImporter(
+            chunk_size=options['chunk_size'],
+            create_missing_tags=options['create_tags'],
+            check_duplicates=not options['no_duplicate_check'],
+            skip_duplicates=options['skip_duplicates'],
+            dry_run=options['dry_run'],
+        )
+
+        start = time.perf_counter()
+        try:
+            result = importer.import_file(options['path'], options['format'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'导入失败: {str(e)}')
+        elapsed = time.perf_counter() - start
+
+        for row_number, message in result.errors:
+            self.stdout.write(self.style.ERROR(f'  第{row_number}行: {message}'))
+        for row_number, matches in result.duplicates:
+            described = ', '.join(
+                f'{"题目" if kind == "question" else "第"}{match_id}{"" if kind == "question" else "行"}'
+                f'({similarity:.2f})'
+                for kind, match_id, similarity in matches[:3]
+            )
+            self.stdout.write(self.style.WARNING(f'  第{row_number}行疑似重复: {described}'))
+        if result.created_tags:
+            self.stdout.write(f'  新建标签: {", ".join(result.created_tags)}')
+
+        action = '校验' if options['dry_run'] else '导入'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action}完成：共 {result.total_rows} 行，成功 {result.created} 道，'
+            f'错误 {len(result.errors)} 行，疑似重复 {len(result.duplicates)} 行'
+            f'（跳过 {result.skipped_duplicates} 行），耗时 {elapsed:.2f} 秒'
+        ))
@@ -224,7 +224,7 @@ class Command(BaseCommand):
                 profile, created = CapabilityProfile.objects.get_or_create(
                     user=user,
                     tag=tag,
-                    defaults={'mastery_level': mastery_level}
+                    defaults={'mastery_level': mastery_level, 'initial_level': mastery_level}
                 )
 
                 if created:
@@ -0,0 +1,331 @@
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.mock_llm import MockLLMServer
+from users.models import User
+
+USER_PREFIX = 'LTEXAM'
+
+# 报告中的接口顺序
+ENDPOINTS = ['登录', '组卷', '开始考试', '保存答案', '交卷']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def pad(text, width):
+    """按显示宽度左对齐（中文占两格）"""
+    text = str(text)
+    used = sum(2 if unicodedata.east_asian_width(char) in 'WF' else 1 for char in text)
+    return text + ' ' * max(width - used, 0)
+
+
+def pick_answer(question, rng):
+    """按题型随机作答"""
+    keys = [option['key'] for option in question.get('options') or [] if isinstance(option, dict)]
+    question_type = question['question_type']
+    if question_type == 'subjective':
+        return '按规定立即上报值班站长，设置防护并引导乘客疏散，事后填写记录。'
+    if question_type == 'true_false':
+        return rng.choice(keys or ['True', 'False'])
+    if question_type == 'multiple' and keys:
+        return ','.join(sorted(rng.sample(keys, rng.randint(1, len(keys)))))
+    return rng.choice(keys or ['A', 'B', 'C', 'D'])
+
+
+class Stats:
+    """各线程共用的统计：接口延迟、状态码、锁错误、在途交卷数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.status_counts = {name: {} for name in ENDPOINTS}
+        self.locked = 0
+        self.errors = {}
+        self.completed = 0
+        self.submitting = 0
+        self.max_submitting = 0
+
+    def record(self, endpoint, elapsed, status_code, text=''):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed * 1000)
+            counts = self.status_counts[endpoint]
+            counts[status_code] = counts.get(status_code, 0) + 1
+            if 'locked' in text:
+                self.locked += 1
+
+    def error(self, message):
+        with self.lock:
+            self.errors[message] = self.errors.get(message, 0) + 1
+
+
+class Command(BaseCommand):
+    help = ('考试日端到端压测：模拟多名员工同时登录、组卷、开始考试、按模拟时间作答并交卷，'
+            '主观题由本机模拟的 AI 评分服务评分；统计各接口 P50/P95/P99 延迟、吞吐量、锁错误和评分积压')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='同时参加考试的员工数（临时账号会删除）')
+        parser.add_argument('--server', choices=['runserver', 'gunicorn', 'none'], default='runserver',
+                            help='在数据库副本上启动的被测服务；none 表示压测 --base-url 指向的已运行服务')
+        parser.add_argument('--base-url', default='', help='--server none 时被测服务的地址，如 http://127.0.0.1:8000')
+        parser.add_argument('--port', type=int, default=0, help='被测服务端口，默认自动分配')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn 工作进程数')
+        parser.add_argument('--threads', type=int, default=4, help='gunicorn 每个工作进程的线程数')
+        parser.add_argument('--mock-port', type=int, default=0,
+                            help='模拟评分服务端口，默认自动分配（--server none 时被测服务的 AI_BASE_URL 需指向该端口）')
+        parser.add_argument('--llm-latency', type=float, default=1.0, help='模拟评分的延迟中位数（秒）')
+        parser.add_argument('--llm-failure-rate', type=float, default=0.05, help='模拟评分返回 500 的比例')
+        parser.add_argument('--think-time', type=float, default=45, help='每道题的平均作答时间（模拟秒）')
+        parser.add_argument('--time-scale', type=float, default=60, help='时间压缩倍数：模拟 60 秒按 1 秒执行')
+        parser.add_argument('--ramp', type=float, default=10, help='员工在多少秒内陆续进入考试')
+        parser.add_argument('--save-every', type=int, default=3, help='每答几道题保存一次答案，0 表示不保存')
+        parser.add_argument('--timeout', type=float, default=60, help='单个请求的超时时间（秒）')
+        parser.add_argument('--password', default='Loadtest#2024', help='临时账号的密码')
+        parser.add_argument('--seed', type=int, default=2024, help='随机种子')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['time_scale'] <= 0:
+            raise CommandError('--users 和 --time-scale 必须大于0')
+        if not 0 <= options['llm_failure_rate'] <= 1:
+            raise CommandError('--llm-failure-rate 必须在 0 到 1 之间')
+        if options['server'] == 'none' and not options['base_url']:
+            raise CommandError('--server none 时必须指定 --base-url')
+        if options['server'] == 'gunicorn' and not shutil.which('gunicorn'):
+            raise CommandError('未安装 gunicorn，请先 pip install gunicorn 或使用 --server runserver')
+
+        mock = MockLLMServer(
+            port=options['mock_port'],
+            latency=options['llm_latency'],
+            failure_rate=options['llm_failure_rate'],
+            seed=options['seed'],
+        ).start()
+        workdir = tempfile.mkdtemp(prefix='loadtest-exam-day-')
+        server = None
+        try:
+            if options['server'] == 'none':
+                base_url = options['base_url'].rstrip('/')
+                self.stdout.write(f'被测服务: {base_url}（需以 AI_BASE_URL={mock.base_url} 启动）')
+            else:
+                # 临时账号和压测产生的试卷只写入副本
+                self.use_database_copy(workdir)
+                port = options['port'] or free_port()
+                base_url = f'http://127.0.0.1:{port}'
+            job_numbers = self.create_users(options['users'], options['password'])
+            if options['server'] != 'none':
+                server = self.start_server(options, workdir, port, mock.base_url)
+            self.wait_ready(base_url, server)
+
+            stats, elapsed, backlog = self.run(base_url, job_numbers, options, mock)
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+            mock.stop()
+            User.objects.filter(job_number__startswith=USER_PREFIX).delete()
+            connection.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.report(stats, elapsed, backlog, mock, options)
+        if stats.completed < options['users']:
+            raise CommandError(f'{options["users"] - stats.completed} 名员工未能完成考试')
+
+    def use_database_copy(self, workdir):
+        """用在线备份复制一份数据库，当前进程和被测服务都使用副本"""
+        if connection.vendor != 'sqlite':
+            raise CommandError('自动启动被测服务仅适用于 SQLite，其他数据库请使用 --server none')
+        path = os.path.join(workdir, 'db.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+        connection.close()
+        connection.settings_dict['NAME'] = path
+        self.database = path
+
+    def create_users(self, count, password):
+        """创建临时员工账号（沿用已有员工的岗位，组卷时能匹配到岗位标签的题目）"""
+        User.objects.filter(job_number__startswith=USER_PREFIX).delete()
+        position = User.objects.filter(
+            is_staff=False
+        ).exclude(position='').values_list('position', flat=True).order_by('id').first() or '站务员'
+        encoded = make_password(password)
+        User.objects.bulk_create([
+            User(
+                username=f'loadtest_exam_{index}',
+                job_number=f'{USER_PREFIX}{index:05d}',
+                password=encoded,
+                position=position,
+                department='压测',
+            )
+            for index in range(count)
+        ])
+        return [f'{USER_PREFIX}{index:05d}' for index in range(count)]
+
+    def start_server(self, options, workdir, port, mock_url):
+        env = {
+            **os.environ,
+            'SQLITE_PATH': self.database,
+            'ANALYTICS_REPLICA_PATH': os.path.join(workdir, 'analytics.sqlite3'),
+            'AI_BASE_URL': mock_url,
+            'PYTHONUNBUFFERED': '1',
+        }
+        if options['server'] == 'gunicorn':
+            command = [
+                'gunicorn', 'config.wsgi:application', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(options['workers']), '--threads', str(options['threads']),
+                '--timeout', str(int(options['timeout']) + 30),
+            ]
+        else:
+            command = [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+        self.stdout.write(f'启动被测服务: {" ".join(command)}')
+        # 服务输出写入文件，启动失败时显示末尾几行
+        self.server_log = os.path.join(workdir, 'server.log')
+        with open(self.server_log, 'w') as log:
+            return subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, base_url, server, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if server is not None and server.poll() is not None:
+                break
+            try:
+                requests.get(f'{base_url}/api/auth/profile/', timeout=2)
+                return
+            except requests.RequestException:
+                time.sleep(0.3)
+        tail = ''
+        if server is not None:
+            with open(self.server_log) as log:
+                tail = ''.join(log.readlines()[-10:])
+        raise CommandError(f'被测服务未就绪: {base_url}\n{tail}')
+
+    def run(self, base_url, job_numbers, options, mock):
+        """返回 (统计, 耗时, [(评分在途数, 交卷在途数)] 采样)"""
+        stats = Stats()
+        scale = options['time_scale']
+        timeout = options['timeout']
+        finished = threading.Event()
+        backlog = []
+
+        def call(session, endpoint, method, path, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = session.request(method, f'{base_url}/api/{path}', timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                stats.record(endpoint, time.perf_counter() - start, type(e).__name__)
+                raise
+            stats.record(endpoint, time.perf_counter() - start, response.status_code, response.text[:500])
+            if response.status_code >= 400:
+                raise RuntimeError(f'{endpoint} {response.status_code}: {response.text[:80]}')
+            return response.json()
+
+        def employee(index, job_number):
+            rng = random.Random(options['seed'] * 100003 + index)
+            time.sleep(options['ramp'] * index / len(job_numbers))
+            session = requests.Session()
+            try:
+                token = call(session, '登录', 'POST', 'auth/login/',
+                             json={'job_number': job_number, 'password': options['password']})['token']
+                session.headers['Authorization'] = f'Token {token}'
+                paper = call(session, '组卷', 'POST', 'exam/generate/', json={'reason': 'daily_practice'})
+                exam = call(session, '开始考试', 'POST', f'exam/{paper["id"]}/start/')
+
+                answers = {}
+                for number, question in enumerate(exam['questions'], start=1):
+                    time.sleep(rng.expovariate(1 / options['think_time']) / scale)
+                    answers[str(question['id'])] = pick_answer(question, rng)
+                    if options['save_every'] and number % options['save_every'] == 0:
+                        call(session, '保存答案', 'POST', f'exam/{paper["id"]}/answers/', json={'answers': answers})
+
+                with stats.lock:
+                    stats.submitting += 1
+                    stats.max_submitting = max(stats.max_submitting, stats.submitting)
+                try:
+                    call(session, '交卷', 'POST', f'exam/{paper["id"]}/submit/', json={'answers': answers})
+                finally:
+                    with stats.lock:
+                        stats.submitting -= 1
+                with stats.lock:
+                    stats.completed += 1
+            except Exception as e:
+                stats.error(str(e)[:100] or type(e).__name__)
+            finally:
+                session.close()
+
+        def sample():
+            while not finished.wait(0.5):
+                backlog.append((mock.in_flight, stats.submitting))
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        threads = [threading.Thread(target=employee, args=(index, job_number))
+                   for index, job_number in enumerate(job_numbers)]
+        start = time.perf_counter()
+        sampler.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        finished.set()
+        sampler.join()
+        return stats, elapsed, backlog
+
+    def report(self, stats, elapsed, backlog, mock, options):
+        self.stdout.write(f'{options["users"]} 名员工，耗时 {elapsed:.1f} 秒，'
+                          f'完成考试 {stats.completed} 人')
+        self.stdout.write(f'{pad("接口", 10)}{"次数":>6}{"失败":>6}{"P50(ms)":>10}{"P95(ms)":>10}{"P99(ms)":>10}')
+        total_requests = 0
+        for endpoint in ENDPOINTS:
+            values = stats.latencies[endpoint]
+            counts = stats.status_counts[endpoint]
+            total_requests += len(values)
+            failed = sum(count for code, count in counts.items() if not (isinstance(code, int) and code < 400))
+            if values:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                self.stdout.write(f'{pad(endpoint, 10)}{len(values):>6}{failed:>6}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}')
+            else:
+                self.stdout.write(f'{pad(endpoint, 10)}{0:>6}{0:>6}{"-":>10}{"-":>10}{"-":>10}')
+            if failed:
+                self.stdout.write('    状态码: ' + ', '.join(
+                    f'{code}×{count}' for code, count in sorted(counts.items(), key=lambda item: str(item[0]))
+                ))
+        self.stdout.write(f'吞吐量: 交卷 {stats.completed / elapsed:.2f} 次/秒，请求 {total_requests / elapsed:.1f} 次/秒')
+        self.stdout.write(f'database is locked: {stats.locked} 次')
+        for message, count in sorted(stats.errors.items(), key=lambda item: -item[1])[:5]:
+            self.stdout.write(f'    {count}× {message}')
+
+        if mock.latencies:
+            p50, p95 = np.percentile(mock.latencies, [50, 95])
+            latency = f'延迟 P50 {p50 * 1000:.0f} ms，P95 {p95 * 1000:.0f} ms'
+        else:
+            latency = '未收到评分请求'
+        self.stdout.write(f'AI评分: {mock.requests} 次，失败 {mock.failures} 次（按 FALLBACK_SCORE 计分），{latency}')
+        if backlog:
+            grading = [item[0] for item in backlog]
+            submitting = [item[1] for item in backlog]
+            self.stdout.write(
+                f'评分积压: 同时等待评分 最大 {mock.max_in_flight}，平均 {np.mean(grading):.1f}；'
+                f'同时交卷 最大 {stats.max_submitting}，平均 {np.mean(submitting):.1f}'
+            )
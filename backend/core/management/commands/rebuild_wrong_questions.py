@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.wrong_questions import rebuild_wrong_questions
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = '按历史答题记录重建错题本（修改复习间隔或首次上线时使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', metavar='JOB_NUMBER', help='只重建指定工号的用户')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            found = dict(User.objects.filter(job_number__in=options['users']).values_list('job_number', 'id'))
+            missing = sorted(set(options['users']) - set(found))
+            if missing:
+                raise CommandError(f"工号不存在: {', '.join(missing)}")
+            user_ids = list(found.values())
+
+        start = time.perf_counter()
+        count = rebuild_wrong_questions(user_ids=user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'重建完成：错题本共 {count} 条，耗时 {time.perf_counter() - start:.2f} 秒'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.rescoring import rescore_question
+
+
+class Command(BaseCommand):
+    help = '按题目当前的正确答案重新评定已完成试卷中的答题记录，并更新试卷得分和能力画像'
+
+    def add_arguments(self, parser):
+        parser.add_argument('question_ids', nargs='+', type=int, help='题目ID')
+        parser.add_argument('--chunk-size', type=int, default=500, help='每个事务更新的答题记录数量')
+        parser.add_argument('--dry-run', action='store_true', help='只统计会变化的记录，不写入')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size 必须大于0')
+
+        start = time.perf_counter()
+        for question_id in options['question_ids']:
+            result = rescore_question(question_id, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+            if result.skipped_reason:
+                self.stdout.write(self.style.WARNING(f'  题目{question_id}: 跳过，{result.skipped_reason}'))
+                continue
+            self.stdout.write(
+                f'  题目{question_id}: 检查 {result.records_checked} 条，'
+                f'{"将更正" if options["dry_run"] else "已更正"} {result.records_changed} 条记录，'
+                f'涉及 {result.papers_changed} 张试卷，重算 {result.profiles_updated} 条能力画像'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'重新评分完成，耗时 {time.perf_counter() - start:.2f} 秒'))
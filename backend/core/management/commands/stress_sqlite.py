@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from users.models import User
+
+# 对比用的 Django 默认 SQLite 行为：回滚日志、DEFERRED 事务、5秒等锁、提交时同步写入
+PROFILES = {
+    'legacy': {
+        'SQLITE_SETTINGS': {
+            'JOURNAL_MODE': 'DELETE',
+            'SYNCHRONOUS': 'FULL',
+            'TRANSACTION_MODE': 'DEFERRED',
+        },
+        'WRITE_BEHIND_SETTINGS': {'ENABLED': False},
+    },
+    'production': {
+        'SQLITE_SETTINGS': settings.SQLITE_SETTINGS,
+        'WRITE_BEHIND_SETTINGS': settings.WRITE_BEHIND_SETTINGS,
+    },
+}
+
+
+def _worker(profile, database, user_ids, deadline, results):
+    """子进程：在数据库副本上循环 组卷→交卷，统计延迟和错误"""
+    from core.services import ExamGenerationService, ExamScoringService
+    from core.write_behind import coordinator
+
+    sys.stdout = open(os.devnull, 'w')  # 组卷、评分过程中的 print
+    override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        AI_GRADING_SETTINGS={**settings.AI_GRADING_SETTINGS, 'ENABLED': False},
+        QUESTION_SNAPSHOT_SETTINGS={'ENABLED': False},
+        **PROFILES[profile],
+    ).enable()
+    connections['default'].settings_dict['NAME'] = database
+    connection.close()
+
+    generation_service = ExamGenerationService()
+    scoring_service = ExamScoringService()
+    stats = {'generate': [], 'submit': [], 'locked': 0, 'errors': 0, 'messages': {}}
+    index = 0
+    while time.time() < deadline:
+        user_id = user_ids[index % len(user_ids)]
+        index += 1
+        try:
+            start = time.perf_counter()
+            paper = generation_service.generate_exam(user_id)
+            stats['generate'].append((time.perf_counter() - start) * 1000)
+
+            answers = {
+                str(question_id): random.choice(['A', 'B', 'C', 'D'])
+                for question_id in paper.exam_records.values_list('question_id', flat=True)
+            }
+            start = time.perf_counter()
+            scoring_service.submit_exam(paper.id, answers)
+            stats['submit'].append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            if isinstance(e, OperationalError) and 'locked' in str(e):
+                stats['locked'] += 1
+            else:
+                stats['errors'] += 1
+                message = f'{type(e).__name__}: {e}'[:120]
+                stats['messages'][message] = stats['messages'].get(message, 0) + 1
+    coordinator.flush()
+    connection.close()
+    results.put(stats)
+
+
+class Command(BaseCommand):
+    help = 'SQLite 并发压测：多进程在数据库副本上同时组卷、交卷，对比默认配置与生产配置的锁错误和交卷吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='并发进程数（模拟 gunicorn 工作进程）')
+        parser.add_argument('--duration', type=float, default=15, help='每种配置的压测时长（秒）')
+        parser.add_argument('--users', type=int, default=40, help='参与压测的员工数')
+        parser.add_argument('--profile', choices=['legacy', 'production', 'both'], default='both',
+                            help='压测的配置，默认两种都测并对比')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('仅适用于 SQLite 数据库')
+        user_ids = list(User.objects.filter(
+            is_active=True, is_staff=False
+        ).order_by('id').values_list('id', flat=True)[:options['users']])
+        if not user_ids:
+            raise CommandError('没有可用于压测的员工账号')
+
+        profiles = ['legacy', 'production'] if options['profile'] == 'both' else [options['profile']]
+        summaries = {}
+        workdir = tempfile.mkdtemp(prefix='stress-sqlite-')
+        try:
+            for profile in profiles:
+                database = self.copy_database(workdir, profile)
+                summaries[profile] = self.run(profile, database, user_ids, options['processes'], options['duration'])
+                self.report(profile, summaries[profile])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if len(summaries) == 2 and summaries['legacy']['throughput']:
+            ratio = summaries['production']['throughput'] / summaries['legacy']['throughput']
+            self.stdout.write(self.style.SUCCESS(
+                f"交卷吞吐量：生产配置为默认配置的 {ratio:.2f} 倍；"
+                f"锁错误 {summaries['legacy']['locked']} → {summaries['production']['locked']}"
+            ))
+
+    def copy_database(self, workdir, profile):
+        """用在线备份复制一份数据库，压测数据不写入正式库"""
+        path = os.path.join(workdir, f'{profile}.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.execute(f"PRAGMA journal_mode = {PROFILES[profile]['SQLITE_SETTINGS'].get('JOURNAL_MODE', 'DELETE')}")
+        target.close()
+        return path
+
+    def run(self, profile, database, user_ids, processes, duration):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        deadline = time.time() + duration
+        connections.close_all()
+        workers = [
+            context.Process(target=_worker, args=(profile, database, user_ids[index::processes], deadline, results))
+            for index in range(processes)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        stats = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        submitted = [value for item in stats for value in item['submit']]
+        generated = [value for item in stats for value in item['generate']]
+        return {
+            'elapsed': elapsed,
+            'generate': generated,
+            'submit': submitted,
+            'locked': sum(item['locked'] for item in stats),
+            'errors': sum(item['errors'] for item in stats),
+            'messages': {
+                message: sum(item['messages'].get(message, 0) for item in stats)
+                for message in {message for item in stats for message in item['messages']}
+            },
+            'throughput': len(submitted) / elapsed,
+        }
+
+    def report(self, profile, summary):
+        def latency(values):
+            if not values:
+                return '-'
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            return f'中位 {statistics.median(values):.0f} ms，P95 {p95:.0f} ms'
+
+        self.stdout.write(f'[{profile}] {summary["elapsed"]:.1f} 秒')
+        self.stdout.write(f'  组卷 {len(summary["generate"])} 次（{latency(summary["generate"])}）')
+        self.stdout.write(f'  交卷 {len(summary["submit"])} 次（{latency(summary["submit"])}），'
+                          f'{summary["throughput"]:.1f} 次/秒')
+        self.stdout.write(f'  database is locked: {summary["locked"]} 次，其他错误: {summary["errors"]} 次')
+        for message, count in sorted(summary['messages'].items(), key=lambda item: -item[1])[:5]:
+            self.stdout.write(f'    {count}× {message}')
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.deadlines import get_deadline_settings, sweep_expired_papers
+
+
+class Command(BaseCommand):
+    help = '按已保存的答案分批自动提交超时的进行中试卷（可由 cron 定时执行或持续运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='持续运行，每隔 --interval 秒扫描一次')
+        parser.add_argument('--interval', type=float, help='持续运行时的扫描间隔（秒）')
+        parser.add_argument('--batch-size', type=int, help='每批自动提交的试卷数')
+        parser.add_argument('--batch-pause', type=float, help='每批之间暂停的秒数')
+        parser.add_argument('--max-papers', type=int, help='每次扫描最多提交的试卷数')
+
+    def handle(self, *args, **options):
+        deadline_settings = get_deadline_settings()
+        interval = options['interval'] or deadline_settings.get('SWEEP_INTERVAL', 30)
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须大于0')
+
+        if options['loop']:
+            self.stdout.write(f'超时交卷扫描已启动（间隔 {interval} 秒），按 Ctrl+C 退出')
+
+        try:
+            while True:
+                start = time.perf_counter()
+                submitted, failed = sweep_expired_papers(
+                    batch_size=options['batch_size'],
+                    batch_pause=options['batch_pause'],
+                    max_papers=options['max_papers'],
+                )
+                if submitted or failed or not options['loop']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'自动提交 {submitted} 张超时试卷，失败 {failed} 张，耗时 {time.perf_counter() - start:.2f} 秒'
+                    ))
+
+                if not options['loop']:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('超时交卷扫描已退出')
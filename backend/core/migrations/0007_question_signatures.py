@@ -0,0 +1,43 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_add_ai_score_to_examrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.question', verbose_name='题目')),
+                ('content_digest', models.CharField(max_length=40, verbose_name='规范化题干摘要')),
+                ('signature', models.BinaryField(verbose_name='MinHash签名')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '题目签名',
+                'verbose_name_plural': '题目签名',
+                'db_table': 'question_signatures',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='分段序号')),
+                ('bucket', models.BigIntegerField(db_index=True, verbose_name='桶哈希')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='core.question', verbose_name='题目')),
+            ],
+            options={
+                'verbose_name': '题目LSH分桶',
+                'verbose_name_plural': '题目LSH分桶',
+                'db_table': 'question_lsh_buckets',
+                'unique_together': {('question', 'band')},
+            },
+        ),
+    ]
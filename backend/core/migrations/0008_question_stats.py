@@ -0,0 +1,37 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_question_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.question', verbose_name='题目')),
+                ('served_count', models.PositiveIntegerField(default=0, verbose_name='组卷次数')),
+                ('answered_count', models.PositiveIntegerField(default=0, verbose_name='作答次数')),
+                ('correct_count', models.PositiveIntegerField(default=0, verbose_name='答对次数')),
+                ('ai_score_sum', models.FloatField(default=0.0, verbose_name='AI评分之和')),
+                ('ai_score_count', models.PositiveIntegerField(default=0, verbose_name='AI评分次数')),
+                ('duration_sum', models.PositiveIntegerField(default=0, verbose_name='答题耗时之和（秒）')),
+                ('duration_count', models.PositiveIntegerField(default=0, verbose_name='记录耗时的作答次数')),
+                ('sample_size', models.PositiveIntegerField(default=0, verbose_name='分析样本数')),
+                ('p_value', models.FloatField(blank=True, null=True, verbose_name='通过率(p值)')),
+                ('discrimination', models.FloatField(blank=True, help_text='点二列相关系数：本题对错与同卷其余题目正确率的相关性', null=True, verbose_name='区分度')),
+                ('empirical_difficulty', models.PositiveSmallIntegerField(blank=True, help_text='根据p值换算的1-5级难度', null=True, verbose_name='实测难度')),
+                ('analyzed_at', models.DateTimeField(blank=True, null=True, verbose_name='分析时间')),
+            ],
+            options={
+                'verbose_name': '题目统计',
+                'verbose_name_plural': '题目统计',
+                'db_table': 'question_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0008_question_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WrongQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wrong_count', models.PositiveIntegerField(default=1, verbose_name='答错次数')),
+                ('review_stage', models.PositiveSmallIntegerField(default=0, help_text='已连续答对的次数', verbose_name='复习阶段')),
+                ('last_wrong_at', models.DateTimeField(verbose_name='最近答错时间')),
+                ('last_reviewed_at', models.DateTimeField(blank=True, null=True, verbose_name='最近复习时间')),
+                ('due_at', models.DateTimeField(verbose_name='下次复习时间')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wrong_entries', to='core.question', verbose_name='题目')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wrong_questions', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '错题',
+                'verbose_name_plural': '错题本',
+                'db_table': 'wrong_questions',
+                'indexes': [models.Index(fields=['user', 'due_at'], name='wrong_user_due_idx')],
+                'unique_together': {('user', 'question')},
+            },
+        ),
+    ]
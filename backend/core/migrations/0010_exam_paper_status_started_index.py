@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_wrong_questions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exampaper',
+            index=models.Index(fields=['status', 'started_at'], name='paper_status_started_idx'),
+        ),
+    ]
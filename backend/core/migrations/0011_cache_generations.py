@@ -0,0 +1,26 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_exam_paper_status_started_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='名称')),
+                ('value', models.BigIntegerField(default=0, verbose_name='版本号')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '缓存版本号',
+                'verbose_name_plural': '缓存版本号',
+                'db_table': 'cache_generations',
+            },
+        ),
+    ]
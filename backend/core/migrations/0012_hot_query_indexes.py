@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_cache_generations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exampaper',
+            index=models.Index(fields=['user', 'status', 'completed_at'], name='paper_user_status_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exampaper',
+            index=models.Index(fields=['status', 'created_at'], name='paper_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exampaper',
+            index=models.Index(fields=['created_at'], name='paper_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examrecord',
+            index=models.Index(fields=['paper', 'created_at'], name='record_paper_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['is_active', 'question_type'], name='question_active_type_idx'),
+        ),
+    ]
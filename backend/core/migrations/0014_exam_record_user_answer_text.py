@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_question_type_active_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examrecord',
+            name='user_answer',
+            field=models.TextField(blank=True, help_text='主观题答案可能较长，不限制长度（交卷和考试中保存答案均完整保存）', verbose_name='用户答案'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_exam_record_user_answer_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamMonitorCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('department', models.CharField(max_length=100, verbose_name='部门')),
+                ('field', models.CharField(max_length=32, verbose_name='计数字段')),
+                ('value', models.BigIntegerField(default=0, verbose_name='计数')),
+            ],
+            options={
+                'verbose_name': '考试监控计数',
+                'verbose_name_plural': '考试监控计数',
+                'db_table': 'exam_monitor_counters',
+                'unique_together': {('day', 'department', 'field')},
+            },
+        ),
+    ]
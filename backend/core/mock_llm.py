@@ -0,0 +1,105 @@
+"""
+本机模拟的 AI 评分服务
+
+实现与 OpenAI 兼容的 POST {BASE_URL}/chat/completions，返回一个 0-100 的分数。
+压测时把 AI_GRADING_SETTINGS['BASE_URL']（环境变量 AI_BASE_URL）指向该服务，
+可设置响应延迟和失败率，不依赖外部接口。
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """
+    模拟评分服务
+
+    Args:
+        port: 监听端口，0 表示自动分配
+        latency: 响应延迟中位数（秒），实际延迟按对数正态分布抖动
+        failure_rate: 返回 500 的比例
+        seed: 随机种子
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=1.0, failure_rate=0.0, seed=None):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latencies = []
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def draw(self):
+        """本次请求的 (延迟, 是否失败, 分数)"""
+        with self.lock:
+            delay = self.latency * self.random.lognormvariate(0, 0.5) if self.latency > 0 else 0
+            failed = self.random.random() < self.failure_rate
+            score = self.random.randint(40, 95)
+            self.requests += 1
+            self.failures += failed
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return delay, failed, score
+
+    def finish(self, elapsed):
+        with self.lock:
+            self.in_flight -= 1
+            self.latencies.append(elapsed)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        started = time.perf_counter()
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, {'error': {'message': 'not found'}})
+            return
+
+        delay, failed, score = self.server.draw()
+        try:
+            time.sleep(delay)
+            if failed:
+                self._send(500, {'error': {'message': 'mock failure'}})
+            else:
+                self._send(200, {
+                    'id': 'mock',
+                    'object': 'chat.completion',
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': str(score)},
+                                 'finish_reason': 'stop'}],
+                })
+        finally:
+            self.server.finish(time.perf_counter() - started)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 不输出每个请求的访问日志
+        pass
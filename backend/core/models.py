@@ -82,11 +82,117 @@ class Question(BaseTimestampedModel):
         verbose_name_plural = '题目'
         db_table = 'questions'
         ordering = ['-created_at']
+        indexes = [
+            # 组卷、题目列表：按题型和启用状态筛选（is_active 在查询中不是等值条件，题型放在前面）
+            models.Index(fields=['question_type', 'is_active'], name='question_type_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_question_type_display()}: {self.content[:50]}..."
 
 
+class QuestionSignature(models.Model):
+    """题目MinHash签名，用于近似重复题目检测"""
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='题目'
+    )
+    content_digest = models.CharField(max_length=40, verbose_name='规范化题干摘要')
+    signature = models.BinaryField(verbose_name='MinHash签名')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '题目签名'
+        verbose_name_plural = '题目签名'
+        db_table = 'question_signatures'
+
+    def __str__(self):
+        return f"题目{self.question_id}的签名"
+
+
+class QuestionLSHBucket(models.Model):
+    """题目LSH分桶，每道题在每个band下落入一个桶"""
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets',
+        verbose_name='题目'
+    )
+    band = models.PositiveSmallIntegerField(verbose_name='分段序号')
+    bucket = models.BigIntegerField(db_index=True, verbose_name='桶哈希')
+
+    class Meta:
+        verbose_name = '题目LSH分桶'
+        verbose_name_plural = '题目LSH分桶'
+        db_table = 'question_lsh_buckets'
+        unique_together = ['question', 'band']
+
+    def __str__(self):
+        return f"题目{self.question_id} - band{self.band}"
+
+
+class QuestionStats(models.Model):
+    """
+    题目作答统计（项目分析）
+
+    计数在组卷和交卷时用 F 表达式批量累加；通过率(p值)、区分度等指标由
+    compute_item_stats 命令基于全部答题记录定期计算。
+    """
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='题目'
+    )
+    served_count = models.PositiveIntegerField(default=0, verbose_name='组卷次数')
+    answered_count = models.PositiveIntegerField(default=0, verbose_name='作答次数')
+    correct_count = models.PositiveIntegerField(default=0, verbose_name='答对次数')
+    ai_score_sum = models.FloatField(default=0.0, verbose_name='AI评分之和')
+    ai_score_count = models.PositiveIntegerField(default=0, verbose_name='AI评分次数')
+    duration_sum = models.PositiveIntegerField(default=0, verbose_name='答题耗时之和（秒）')
+    duration_count = models.PositiveIntegerField(default=0, verbose_name='记录耗时的作答次数')
+    sample_size = models.PositiveIntegerField(default=0, verbose_name='分析样本数')
+    p_value = models.FloatField(null=True, blank=True, verbose_name='通过率(p值)')
+    discrimination = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='区分度',
+        help_text='点二列相关系数：本题对错与同卷其余题目正确率的相关性'
+    )
+    empirical_difficulty = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='实测难度',
+        help_text='根据p值换算的1-5级难度'
+    )
+    analyzed_at = models.DateTimeField(null=True, blank=True, verbose_name='分析时间')
+
+    class Meta:
+        verbose_name = '题目统计'
+        verbose_name_plural = '题目统计'
+        db_table = 'question_stats'
+
+    def __str__(self):
+        return f"题目{self.question_id}的统计"
+
+    @property
+    def accuracy(self):
+        """作答正确率（%）"""
+        return round(self.correct_count / self.answered_count * 100, 2) if self.answered_count else None
+
+    @property
+    def mean_ai_score(self):
+        return round(self.ai_score_sum / self.ai_score_count, 2) if self.ai_score_count else None
+
+    @property
+    def mean_duration(self):
+        return round(self.duration_sum / self.duration_count, 2) if self.duration_count else None
+
+
 class ExamPaper(BaseTimestampedModel):
     """考试试卷模型"""
     class Status(models.TextChoices):
@@ -129,6 +235,15 @@ class ExamPaper(BaseTimestampedModel):
         verbose_name_plural = '考试试卷'
         db_table = 'exam_papers'
         ordering = ['-created_at']
+        indexes = [
+            # 超时交卷扫描：按开始时间范围查找进行中的试卷
+            models.Index(fields=['status', 'started_at'], name='paper_status_started_idx'),
+            # 能力总结、趋势：某员工一段时间内已完成的试卷
+            models.Index(fields=['user', 'status', 'completed_at'], name='paper_user_status_done_idx'),
+            # 考试统计：按状态计数、按创建时间统计近期试卷
+            models.Index(fields=['status', 'created_at'], name='paper_status_created_idx'),
+            models.Index(fields=['created_at'], name='paper_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.job_number} - {self.title} ({self.get_status_display()})"
@@ -148,10 +263,10 @@ class ExamRecord(BaseTimestampedModel):
         related_name='exam_records',
         verbose_name='对应题目'
     )
-    user_answer = models.CharField(
-        max_length=100,
+    user_answer = models.TextField(
         blank=True,
-        verbose_name='用户答案'
+        verbose_name='用户答案',
+        help_text='主观题答案可能较长，不限制长度（交卷和考试中保存答案均完整保存）'
     )
     is_correct = models.BooleanField(null=True, blank=True, verbose_name='是否正确')
     score_gained = models.FloatField(default=0.0, verbose_name='得分')
@@ -164,6 +279,90 @@ class ExamRecord(BaseTimestampedModel):
         db_table = 'exam_records'
         unique_together = ['paper', 'question']
         ordering = ['paper', 'id']
+        indexes = [
+            # 组卷时排除员工最近做过的题目：按试卷和答题时间范围查找
+            models.Index(fields=['paper', 'created_at'], name='record_paper_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.paper.user.job_number} - 题目{self.question.id} - ({'正确' if self.is_correct else '错误'})"
+
+
+class WrongQuestion(models.Model):
+    """
+    错题本（每个用户每道题一条）
+
+    交卷时维护：答错的题目加入错题本并重新从第一个复习间隔开始；复习时答对则进入下一个间隔，
+    全部间隔都答对后移出错题本。错题回顾组卷按到期时间直接从这里取题。
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='wrong_questions',
+        verbose_name='用户'
+    )
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='wrong_entries',
+        verbose_name='题目'
+    )
+    wrong_count = models.PositiveIntegerField(default=1, verbose_name='答错次数')
+    review_stage = models.PositiveSmallIntegerField(default=0, verbose_name='复习阶段', help_text='已连续答对的次数')
+    last_wrong_at = models.DateTimeField(verbose_name='最近答错时间')
+    last_reviewed_at = models.DateTimeField(null=True, blank=True, verbose_name='最近复习时间')
+    due_at = models.DateTimeField(verbose_name='下次复习时间')
+
+    class Meta:
+        verbose_name = '错题'
+        verbose_name_plural = '错题本'
+        db_table = 'wrong_questions'
+        unique_together = ['user', 'question']
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='wrong_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.job_number} - 题目{self.question_id}"
+
+
+class CacheGeneration(models.Model):
+    """
+    缓存版本号
+
+    相关数据写入时将对应名称的版本号加一（见 core/cache.py），各进程读取缓存前用一条小查询
+    取得当前版本号，版本号变化后的旧缓存不再使用。名称可带范围，如 capability_profile:42。
+    """
+    name = models.CharField(max_length=100, primary_key=True, verbose_name='名称')
+    value = models.BigIntegerField(default=0, verbose_name='版本号')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '缓存版本号'
+        verbose_name_plural = '缓存版本号'
+        db_table = 'cache_generations'
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class ExamMonitorCounter(models.Model):
+    """
+    考试实时监控计数
+
+    按日期、部门、计数字段各一行（见 core/monitor.py）。事件用 F() 表达式原子累加，
+    多个工作进程和后台任务容器同时写入不会丢失；对账时按试卷表重算覆盖。
+    """
+    day = models.DateField(verbose_name='日期')
+    department = models.CharField(max_length=100, verbose_name='部门')
+    field = models.CharField(max_length=32, verbose_name='计数字段')
+    value = models.BigIntegerField(default=0, verbose_name='计数')
+
+    class Meta:
+        verbose_name = '考试监控计数'
+        verbose_name_plural = '考试监控计数'
+        db_table = 'exam_monitor_counters'
+        unique_together = ['day', 'department', 'field']
 
     def __str__(self):
-        return f"{self.paper.user.job_number} - 题目{self.question.id} - ({'正确' if self.is_correct else '错误'})"
\ No newline at end of file
+        return f"{self.day} {self.department} {self.field}={self.value}"
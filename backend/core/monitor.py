@@ -0,0 +1,201 @@
+"""
+考试实时监控计数
+
+按部门统计当天生成的试卷：未开始、进行中、超时待交卷、已提交的数量，以及开始人数和已提交试卷的总分。
+计数保存在 exam_monitor_counters 表中（每个日期、部门、字段一行），由组卷、开始考试、交卷事件
+在业务事务提交后经写入协调器（core/write_behind.py）用 F() 表达式原子累加，
+多个工作进程和后台任务容器（超时交卷）的事件都不会丢失；监控推送只读取计数，不再反复对试卷表执行 COUNT。
+对账 reconcile_counters 定期按数据库重算当天的计数，纠正进程异常退出时未写入的事件；
+"超时待交卷"依赖时间推移，只在对账时按截止时间计算，自动交卷时扣减。
+"""
+from datetime import datetime, time as day_time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import ExamMonitorCounter, ExamPaper
+from .write_behind import defer_write
+
+COUNTER_FIELDS = ('not_started', 'in_progress', 'pending_grading', 'completed', 'started', 'score_sum')
+KEY_PREFIX = 'exam_monitor'
+# 计数保留两天，对账时删除更早的日期
+KEEP_DAYS = 2
+# 总分以0.01分为单位保存为整数，便于原子累加
+SCORE_SCALE = 100
+
+
+def get_monitor_settings():
+    return getattr(settings, 'EXAM_MONITOR_SETTINGS', {})
+
+
+def _day_of(value=None):
+    return timezone.localtime(value or timezone.now()).date()
+
+
+def add_counts(day, department, changes):
+    """在一个事务中累加一个部门的多项计数（UPDATE ... SET value = value + n，并发写入不丢失）"""
+    with transaction.atomic():
+        for field, delta in changes.items():
+            if not delta:
+                continue
+            counters = ExamMonitorCounter.objects.filter(day=day, department=department, field=field)
+            if not counters.update(value=F('value') + delta):
+                # 首次使用：另一个进程可能同时创建，创建失败时再累加一次
+                counter, created = ExamMonitorCounter.objects.get_or_create(
+                    day=day, department=department, field=field, defaults={'value': delta}
+                )
+                if not created:
+                    counters.update(value=F('value') + delta)
+
+
+def _add_auto_submitted(day, department, changes):
+    """超时自动交卷：优先扣减"超时待交卷"计数，没有时扣减"进行中"计数"""
+    with transaction.atomic():
+        taken = ExamMonitorCounter.objects.filter(
+            day=day, department=department, field='pending_grading', value__gt=0
+        ).update(value=F('value') - 1)
+        add_counts(day, department, {**changes, 'in_progress': 0 if taken else -1})
+
+
+def _apply(paper, department, changes):
+    defer_write(add_counts, _day_of(paper.created_at), department, changes)
+
+
+def record_paper_generated(paper, department):
+    """组卷事件"""
+    _apply(paper, department, {'not_started': 1})
+
+
+def record_paper_started(paper, department):
+    """开始考试事件"""
+    _apply(paper, department, {'not_started': -1, 'in_progress': 1, 'started': 1})
+
+
+def record_paper_submitted(paper, department, previous_status, score, auto_submitted=False):
+    """
+    交卷事件
+
+    Args:
+        previous_status: 交卷前的试卷状态
+        score: 试卷得分
+        auto_submitted: 是否为超时自动交卷（优先扣减"超时待交卷"计数）
+    """
+    changes = {'completed': 1, 'score_sum': int(round((score or 0) * SCORE_SCALE))}
+    if previous_status == ExamPaper.Status.NOT_STARTED:
+        changes['not_started'] = -1
+    elif auto_submitted:
+        defer_write(_add_auto_submitted, _day_of(paper.created_at), department, changes)
+        return
+    else:
+        changes['in_progress'] = -1
+    _apply(paper, department, changes)
+
+
+def reconcile_counters(day=None):
+    """
+    按数据库重算某一天（默认当天）的计数并覆盖计数表
+
+    Returns:
+        dict: {部门: {计数字段: 值}}
+    """
+    from .deadlines import get_grace
+
+    day = day or _day_of()
+    start = timezone.make_aware(datetime.combine(day, day_time.min))
+    papers = ExamPaper.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+
+    counters = {}
+    rows = papers.values('user__department').annotate(
+        not_started=Count('id', filter=Q(status=ExamPaper.Status.NOT_STARTED)),
+        in_progress=Count('id', filter=Q(status=ExamPaper.Status.IN_PROGRESS)),
+        completed=Count('id', filter=Q(status=ExamPaper.Status.COMPLETED)),
+        started=Count('id', filter=Q(started_at__isnull=False)),
+        score_sum=Sum('score_obtained', filter=Q(status=ExamPaper.Status.COMPLETED)),
+    )
+    for row in rows:
+        counters[row['user__department']] = {
+            'not_started': row['not_started'],
+            'in_progress': row['in_progress'],
+            'pending_grading': 0,
+            'completed': row['completed'],
+            'started': row['started'],
+            'score_sum': int(round((row['score_sum'] or 0) * SCORE_SCALE)),
+        }
+
+    # 进行中的试卷按截止时间区分"超时待交卷"
+    now = timezone.now()
+    grace = get_grace()
+    for department, started_at, time_limit in papers.filter(
+        status=ExamPaper.Status.IN_PROGRESS,
+        started_at__isnull=False
+    ).values_list('user__department', 'started_at', 'time_limit'):
+        if now > started_at + timedelta(seconds=time_limit) + grace:
+            counters[department]['in_progress'] -= 1
+            counters[department]['pending_grading'] += 1
+
+    rows = [
+        ExamMonitorCounter(day=day, department=department, field=field, value=value)
+        for department, fields in counters.items()
+        for field, value in fields.items()
+    ]
+    with transaction.atomic():
+        ExamMonitorCounter.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['day', 'department', 'field'], update_fields=['value']
+        )
+        # 已没有试卷的部门计数清零
+        ExamMonitorCounter.objects.filter(day=day).exclude(department__in=list(counters)).update(value=0)
+        ExamMonitorCounter.objects.filter(day__lte=day - timedelta(days=KEEP_DAYS)).delete()
+    return counters
+
+
+def reconcile_if_due(day=None):
+    """距上次对账超过 RECONCILE_SECONDS 时对账（多个监控连接同时在线时只有一个执行）"""
+    interval = get_monitor_settings().get('RECONCILE_SECONDS', 60)
+    day = day or _day_of()
+    if cache.add(f'{KEY_PREFIX}:{day.isoformat()}:reconciled', True, interval):
+        reconcile_counters(day)
+        return True
+    return False
+
+
+def get_snapshot(day=None):
+    """
+    读取计数快照
+
+    Returns:
+        dict: 日期、各部门计数及合计，平均分按已提交试卷计算
+    """
+    day = day or _day_of()
+    values = {}
+    for department, field, value in ExamMonitorCounter.objects.filter(day=day).values_list(
+        'department', 'field', 'value'
+    ):
+        values.setdefault(department, {})[field] = value
+
+    def summarize(counts):
+        completed = counts['completed']
+        return {
+            'started': counts['started'],
+            'not_started': counts['not_started'],
+            'in_progress': counts['in_progress'],
+            'pending_grading': counts['pending_grading'],
+            'submitted': completed,
+            'avg_score': round(counts['score_sum'] / SCORE_SCALE / completed, 2) if completed else None,
+        }
+
+    total = dict.fromkeys(COUNTER_FIELDS, 0)
+    by_department = []
+    for department in sorted(values):
+        counts = {field: max(0, values[department].get(field, 0)) for field in COUNTER_FIELDS}
+        for field in COUNTER_FIELDS:
+            total[field] += counts[field]
+        by_department.append({'department': department, **summarize(counts)})
+
+    return {
+        'date': day.isoformat(),
+        'total': summarize(total),
+        'departments': by_department,
+    }
@@ -0,0 +1,155 @@
+"""
+答案更正后的批量重新评分
+
+题目的正确答案被修改后，把该题在已完成试卷中的答题记录一次性读成数组，
+向量化重新判分，再分批（每批一个短事务）更新答题记录和试卷总分，
+最后只为受影响的 (用户, 标签) 重放能力画像、为受影响的用户重建错题本，
+避免长时间锁库影响正在进行的考试。
+主观题由AI评分，不参与自动重新评分。
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.utils import timezone
+
+from analysis.cohort import mark_cohort_stale
+from analysis.replay import replay_pairs
+from .cache import EXAM_PAPER, bump_generations
+from .models import ExamPaper, ExamRecord, Question, QuestionStats
+from .wrong_questions import rebuild_wrong_questions
+
+
+class RescoreResult:
+    """重新评分结果"""
+
+    def __init__(self, question_id):
+        self.question_id = question_id
+        self.records_checked = 0
+        self.records_changed = 0
+        self.papers_changed = 0
+        self.profiles_updated = 0
+        self.skipped_reason = ''
+
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'records_checked': self.records_checked,
+            'records_changed': self.records_changed,
+            'papers_changed': self.papers_changed,
+            'profiles_updated': self.profiles_updated,
+            'skipped_reason': self.skipped_reason,
+        }
+
+
+def _normalize(values):
+    """与交卷评分一致的答案标准化：去除首尾空白并转大写"""
+    return np.char.upper(np.char.strip(np.asarray(values, dtype=str)))
+
+
+def rescore_question(question_id, chunk_size=500, dry_run=False):
+    """
+    按当前正确答案重新评定某道题在已完成试卷中的全部答题记录
+
+    Args:
+        question_id: 题目ID
+        chunk_size: 每个事务更新的答题记录数量
+        dry_run: 只统计会变化的记录，不写入
+
+    Returns:
+        RescoreResult
+    """
+    result = RescoreResult(question_id)
+    question = Question.objects.filter(id=question_id).only('id', 'question_type', 'correct_answer').first()
+    if question is None:
+        result.skipped_reason = '题目不存在'
+        return result
+    if question.question_type == Question.QuestionType.SUBJECTIVE:
+        result.skipped_reason = '主观题由AI评分，不自动重新评分'
+        return result
+
+    rows = list(ExamRecord.objects.filter(
+        question_id=question_id,
+        paper__status=ExamPaper.Status.COMPLETED
+    ).values_list('id', 'paper_id', 'paper__user_id', 'paper__total_score', 'user_answer', 'is_correct', 'score_gained'))
+    result.records_checked = len(rows)
+    if not rows:
+        return result
+
+    record_ids, paper_ids, user_ids, total_scores, answers, old_correct, old_scores = zip(*rows)
+    record_ids = np.array(record_ids, dtype=np.int64)
+    paper_ids = np.array(paper_ids, dtype=np.int64)
+    user_ids = np.array(user_ids, dtype=np.int64)
+    total_scores = np.array(total_scores, dtype=np.float64)
+    old_correct = np.array([bool(value) for value in old_correct])
+    old_scores = np.array(old_scores, dtype=np.float64)
+
+    # 每题分值 = 试卷总分 / 题目数，与交卷时的计算方式一致
+    question_counts = {}
+    for paper_chunk in _chunked(np.unique(paper_ids).tolist()):
+        question_counts.update(
+            ExamRecord.objects.filter(paper_id__in=paper_chunk).values('paper_id').annotate(
+                count=Count('id')
+            ).values_list('paper_id', 'count')
+        )
+    counts = np.array([question_counts[paper_id] for paper_id in paper_ids.tolist()], dtype=np.float64)
+
+    normalized = _normalize(answers)
+    new_correct = (normalized != '') & (normalized == _normalize([question.correct_answer])[0])
+    new_scores = np.where(new_correct, total_scores / counts, 0.0)
+    changed = (new_correct != old_correct) | ~np.isclose(new_scores, old_scores)
+
+    result.records_changed = int(changed.sum())
+    result.papers_changed = int(len(np.unique(paper_ids[changed])))
+    if dry_run or not result.records_changed:
+        return result
+
+    changed_index = np.flatnonzero(changed)
+    now = timezone.now()
+    for start in range(0, len(changed_index), chunk_size):
+        index = changed_index[start:start + chunk_size]
+        with transaction.atomic():
+            ExamRecord.objects.bulk_update(
+                [
+                    ExamRecord(id=int(record_ids[i]), is_correct=bool(new_correct[i]), score_gained=float(new_scores[i]))
+                    for i in index
+                ],
+                ['is_correct', 'score_gained']
+            )
+            # 每张试卷中该题只有一条记录，试卷总分直接加上分差
+            ExamPaper.objects.filter(id__in=paper_ids[index].tolist()).update(
+                score_obtained=F('score_obtained') + Case(
+                    *[When(id=int(paper_ids[i]), then=Value(float(new_scores[i] - old_scores[i]))) for i in index],
+                    default=Value(0.0),
+                    output_field=FloatField()
+                ),
+                updated_at=now
+            )
+            bump_generations(EXAM_PAPER, user_ids[index].tolist())
+
+    # 题目统计中的答对次数按最新结果重算
+    QuestionStats.objects.filter(question_id=question_id).update(
+        correct_count=ExamRecord.objects.filter(
+            question_id=question_id,
+            paper__status=ExamPaper.Status.COMPLETED,
+            is_correct=True
+        ).count()
+    )
+
+    tag_ids = list(question.tags.exclude(category='role').values_list('id', flat=True))
+    affected_users = np.unique(user_ids[changed]).tolist()
+    result.profiles_updated = replay_pairs(
+        (user_id, tag_id) for user_id in affected_users for tag_id in tag_ids
+    )
+    # 错题本由答题对错推导，答对/答错被更正后按最新结果重建这些用户的错题本
+    rebuild_wrong_questions(affected_users)
+    mark_cohort_stale()
+
+    print(f"[重新评分] 题目{question_id}: 检查 {result.records_checked} 条记录，"
+          f"更正 {result.records_changed} 条，涉及 {result.papers_changed} 张试卷，"
+          f"重算 {result.profiles_updated} 条能力画像")
+    return result
+
+
+def _chunked(values, size=900):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
@@ -0,0 +1,150 @@
+"""
+题库全文检索
+
+基于 SQLite FTS5 外部内容表（trigram 分词，适合中文）对题干和答案解析建立全文索引，
+索引由数据库触发器与 questions 表保持同步，批量导入（bulk_create）同样生效。
+非 SQLite 数据库或 SQLite 未编译 FTS5 时自动退化为 LIKE 查询。
+"""
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'questions_fts'
+# trigram 分词器要求检索词至少3个字符，更短的词使用 LIKE 过滤
+MIN_FTS_TERM_LENGTH = 3
+# bm25 权重：题干命中比解析命中更重要
+BM25_WEIGHTS = (10.0, 1.0)
+
+_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON questions BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, content, explanation)
+            VALUES (new.id, new.content, new.explanation);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON questions BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, explanation)
+            VALUES ('delete', old.id, old.content, old.explanation);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content, explanation ON questions BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, explanation)
+            VALUES ('delete', old.id, old.content, old.explanation);
+            INSERT INTO {FTS_TABLE}(rowid, content, explanation)
+            VALUES (new.id, new.content, new.explanation);
+        END
+    """,
+}
+
+_available = {}
+
+
+def ensure_fulltext_index(using=DEFAULT_DB_ALIAS):
+    """
+    创建全文索引表和同步触发器（幂等）
+
+    SQLite 修改表结构时会重建 questions 表并丢失触发器，因此每次 migrate 后都会调用本函数；
+    发现触发器缺失时重建索引内容。
+
+    Returns:
+        bool: 全文索引是否可用
+    """
+    connection = connections[using]
+    _available.pop(using, None)
+    if connection.vendor != 'sqlite':
+        return False
+
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if 'questions' not in tables:
+            return False
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'questions'"
+        )
+        existing_triggers = {row[0] for row in cursor.fetchall()}
+
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"content, explanation, content='questions', content_rowid='id', tokenize='trigram')"
+            )
+        except Exception as e:
+            # SQLite 未编译 FTS5 或版本过低（trigram 需要 3.34+）
+            print(f"[全文检索] 无法创建FTS5索引，将使用LIKE查询: {str(e)}")
+            return False
+
+        for sql in _TRIGGERS.values():
+            cursor.execute(sql)
+
+        if not set(_TRIGGERS) <= existing_triggers:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            print("[全文检索] 已重建题库全文索引")
+
+    _available[using] = True
+    return True
+
+
+def fulltext_available(using=DEFAULT_DB_ALIAS):
+    """判断全文索引是否可用（按数据库连接缓存结果）"""
+    if using not in _available:
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            _available[using] = False
+        else:
+            with connection.cursor() as cursor:
+                _available[using] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _available[using]
+
+
+def split_search_terms(query):
+    """拆分检索词，返回（可走全文索引的词, 需要LIKE过滤的短词）"""
+    terms = [term for term in (query or '').split() if term]
+    long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_FTS_TERM_LENGTH]
+    return long_terms, short_terms
+
+
+def build_match_expression(terms):
+    """将检索词转换为 FTS5 MATCH 表达式（每个词按短语匹配，词之间为AND关系）"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_questions(queryset, query, using=DEFAULT_DB_ALIAS):
+    """
+    在题目查询集上执行全文检索
+
+    Args:
+        queryset: 题目查询集（可已附加其他筛选条件）
+        query: 检索关键词，空格分隔多个词
+        using: 数据库别名
+
+    Returns:
+        QuerySet: 过滤后的查询集，使用全文索引时按相关度排序
+    """
+    long_terms, short_terms = split_search_terms(query)
+    if not long_terms and not short_terms:
+        return queryset
+
+    like_terms = short_terms
+    if long_terms and fulltext_available(using):
+        match = build_match_expression(long_terms)
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = questions.id',
+                [match]
+            )
+        ).order_by('search_rank', '-created_at')
+    else:
+        like_terms = long_terms + short_terms
+
+    for term in like_terms:
+        queryset = queryset.filter(Q(content__icontains=term) | Q(explanation__icontains=term))
+
+    return queryset
@@ -1,5 +1,33 @@
+from django.db.models import Count, Q
 from rest_framework import serializers
-from .models import Tag, Question, ExamPaper, ExamRecord
+from .models import Tag, Question, QuestionStats, ExamPaper, ExamRecord
+
+
+def filter_tags_for_position(tags, user_position):
+    """
+    根据用户职位过滤标签：非role标签直接显示，管理员可以看到所有role标签，
+    其他用户只显示与自己职位相关的role标签
+    """
+    is_admin = user_position == '系统管理员'
+    return [
+        {'id': tag.id, 'name': tag.name}
+        for tag in tags
+        if tag.category != 'role' or is_admin or tag.name == user_position
+    ]
+
+
+def get_filtered_tags(question, user_position, context):
+    """获取过滤后的题目标签，同一次序列化内按（题目, 职位）只计算一次"""
+    cache = context.setdefault('filtered_tags_cache', {})
+    cache_key = (question.id, user_position)
+    if cache_key not in cache:
+        cache[cache_key] = filter_tags_for_position(question.tags.all(), user_position)
+    return cache[cache_key]
+
+
+def with_questions_count(tags):
+    """为标签查询集附加启用题目数量，供 TagSerializer 使用"""
+    return tags.annotate(active_questions_count=Count('questions', filter=Q(questions__is_active=True)))
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -12,6 +40,9 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at')
 
     def get_questions_count(self, obj):
+        # 列表查询用 with_questions_count() 预先统计，避免逐个标签计数
+        if hasattr(obj, 'active_questions_count'):
+            return obj.active_questions_count
         return obj.questions.filter(is_active=True).count()
 
 
@@ -31,32 +62,37 @@ class QuestionSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return [{'id': tag.id, 'name': tag.name} for tag in obj.tags.all()]
 
-        user_position = request.user.position
-        is_admin = user_position == '系统管理员'
+        return get_filtered_tags(obj, request.user.position, self.context)
 
-        filtered_tags = []
-        for tag in obj.tags.all():
-            if tag.category != 'role':
-                # 非role标签直接显示
-                filtered_tags.append({'id': tag.id, 'name': tag.name})
-            elif is_admin:
-                # 管理员可以看到所有role标签
-                filtered_tags.append({'id': tag.id, 'name': tag.name})
-            else:
-                # 非管理员用户，只显示与自己职位相关的role标签
-                if tag.name == user_position:
-                    filtered_tags.append({'id': tag.id, 'name': tag.name})
 
-        return filtered_tags
+class QuestionStatsSerializer(serializers.ModelSerializer):
+    """题目作答统计序列化器"""
+    accuracy = serializers.FloatField(read_only=True)
+    mean_ai_score = serializers.FloatField(read_only=True)
+    mean_duration = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = QuestionStats
+        fields = ('served_count', 'answered_count', 'correct_count', 'accuracy',
+                 'mean_ai_score', 'mean_duration', 'sample_size', 'p_value',
+                 'discrimination', 'empirical_difficulty', 'analyzed_at')
+        read_only_fields = fields
 
 
 class QuestionDetailSerializer(QuestionSerializer):
-    """题目详细序列化器（包含正确答案）"""
+    """题目详细序列化器（包含正确答案和作答统计）"""
     correct_answer = serializers.CharField(read_only=True)
     explanation = serializers.CharField(read_only=True)
+    stats = serializers.SerializerMethodField()
 
     class Meta(QuestionSerializer.Meta):
-        fields = QuestionSerializer.Meta.fields + ('correct_answer', 'explanation')
+        fields = QuestionSerializer.Meta.fields + ('correct_answer', 'explanation', 'stats')
+
+    def get_stats(self, obj):
+        try:
+            return QuestionStatsSerializer(obj.stats).data
+        except QuestionStats.DoesNotExist:
+            return None
 
 
 class QuestionWithAnswerSerializer(QuestionSerializer):
@@ -110,6 +146,9 @@ class ExamPaperListSerializer(serializers.ModelSerializer):
         return f"{obj.user.job_number} - {obj.user.get_full_name() or obj.user.username}"
 
     def get_question_count(self, obj):
+        # 列表查询中已统计题目数量（annotate），单独序列化时再查询
+        if hasattr(obj, 'question_count'):
+            return obj.question_count
         return obj.exam_records.count()
 
 
@@ -127,36 +166,20 @@ class ExamPaperDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'started_at', 'completed_at')
 
     def get_questions(self, obj):
-        """获取试卷题目数据"""
+        """获取试卷题目数据（复用已预取的答题记录，不再单独查询）"""
         questions_data = []
         # 获取试卷用户的职位信息
         user_position = obj.user.position
-        is_admin = user_position == '系统管理员'
 
-        for record in obj.exam_records.select_related('question').prefetch_related('question__tags').all():
+        for record in obj.exam_records.all():
             question = record.question
-
-            # 过滤标签：对于非管理员，只显示相关的role标签
-            filtered_tags = []
-            for tag in question.tags.all():
-                if tag.category != 'role':
-                    # 非role标签直接显示
-                    filtered_tags.append({'id': tag.id, 'name': tag.name})
-                elif is_admin:
-                    # 管理员可以看到所有role标签
-                    filtered_tags.append({'id': tag.id, 'name': tag.name})
-                else:
-                    # 非管理员用户，只显示与自己职位相关的role标签
-                    if tag.name == user_position:
-                        filtered_tags.append({'id': tag.id, 'name': tag.name})
-
             questions_data.append({
                 'id': question.id,
                 'content': question.content,
                 'question_type': question.question_type,
                 'options': question.options,
                 'difficulty': question.difficulty,
-                'tags': filtered_tags
+                'tags': get_filtered_tags(question, user_position, self.context)
             })
         return questions_data
 
@@ -199,7 +222,7 @@ class ExamPaperResultSerializer(serializers.ModelSerializer):
 
     def get_question_count(self, obj):
         """获取题目数量"""
-        return obj.exam_records.count()
+        return len(obj.exam_records.all())
 
 
 class ExamSubmissionSerializer(serializers.Serializer):
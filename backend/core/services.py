@@ -1,16 +1,53 @@
 import random
 import json
+import numpy as np
 import requests
 from datetime import timedelta
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import Question, ExamPaper, ExamRecord
+from .models import Question, ExamPaper, ExamRecord, Tag
+from .cache import CAPABILITY_PROFILE, QUESTION, TAG, bump_generation, cached
+from .snapshot import ROLE_FALLBACK_CATEGORIES, get_current_snapshot
+from .item_stats import record_questions_served, record_submission
+from .wrong_questions import select_review_questions, update_wrong_questions
+from .monitor import record_paper_generated, record_paper_submitted
+from .write_behind import defer_write
 from analysis.models import CapabilityProfile
+from analysis.cohort import mark_cohort_stale
 
 User = get_user_model()
 
+def get_role_tag_id(position):
+    """职位对应的role标签ID（缓存，标签变化时失效），没有时返回None"""
+    return cached(
+        'role_tag', position, [TAG],
+        lambda: Tag.objects.filter(name=position, category='role').values_list('id', flat=True).first()
+    )
+
+
+def get_role_question_ids(position, question_type=None):
+    """
+    职位可用的启用题目ID列表（缓存，题目或标签变化时失效）
+
+    管理员可使用全部题目；有对应role标签时取该标签下的题目，
+    否则取position、emergency、comprehensive分类的题目
+    """
+    def compute():
+        questions = Question.objects.filter(is_active=True)
+        if question_type:
+            questions = questions.filter(question_type=question_type)
+        if position != '系统管理员':
+            role_tag_id = get_role_tag_id(position)
+            if role_tag_id:
+                questions = questions.filter(tags=role_tag_id)
+            else:
+                questions = questions.filter(tags__category__in=ROLE_FALLBACK_CATEGORIES).distinct()
+        return list(questions.values_list('id', flat=True))
+
+    return cached('role_questions', f'{position}:{question_type or "all"}', [QUESTION, TAG], compute)
+
 
 class ExamGenerationService:
     """智能组卷服务"""
@@ -34,26 +71,44 @@ class ExamGenerationService:
 
         user = User.objects.get(id=user_id)
 
-        # 获取用户弱项标签
-        weak_tags = self._get_weak_tags(user)
-
-        # 获取策略分配
-        strategy_counts = self._calculate_strategy_counts(question_count)
+        selected_questions = []
+        if reason == ExamPaper.GenerationReason.ERROR_REVIEW:
+            # 错题回顾：直接从错题本按到期时间取题
+            selected_questions = self._select_error_review_questions(user, question_count)
+            if not selected_questions:
+                print(f"用户 {user_id} 的错题本为空，按常规策略组卷")
 
-        # 获取候选题目池
-        candidate_questions = self._get_candidate_questions(user)
+        if not selected_questions:
+            # 获取用户弱项标签
+            weak_tags = self._get_weak_tags(user)
+
+            # 获取策略分配
+            strategy_counts = self._calculate_strategy_counts(question_count)
+
+            snapshot = get_current_snapshot()
+            if snapshot is not None:
+                # 题库快照与数据库一致时在快照上抽题，只按ID读取选中的题目
+                candidate_questions = None
+                selected_questions = self._select_questions_from_snapshot(
+                    snapshot, weak_tags, strategy_counts, user
+                )
+            else:
+                # 获取候选题目池
+                candidate_questions = self._get_candidate_questions(user)
 
-        # 按策略抽题
-        selected_questions = self._select_questions_by_strategy(
-            candidate_questions, weak_tags, strategy_counts, user
-        )
+                # 按策略抽题
+                selected_questions = self._select_questions_by_strategy(
+                    candidate_questions, weak_tags, strategy_counts, user
+                )
 
         # 确保至少选择了题目
         if not selected_questions:
             print(f"警告：未能为用户 {user_id} 生成任何题目！")
-            print(f"候选题目总数: {candidate_questions.count()}")
-            print(f"弱项标签: {weak_tags}")
-            print(f"策略分配: {strategy_counts}")
+            if reason != ExamPaper.GenerationReason.ERROR_REVIEW:
+                if candidate_questions is not None:
+                    print(f"候选题目总数: {candidate_questions.count()}")
+                print(f"弱项标签: {weak_tags}")
+                print(f"策略分配: {strategy_counts}")
         else:
             print(f"成功为用户 {user_id} 选择了 {len(selected_questions)} 道题目")
 
@@ -75,8 +130,19 @@ class ExamGenerationService:
                     score_gained=0.0  # 初始未答题，得分为0
                 )
 
+            defer_write(record_questions_served, [question.id for question in selected_questions])
+
+            department = user.department
+            transaction.on_commit(lambda: record_paper_generated(exam_paper, department))
+
         return exam_paper
 
+    def _select_error_review_questions(self, user, count):
+        """错题回顾取题（优先已到期的错题），顺序随机打乱"""
+        questions = select_review_questions(user, count)
+        random.shuffle(questions)
+        return questions
+
     def _get_weak_tags(self, user):
         """获取用户的弱项标签（掌握度低于阈值的标签，排除role标签）"""
         threshold = self.settings['WEAK_CAPABILITY_THRESHOLD']
@@ -103,22 +169,22 @@ class ExamGenerationService:
             'new': new_count
         }
 
-    def _get_candidate_questions(self, user):
-        """获取候选题目池，排除用户最近做过的题目，并根据用户职位筛选"""
+    def _get_recent_question_ids(self, user):
+        """用户最近做过的题目ID"""
         exclude_hours = self.settings['EXCLUDE_RECENT_HOURS']
         cutoff_time = timezone.now() - timedelta(hours=exclude_hours)
-
-        # 获取用户最近做过的题目ID
-        recent_question_ids = ExamRecord.objects.filter(
+        return ExamRecord.objects.filter(
             paper__user=user,
             created_at__gte=cutoff_time
         ).values_list('question_id', flat=True)
 
+    def _get_candidate_questions(self, user):
+        """获取候选题目池，排除用户最近做过的题目，并根据用户职位筛选"""
         # 获取可用的题目
         questions = Question.objects.filter(
             is_active=True
         ).exclude(
-            id__in=recent_question_ids
+            id__in=self._get_recent_question_ids(user)
         ).prefetch_related('tags')
 
         # 根据用户职位筛选题目
@@ -128,15 +194,14 @@ class ExamGenerationService:
 
         # 尝试根据用户职位找到对应的role标签
         try:
-            from .models import Tag
-            role_tag = Tag.objects.filter(name=user.position, category='role').first()
-            if role_tag:
+            role_tag_id = get_role_tag_id(user.position)
+            if role_tag_id:
                 # 选择符合用户职位的题目
-                questions = questions.filter(tags=role_tag)
+                questions = questions.filter(tags=role_tag_id)
             else:
                 # 如果没有找到对应的role标签，使用position、emergency、comprehensive分类的题目
                 questions = questions.filter(
-                    tags__category__in=['position', 'emergency', 'comprehensive']
+                    tags__category__in=ROLE_FALLBACK_CATEGORIES
                 ).distinct()
         except Exception as e:
             # 出现异常时，返回所有可用题目作为后备
@@ -162,7 +227,8 @@ class ExamGenerationService:
             weak_questions = candidate_questions.filter(
                 tags__in=weak_tags
             ).exclude(
-                id__in=[q.id for q in selected_questions],
+                id__in=[q.id for q in selected_questions]
+            ).exclude(
                 question_type=Question.QuestionType.SUBJECTIVE
             ).distinct()
 
@@ -174,7 +240,8 @@ class ExamGenerationService:
         # 2. 新题探索题目（如果还有剩余名额）
         if strategy_counts['new'] > 0:
             remaining_questions = candidate_questions.exclude(
-                id__in=[q.id for q in selected_questions],
+                id__in=[q.id for q in selected_questions]
+            ).exclude(
                 question_type=Question.QuestionType.SUBJECTIVE
             )
 
@@ -211,33 +278,64 @@ class ExamGenerationService:
 
         return selected_questions
 
+    def _select_questions_from_snapshot(self, snapshot, weak_tags, strategy_counts, user):
+        """在题库快照上按与 _select_questions_by_strategy 相同的策略抽题"""
+        total_needed = sum(strategy_counts.values())
+        active = snapshot.active_mask()
+        candidates = active & snapshot.role_mask(user.position) & ~snapshot.id_mask(
+            self._get_recent_question_ids(user)
+        )
+        subjective = snapshot.type_mask(Question.QuestionType.SUBJECTIVE)
+        selected = np.zeros(snapshot.count, dtype=bool)
+
+        def pick(mask, count):
+            indexes = np.flatnonzero(mask & ~selected)
+            if count <= 0 or not len(indexes):
+                return 0
+            chosen = np.random.choice(indexes, min(count, len(indexes)), replace=False)
+            selected[chosen] = True
+            return len(chosen)
+
+        # 0. 优先选择1道该角色对应的主观题
+        new_count = strategy_counts['new']
+        if pick(candidates & subjective, 1) and new_count > 0:
+            new_count -= 1
+
+        # 1. 弱项强化题目
+        if weak_tags and strategy_counts['weak'] > 0:
+            weak = snapshot.tag_mask(tag_ids=[tag.id for tag in weak_tags])
+            pick(candidates & weak & ~subjective, strategy_counts['weak'])
+
+        # 2. 新题探索题目
+        pick(candidates & ~subjective, new_count)
+
+        # 3. 容错机制：题目不够时从剩余候选题目中补充
+        pick(candidates, total_needed - int(selected.sum()))
+
+        # 4. 极端情况：没有任何题目时放宽到全部启用题目
+        if not selected.any():
+            pick(active, total_needed)
+
+        questions = Question.objects.in_bulk(snapshot.ids[selected].tolist())
+        selected_questions = list(questions.values())
+        random.shuffle(selected_questions)
+        return selected_questions
+
     def _get_role_subjective_question(self, candidate_questions, user):
         """获取该角色对应的主观题"""
         try:
-            from .models import Tag
-            # 管理员可以使用所有主观题
-            if user.position == '系统管理员':
-                role_questions = candidate_questions.filter(
-                    question_type=Question.QuestionType.SUBJECTIVE
+            # 职位对应的主观题ID列表来自缓存，只需排除最近做过的题目
+            recent_ids = set(self._get_recent_question_ids(user))
+            available_ids = [
+                question_id for question_id in get_role_question_ids(
+                    user.position, Question.QuestionType.SUBJECTIVE
                 )
-            else:
-                # 尝试根据用户职位找到对应的role标签
-                role_tag = Tag.objects.filter(name=user.position, category='role').first()
-                if role_tag:
-                    # 查找包含该role标签的主观题
-                    role_questions = candidate_questions.filter(
-                        tags=role_tag,
-                        question_type=Question.QuestionType.SUBJECTIVE
-                    )
-                else:
-                    # 如果没有找到对应的role标签，使用任意主观题
-                    role_questions = candidate_questions.filter(
-                        question_type=Question.QuestionType.SUBJECTIVE
-                    )
+                if question_id not in recent_ids
+            ]
 
             # 随机选择1道
-            if role_questions.count() > 0:
-                return self._random_select_questions(role_questions, 1)[0]
+            if available_ids:
+                return Question.objects.filter(id=random.choice(available_ids)).first()
 
         except Exception as e:
             # 出现异常时返回None，不影响正常组卷流程
@@ -255,6 +353,10 @@ class ExamGenerationService:
         return random.sample(question_list, count)
 
 
+class ExamAlreadySubmitted(Exception):
+    """试卷已被提交（考生重复提交或与超时自动交卷同时发生）"""
+
+
 class ExamScoringService:
     """考试评分服务"""
 
@@ -262,73 +364,91 @@ class ExamScoringService:
         self.settings = settings.ASSESSMENT_SETTINGS
         self.ai_settings = getattr(settings, 'AI_GRADING_SETTINGS', {})
 
-    def submit_exam(self, paper_id, answers):
+    def submit_exam(self, paper_id, answers, auto_submitted=False):
         """
         提交试卷并自动评分
 
         Args:
             paper_id: 试卷ID
-            answers: 用户答案字典 {question_id: user_answer}
+            answers: 用户答案字典 {question_id: user_answer}，缺少的题目使用已保存的答案
+            auto_submitted: 是否为超时自动交卷
 
         Returns:
             dict: 评分结果
         """
         paper = ExamPaper.objects.get(id=paper_id)
+        previous_status = paper.status
+        if previous_status == ExamPaper.Status.COMPLETED:
+            raise ExamAlreadySubmitted(f'试卷{paper_id}已提交')
+
+        # 评分（包括主观题的AI评分）在写事务之外完成，写事务只包含数据库写入，
+        # 等待AI接口时不占用数据库写锁
+        total_score = 0
+        tag_scores = {}  # 记录各标签的得分情况
+
+        records = list(paper.exam_records.select_related('question').prefetch_related('question__tags'))
+        score_per_question = paper.total_score / len(records) if records else 0
+
+        for record in records:
+            question_id = record.question.id
+            # 未在本次提交中出现的题目使用考试过程中已保存的答案
+            user_answer = answers.get(str(question_id), record.user_answer)
+
+            # 更新用户答案
+            record.user_answer = user_answer
+
+            # 判断对错并计分
+            result = self._check_answer(record.question, user_answer)
+
+            if record.question.question_type == Question.QuestionType.SUBJECTIVE:
+                # 主观题：result是AI评分的分数(0-100)
+                ai_score = result
+                print(f"[AI评分] 主观题ID:{record.question.id}, AI评分: {ai_score}")
+                # 将分数按比例转换为题目得分
+                record.score_gained = score_per_question * (ai_score / 100)
+                record.ai_score = ai_score  # 保存AI原始分数
+                record.is_correct = ai_score >= 60  # 60分以上算合格
+                print(f"[AI评分] 保存到数据库 - ai_score: {record.ai_score}, score_gained: {record.score_gained}, is_correct: {record.is_correct}")
+            else:
+                # 客观题：result是布尔值
+                is_correct = result
+                record.is_correct = is_correct
+                record.score_gained = score_per_question if is_correct else 0
+
+            total_score += record.score_gained
+
+            # 统计各标签的得分情况（排除role标签，专注能力维度）
+            for tag in record.question.tags.all():
+                # 排除role标签，只统计实际能力相关的标签
+                if tag.category == 'role':
+                    continue
+
+                if tag not in tag_scores:
+                    tag_scores[tag] = {'correct': 0, 'total': 0}
+                tag_scores[tag]['total'] += 1
+                # 使用record.is_correct来判断是否正确
+                if record.is_correct:
+                    tag_scores[tag]['correct'] += 1
 
         with transaction.atomic():
+            # 先用条件更新占用试卷，重复提交（包括与超时自动交卷同时发生）时只有一次能成功
+            completed_at = timezone.now()
+            claimed = ExamPaper.objects.filter(id=paper_id).exclude(
+                status=ExamPaper.Status.COMPLETED
+            ).update(status=ExamPaper.Status.COMPLETED, completed_at=completed_at)
+            if not claimed:
+                raise ExamAlreadySubmitted(f'试卷{paper_id}已提交')
+
             # 更新试卷状态
             paper.status = ExamPaper.Status.COMPLETED
-            paper.completed_at = timezone.now()
-
-            total_score = 0
-            tag_scores = {}  # 记录各标签的得分情况
+            paper.completed_at = completed_at
 
             # 批量更新答题记录
-            records = paper.exam_records.select_related('question').prefetch_related('question__tags')
-
             for record in records:
-                question_id = record.question.id
-                user_answer = answers.get(str(question_id), '')
-
-                # 更新用户答案
-                record.user_answer = user_answer
-
-                # 判断对错并计分
-                result = self._check_answer(record.question, user_answer)
-
-                if record.question.question_type == Question.QuestionType.SUBJECTIVE:
-                    # 主观题：result是AI评分的分数(0-100)
-                    ai_score = result
-                    print(f"[AI评分] 主观题ID:{record.question.id}, AI评分: {ai_score}")
-                    # 将分数按比例转换为题目得分
-                    score_per_question = paper.total_score / records.count()
-                    record.score_gained = score_per_question * (ai_score / 100)
-                    record.ai_score = ai_score  # 保存AI原始分数
-                    record.is_correct = ai_score >= 60  # 60分以上算合格
-                    print(f"[AI评分] 保存到数据库 - ai_score: {record.ai_score}, score_gained: {record.score_gained}, is_correct: {record.is_correct}")
-                else:
-                    # 客观题：result是布尔值
-                    is_correct = result
-                    record.is_correct = is_correct
-                    score_per_question = paper.total_score / records.count()
-                    record.score_gained = score_per_question if is_correct else 0
-
-                total_score += record.score_gained
-
-                # 统计各标签的得分情况（排除role标签，专注能力维度）
-                for tag in record.question.tags.all():
-                    # 排除role标签，只统计实际能力相关的标签
-                    if tag.category == 'role':
-                        continue
-
-                    if tag not in tag_scores:
-                        tag_scores[tag] = {'correct': 0, 'total': 0}
-                    tag_scores[tag]['total'] += 1
-                    # 使用record.is_correct来判断是否正确
-                    if record.is_correct:
-                        tag_scores[tag]['correct'] += 1
-
-                record.save()
+                record.updated_at = completed_at
+            ExamRecord.objects.bulk_update(
+                records, ['user_answer', 'is_correct', 'score_gained', 'ai_score', 'updated_at']
+            )
 
             # 更新试卷总分
             paper.score_obtained = total_score
@@ -337,6 +457,20 @@ class ExamScoringService:
             # 更新能力画像
             self._update_capability_profiles(paper.user, tag_scores)
 
+            # 题目作答统计和错题本不影响交卷结果，提交后交给写入协调器批量写入
+            defer_write(record_submission, records)
+            defer_write(update_wrong_questions, paper.user_id, records, completed_at)
+
+            # 提交成功后同岗位能力分布需要重建
+            position = paper.user.position
+            transaction.on_commit(lambda: mark_cohort_stale(position))
+
+            # 更新考试实时监控计数
+            department = paper.user.department
+            transaction.on_commit(lambda: record_paper_submitted(
+                paper, department, previous_status, total_score, auto_submitted
+            ))
+
         return {
             'paper_id': paper.id,
             'total_score': total_score,
@@ -363,32 +497,41 @@ class ExamScoringService:
         return user_answer == correct_answer
 
     def _update_capability_profiles(self, user, tag_scores):
-        """更新用户能力画像"""
+        """更新用户能力画像（一次读取本卷涉及的全部标签画像，批量写入）"""
         weight_old = self.settings['CAPABILITY_UPDATE_WEIGHT_OLD']
         weight_new = self.settings['CAPABILITY_UPDATE_WEIGHT_NEW']
 
+        profiles = {
+            profile.tag_id: profile
+            for profile in CapabilityProfile.objects.filter(user=user, tag__in=list(tag_scores))
+        }
+        now = timezone.now()
+        changed, created = [], []
         for tag, score_data in tag_scores.items():
             # 计算当前该标签的准确率
             current_accuracy = score_data['correct'] / score_data['total']
 
-            # 获取或创建能力画像记录
-            profile, created = CapabilityProfile.objects.get_or_create(
-                user=user,
-                tag=tag,
-                defaults={'mastery_level': 50.0}
-            )
-
-            if created:
+            profile = profiles.get(tag.id)
+            if profile is None:
                 # 新标签，直接基于当前表现设置初始值
                 new_score = current_accuracy * 100
+                profile = CapabilityProfile(user=user, tag=tag)
+                created.append(profile)
             else:
                 # 已有标签，使用加权移动平均
                 old_score = profile.mastery_level
                 new_score = (old_score * weight_old) + (current_accuracy * 100 * weight_new)
+                profile.updated_at = now
+                changed.append(profile)
 
             # 确保分数在0-100范围内
             profile.mastery_level = max(0, min(100, new_score))
-            profile.save()
+
+        CapabilityProfile.objects.bulk_update(changed, ['mastery_level', 'updated_at'])
+        CapabilityProfile.objects.bulk_create(created)
+        # 批量写入不触发 post_save，单独使该用户的能力画像缓存失效
+        if changed or created:
+            bump_generation(CAPABILITY_PROFILE, user.id)
 
     def _ai_grade_subjective(self, question, user_answer):
         """使用AI对主观题进行评分"""
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import ExamPaper, Question, Tag
+from .cache import EXAM_PAPER, QUESTION, TAG, bump_generation
+from .dedup import index_questions
+from .rescoring import rescore_question
+
+
+@receiver(post_save, sender=Question)
+def update_question_signature(sender, instance, raw=False, **kwargs):
+    """题目保存后增量维护近似重复检测索引（题干未变化时跳过）"""
+    if raw:
+        return
+    index_questions([instance])
+
+
+@receiver(post_init, sender=Question)
+def remember_correct_answer(sender, instance, **kwargs):
+    """记录加载时的正确答案，用于保存时判断答案是否被更正（字段被延迟加载时不记录）"""
+    instance._loaded_correct_answer = instance.__dict__.get('correct_answer')
+
+
+@receiver(post_save, sender=Question)
+def rescore_on_answer_change(sender, instance, created=False, raw=False, **kwargs):
+    """正确答案被修改后，在事务提交后重新评定已完成试卷中该题的答题记录"""
+    if raw or created:
+        return
+    previous = getattr(instance, '_loaded_correct_answer', None)
+    if previous is None or previous == instance.correct_answer:
+        return
+    instance._loaded_correct_answer = instance.correct_answer
+
+    question_id = instance.id
+    transaction.on_commit(lambda: rescore_question(question_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(m2m_changed, sender=Question.tags.through)
+def bump_question_generation(sender, **kwargs):
+    """题目或题目标签变化后使题目相关缓存失效"""
+    if kwargs.get('raw') or kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    bump_generation(QUESTION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_generation(sender, raw=False, **kwargs):
+    if raw:
+        return
+    bump_generation(TAG)
+
+
+@receiver(post_save, sender=ExamPaper)
+@receiver(post_delete, sender=ExamPaper)
+def bump_exam_paper_generation(sender, instance, raw=False, **kwargs):
+    """试卷变化后使该考生的能力总结等缓存失效"""
+    if raw:
+        return
+    bump_generation(EXAM_PAPER, instance.user_id)
@@ -0,0 +1,315 @@
+"""
+题库快照
+
+compile_question_snapshot 命令把题库编译为一个紧凑的二进制文件，各工作进程以只读方式 mmap 打开，
+同一文件的内存页由操作系统在进程间共享，不再每个进程各自加载一份题目池和标签信息。
+
+文件格式（小端）：
+- 8 字节魔数 + 4 字节元数据长度 + JSON 元数据（版本、编译时的缓存版本号、标签、职位、各数据段位置）
+- 数据段（按 8 字节对齐）：
+  ids               int64[n]        题目ID，按题目列表的默认顺序（-created_at）排列
+  question_type     uint8[n]        题型序号（对应元数据 question_types）
+  difficulty        uint8[n]
+  is_active         uint8[n]
+  tag_bits          uint8[n, ⌈T/8⌉]  题目-标签关联位图（np.packbits）
+  role_masks        uint8[R+1, ⌈n/8⌉] 各职位可用题目位图，最后一行为没有role标签时使用的分类
+  content_offsets   uint64[n+1]     题目 JSON 在内容区中的起止位置
+  content           bytes           题目列表所需字段的 JSON（id、题干、题型、选项、难度、创建时间）
+
+编译时先写入带版本号的新文件，再用 os.replace 原子替换版本文件 CURRENT；
+各进程每隔 CHECK_INTERVAL 秒读取一次版本文件，发现变化时切换到新快照。
+快照记录编译时题目和标签的缓存版本号（见 core/cache.py），题库在编译后有写入时 is_current() 为 False，
+调用方退回数据库查询，直到重新编译。
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import QUESTION, TAG, get_generations
+from .models import Question, Tag
+
+MAGIC = b'QBSNAP01'
+HEADER = struct.Struct('<8sI')
+VERSION_FILE = 'CURRENT'
+ROLE_FALLBACK_CATEGORIES = ['position', 'emergency', 'comprehensive']
+ADMIN_POSITION = '系统管理员'
+QUESTION_TYPES = [choice for choice, _ in Question.QuestionType.choices]
+
+
+def get_snapshot_settings():
+    return getattr(settings, 'QUESTION_SNAPSHOT_SETTINGS', {})
+
+
+def get_snapshot_dir():
+    return str(get_snapshot_settings().get('PATH', settings.BASE_DIR / 'snapshots'))
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def compile_snapshot(directory=None, keep=None):
+    """
+    编译题库快照并原子切换版本文件
+
+    Returns:
+        dict: 快照元数据
+    """
+    directory = directory or get_snapshot_dir()
+    keep = keep or get_snapshot_settings().get('KEEP', 3)
+    os.makedirs(directory, exist_ok=True)
+
+    # 先取版本号再读数据：读取期间有写入时快照会被判定为过期，不会把旧数据当作最新
+    generations = get_generations([QUESTION, TAG])
+
+    # 标签按模型默认顺序排列，题目列表中的标签顺序与数据库查询一致
+    tags = list(Tag.objects.values_list('id', 'name', 'category'))
+    tag_index = {tag_id: index for index, (tag_id, _, _) in enumerate(tags)}
+    rows = list(Question.objects.order_by('-created_at', '-id').values_list(
+        'id', 'content', 'question_type', 'options', 'difficulty', 'created_at', 'is_active'
+    ))
+    count = len(rows)
+    position = {row[0]: index for index, row in enumerate(rows)}
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    question_type = np.array([QUESTION_TYPES.index(row[2]) for row in rows], dtype=np.uint8)
+    difficulty = np.array([row[4] for row in rows], dtype=np.uint8)
+    is_active = np.array([row[6] for row in rows], dtype=np.uint8)
+
+    incidence = np.zeros((count, len(tags)), dtype=bool)
+    for question_id, tag_id in Question.tags.through.objects.values_list('question_id', 'tag_id').iterator():
+        if question_id in position and tag_id in tag_index:
+            incidence[position[question_id], tag_index[tag_id]] = True
+    tag_bits = np.packbits(incidence, axis=1) if len(tags) else np.zeros((count, 0), dtype=np.uint8)
+
+    roles = [name for _, name, category in tags if category == 'role']
+    role_rows = [incidence[:, tag_index[tag_id]] for tag_id, _, category in tags if category == 'role']
+    fallback = [tag_index[tag_id] for tag_id, _, category in tags if category in ROLE_FALLBACK_CATEGORIES]
+    role_rows.append(incidence[:, fallback].any(axis=1) if fallback else np.zeros(count, dtype=bool))
+    role_masks = np.packbits(np.array(role_rows, dtype=bool).reshape(len(role_rows), count), axis=1)
+
+    datetime_field = serializers.DateTimeField()
+    blobs = [
+        json.dumps({
+            'id': row[0],
+            'content': row[1],
+            'question_type': row[2],
+            'options': row[3],
+            'difficulty': row[4],
+            'created_at': datetime_field.to_representation(row[5]),
+        }, ensure_ascii=False).encode('utf-8')
+        for row in rows
+    ]
+    content_offsets = np.zeros(count + 1, dtype=np.uint64)
+    content_offsets[1:] = np.cumsum([len(blob) for blob in blobs], dtype=np.uint64)
+
+    sections = [
+        ('ids', ids), ('question_type', question_type), ('difficulty', difficulty),
+        ('is_active', is_active), ('tag_bits', tag_bits), ('role_masks', role_masks),
+        ('content_offsets', content_offsets),
+    ]
+    version = f"{timezone.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    meta = {
+        'version': version,
+        'compiled_at': timezone.now().isoformat(),
+        'generations': list(generations),
+        'count': count,
+        'question_types': QUESTION_TYPES,
+        'tags': tags,
+        'roles': roles,
+        'sections': {},
+    }
+
+    # 元数据中包含各段的偏移量，偏移量又取决于元数据长度：按预留长度排布，不够时加大重排
+    reserved = 4096
+    while True:
+        offset = _align(HEADER.size + reserved)
+        for name, array in sections:
+            meta['sections'][name] = [offset, array.dtype.str, list(array.shape)]
+            offset = _align(offset + array.nbytes)
+        meta['sections']['content'] = [offset, '|u1', [int(content_offsets[-1])]]
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        if len(meta_bytes) <= reserved:
+            break
+        reserved = _align(len(meta_bytes) * 2)
+
+    filename = f'questions-{version}.bin'
+    path = os.path.join(directory, filename)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, len(meta_bytes)))
+        output.write(meta_bytes)
+        for name, array in sections:
+            output.seek(meta['sections'][name][0])
+            output.write(np.ascontiguousarray(array).tobytes())
+        output.seek(meta['sections']['content'][0])
+        for blob in blobs:
+            output.write(blob)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp_path, path)
+
+    version_path = os.path.join(directory, VERSION_FILE)
+    with open(f'{version_path}.tmp', 'w') as output:
+        output.write(filename)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(f'{version_path}.tmp', version_path)
+
+    _remove_old_snapshots(directory, keep, filename)
+    return meta
+
+
+def _remove_old_snapshots(directory, keep, current):
+    """保留最近 keep 个快照文件（已打开旧文件的进程不受删除影响）"""
+    files = sorted(
+        (name for name in os.listdir(directory) if name.startswith('questions-') and name.endswith('.bin')),
+        reverse=True
+    )
+    for name in files[keep:]:
+        if name != current:
+            os.remove(os.path.join(directory, name))
+
+
+class QuestionSnapshot:
+    """只读映射的题库快照"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'不是题库快照文件: {path}')
+        self.meta = json.loads(self._mmap[HEADER.size:HEADER.size + meta_length].decode('utf-8'))
+
+        # 各数据段直接引用映射的内存，不复制
+        buffer = memoryview(self._mmap)
+        for name, (offset, dtype, shape) in self.meta['sections'].items():
+            size = int(np.prod(shape, dtype=np.int64))
+            array = np.frombuffer(buffer, dtype=np.dtype(dtype), count=size, offset=offset)
+            setattr(self, name, array.reshape(shape))
+
+        self.version = self.meta['version']
+        self.count = self.meta['count']
+        self.generations = tuple(self.meta['generations'])
+        self.tags = [tuple(tag) for tag in self.meta['tags']]
+        self._tag_index = {tag[0]: index for index, tag in enumerate(self.tags)}
+        self._tag_name_index = {}
+        for index, tag in enumerate(self.tags):
+            self._tag_name_index.setdefault(tag[1], []).append(index)
+        self._role_index = {name: index for index, name in enumerate(self.meta['roles'])}
+
+    def is_current(self):
+        """编译后题目和标签是否没有写入（一条版本号查询）"""
+        return get_generations([QUESTION, TAG]) == self.generations
+
+    def _unpack(self, bits):
+        return np.unpackbits(bits, count=self.count).astype(bool)
+
+    def tag_mask(self, tag_ids=None, tag_names=None):
+        """带有任一指定标签的题目"""
+        columns = [self._tag_index[tag_id] for tag_id in tag_ids or () if tag_id in self._tag_index]
+        for name in tag_names or ():
+            columns.extend(self._tag_name_index.get(name, []))
+        if not columns:
+            return np.zeros(self.count, dtype=bool)
+        incidence = np.unpackbits(self.tag_bits, axis=1, count=len(self.tags)).astype(bool)
+        return incidence[:, columns].any(axis=1)
+
+    def role_mask(self, position):
+        """职位可用的题目（与 _get_candidate_questions 的规则一致）"""
+        if position == ADMIN_POSITION:
+            return np.ones(self.count, dtype=bool)
+        row = self._role_index.get(position, len(self._role_index))
+        return self._unpack(self.role_masks[row])
+
+    def type_mask(self, question_type):
+        return self.question_type == QUESTION_TYPES.index(question_type)
+
+    def active_mask(self):
+        return self.is_active.astype(bool)
+
+    def id_mask(self, question_ids):
+        return np.isin(self.ids, np.fromiter(question_ids, dtype=np.int64))
+
+    def question_tags(self, index):
+        bits = np.unpackbits(self.tag_bits[index], count=len(self.tags)).astype(bool)
+        return [self.tags[column] for column in np.flatnonzero(bits)]
+
+    def question_data(self, index, position=None):
+        """题目列表中的一项（字段与 QuestionSerializer 一致，标签按职位过滤）"""
+        start, end = int(self.content_offsets[index]), int(self.content_offsets[index + 1])
+        data = json.loads(self.content[start:end].tobytes().decode('utf-8'))
+        is_admin = position is None or position == ADMIN_POSITION
+        tags = [
+            {'id': tag_id, 'name': name}
+            for tag_id, name, category in self.question_tags(index)
+            if category != 'role' or is_admin or name == position
+        ]
+        return {
+            'id': data['id'],
+            'content': data['content'],
+            'question_type': data['question_type'],
+            'options': data['options'],
+            'tags': tags,
+            'difficulty': data['difficulty'],
+            'created_at': data['created_at'],
+        }
+
+
+_state = {'snapshot': None, 'filename': None, 'checked_at': 0.0}
+_state_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    当前进程使用的快照，版本文件变化时切换；没有快照或未启用时返回 None
+
+    切换只替换引用，正在使用旧快照的请求不受影响，旧映射在不再被引用后释放。
+    """
+    snapshot_settings = get_snapshot_settings()
+    if not snapshot_settings.get('ENABLED', True):
+        return None
+
+    now = time.monotonic()
+    if now - _state['checked_at'] < snapshot_settings.get('CHECK_INTERVAL', 5):
+        return _state['snapshot']
+
+    with _state_lock:
+        if now - _state['checked_at'] < snapshot_settings.get('CHECK_INTERVAL', 5):
+            return _state['snapshot']
+        _state['checked_at'] = now
+        directory = get_snapshot_dir()
+        try:
+            with open(os.path.join(directory, VERSION_FILE)) as source:
+                filename = source.read().strip()
+        except FileNotFoundError:
+            _state['snapshot'] = _state['filename'] = None
+            return None
+
+        if filename != _state['filename']:
+            try:
+                _state['snapshot'] = QuestionSnapshot(os.path.join(directory, filename))
+                _state['filename'] = filename
+                print(f"[题库快照] 进程{os.getpid()}切换到快照 {filename}")
+            except (OSError, ValueError) as e:
+                print(f"[题库快照] 加载 {filename} 失败，继续使用当前快照: {e}")
+        return _state['snapshot']
+
+
+def get_current_snapshot():
+    """与数据库一致的快照，过期或不存在时返回 None（调用方退回数据库查询）"""
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.is_current():
+        return snapshot
+    return None
@@ -6,6 +6,7 @@ app_name = 'core'
 urlpatterns = [
     # 题目相关
     path('questions/', views.QuestionListView.as_view(), name='question-list'),
+    path('questions/import/', views.import_questions, name='question-import'),
     path('questions/<int:pk>/', views.QuestionDetailView.as_view(), name='question-detail'),
 
     # 试卷相关
@@ -13,7 +14,13 @@ urlpatterns = [
     path('exam/<int:pk>/', views.ExamPaperDetailView.as_view(), name='exam-detail'),
     path('exam/generate/', views.generate_exam, name='exam-generate'),
     path('exam/<int:paper_id>/start/', views.start_exam, name='exam-start'),
+    path('exam/<int:paper_id>/answers/', views.save_answers, name='exam-save-answers'),
     path('exam/<int:paper_id>/submit/', views.submit_exam, name='exam-submit'),
     path('exam/<int:paper_id>/delete/', views.delete_exam, name='exam-delete'),
     path('exam/stats/', views.exam_stats, name='exam-stats'),
+    path('exam/monitor/', views.exam_monitor, name='exam-monitor'),
+    path('exam/monitor/stream/', views.exam_monitor_stream, name='exam-monitor-stream'),
+
+    # 缓存
+    path('cache/stats/', views.cache_stats, name='cache-stats'),
 ]
\ No newline at end of file
@@ -1,20 +1,44 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import (
+    api_view, permission_classes, parser_classes, action, authentication_classes, renderer_classes
+)
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Avg, Count
+from django.db import connection
+from django.db.models import Q, Avg, Count, Prefetch
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from datetime import timedelta
+import json
+import os
+import numpy as np
+import time
+import tempfile
 
 from .models import Question, Tag, ExamPaper, ExamRecord
 from .serializers import (
     QuestionSerializer, QuestionDetailSerializer,
     ExamPaperListSerializer, ExamPaperDetailSerializer, ExamPaperResultSerializer,
-    TagSerializer
+    TagSerializer, filter_tags_for_position
 )
-from .services import ExamGenerationService, ExamScoringService
+from .services import ExamGenerationService, ExamScoringService, ExamAlreadySubmitted
+from .deadlines import is_expired, paper_deadline
+from .monitor import get_snapshot, reconcile_if_due, record_paper_started, get_monitor_settings
+from .search import search_questions
+from .importers import QuestionImporter
+from .cache import get_cache_stats
+from .snapshot import get_current_snapshot
+from analysis.replica import read_from_replica
+from users.authentication import CachedTokenAuthentication, QueryParamTokenAuthentication
+
+
+def _is_true(value):
+    """解析请求参数中的布尔值"""
+    return str(value or '').strip().lower() in ('1', 'true', 'yes')
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -25,10 +49,65 @@ class StandardResultsSetPagination(PageNumberPagination):
 
 
 class QuestionListView(generics.ListCreateAPIView):
-    """题目列表视图"""
+    """题目列表视图，支持 ?q= 全文检索及标签、题型、难度、启用状态筛选"""
     queryset = Question.objects.all()
     pagination_class = StandardResultsSetPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        tag = params.get('tag')
+        if tag:
+            # 支持按标签ID或标签名称筛选
+            queryset = queryset.filter(tags__id=tag) if tag.isdigit() else queryset.filter(tags__name=tag)
+
+        question_type = params.get('question_type') or params.get('type')
+        if question_type:
+            queryset = queryset.filter(question_type=question_type)
+
+        difficulty = params.get('difficulty')
+        if difficulty and difficulty.isdigit():
+            queryset = queryset.filter(difficulty=int(difficulty))
+
+        is_active = params.get('is_active')
+        if is_active:
+            queryset = queryset.filter(is_active=_is_true(is_active))
+
+        keyword = params.get('q', '').strip()
+        if keyword:
+            queryset = search_questions(queryset, keyword)
+
+        return queryset.prefetch_related('tags')
+
+    def list(self, request, *args, **kwargs):
+        # 没有全文检索时在题库快照上筛选分页，快照过期或不存在时查询数据库
+        snapshot = get_current_snapshot()
+        if snapshot is None or request.query_params.get('q', '').strip():
+            return super().list(request, *args, **kwargs)
+
+        params = request.query_params
+        mask = np.ones(snapshot.count, dtype=bool)
+        tag = params.get('tag')
+        if tag:
+            mask &= snapshot.tag_mask(tag_ids=[int(tag)]) if tag.isdigit() else snapshot.tag_mask(tag_names=[tag])
+        question_type = params.get('question_type') or params.get('type')
+        if question_type:
+            mask &= (
+                snapshot.type_mask(question_type) if question_type in Question.QuestionType.values
+                else np.zeros(snapshot.count, dtype=bool)
+            )
+        difficulty = params.get('difficulty')
+        if difficulty and difficulty.isdigit():
+            mask &= snapshot.difficulty == int(difficulty)
+        is_active = params.get('is_active')
+        if is_active:
+            mask &= snapshot.active_mask() == _is_true(is_active)
+
+        page = self.paginate_queryset(np.flatnonzero(mask).tolist())
+        position = request.user.position if request.user.is_authenticated else None
+        return self.get_paginated_response([snapshot.question_data(index, position) for index in page])
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return QuestionSerializer
@@ -37,7 +116,7 @@ class QuestionListView(generics.ListCreateAPIView):
 
 class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
     """题目详情视图"""
-    queryset = Question.objects.all()
+    queryset = Question.objects.select_related('stats').prefetch_related('tags')
     serializer_class = QuestionDetailSerializer
 
 
@@ -71,7 +150,10 @@ class ExamPaperListView(generics.ListCreateAPIView):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
-        return queryset.select_related('user').prefetch_related('exam_records__question')
+        # 分组统计的查询不使用模型默认排序，需显式指定
+        return queryset.select_related('user').annotate(
+            question_count=Count('exam_records')
+        ).order_by('-created_at')
 
 
 class ExamPaperDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -83,13 +165,29 @@ class ExamPaperDetailView(generics.RetrieveUpdateDestroyAPIView):
         """根据用户权限返回不同试卷"""
         if self.request.user.is_staff:
             # 管理员可以看到所有试卷
-            return ExamPaper.objects.all()
+            queryset = ExamPaper.objects.all()
         else:
             # 普通用户只能看到自己的试卷
-            return ExamPaper.objects.filter(user=self.request.user)
+            queryset = ExamPaper.objects.filter(user=self.request.user)
+
+        if self.request.method == 'GET':
+            # 读取路径：一次性加载试卷、考生、答题记录、题目及标签，查询数量固定
+            queryset = queryset.select_related('user').prefetch_related(
+                Prefetch(
+                    'exam_records',
+                    queryset=ExamRecord.objects.select_related('question').prefetch_related('question__tags')
+                )
+            )
+        return queryset
+
+    def get_object(self):
+        """同一请求内只加载一次试卷"""
+        if not hasattr(self, '_paper'):
+            self._paper = super().get_object()
+        return self._paper
 
     def get_serializer_class(self):
-        """根据试卷状态选择不同的序列化器"""
+        """根据已加载试卷的状态选择不同的序列化器"""
         instance = self.get_object()
         # 如果是已完成状态，使用带答案的序列化器
         if instance.status == ExamPaper.Status.COMPLETED:
@@ -97,12 +195,6 @@ class ExamPaperDetailView(generics.RetrieveUpdateDestroyAPIView):
         # 其他状态使用默认序列化器（不包含答案）
         return super().get_serializer_class()
 
-    def retrieve(self, request, *args, **kwargs):
-        """重写retrieve方法以返回题目数据"""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
-
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -150,39 +242,35 @@ def start_exam(request, paper_id):
                 'error': '试卷已提交，无法再次开始'
             }, status=status.HTTP_400_BAD_REQUEST)
             
+        # 进行中但已超时的试卷不再放行，由超时扫描按已保存的答案自动交卷
+        if is_expired(exam_paper):
+            return Response({
+                'error': '考试已超时，试卷将按已保存的答案自动提交'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         # 如果是“未开始”，则更新状态；如果是“进行中”，则直接放行（视为重入）
         if exam_paper.status == ExamPaper.Status.NOT_STARTED:
             exam_paper.status = ExamPaper.Status.IN_PROGRESS
             exam_paper.started_at = timezone.now()
             exam_paper.save()
+            record_paper_started(exam_paper, exam_paper.user.department)
 
         # 获取试卷题目信息（不含答案）
         exam_records = exam_paper.exam_records.select_related('question').prefetch_related('question__tags')
         questions_data = []
+        saved_answers = {}
 
         print(f"实际获取的答题记录数量: {exam_records.count()}")
 
         # 获取试卷用户的职位信息，用于过滤role标签
         user_position = exam_paper.user.position
-        is_admin = user_position == '系统管理员'
 
         for record in exam_records:
             question = record.question
             print(f"处理题目: {question.id}, 类型: {question.question_type}")
 
             # 过滤标签：对于非管理员，只显示相关的role标签
-            filtered_tags = []
-            for tag in question.tags.all():
-                if tag.category != 'role':
-                    # 非role标签直接显示
-                    filtered_tags.append({'id': tag.id, 'name': tag.name})
-                elif is_admin:
-                    # 管理员可以看到所有role标签
-                    filtered_tags.append({'id': tag.id, 'name': tag.name})
-                else:
-                    # 非管理员用户，只显示与自己职位相关的role标签
-                    if tag.name == user_position:
-                        filtered_tags.append({'id': tag.id, 'name': tag.name})
+            filtered_tags = filter_tags_for_position(question.tags.all(), user_position)
 
             questions_data.append({
                 'id': question.id,  # 使用id而不是question_id以保持一致性
@@ -192,6 +280,8 @@ def start_exam(request, paper_id):
                 'difficulty': question.difficulty,
                 'tags': filtered_tags
             })
+            if record.user_answer:
+                saved_answers[str(question.id)] = record.user_answer
 
         print(f"准备返回的题目数量: {len(questions_data)}")
 
@@ -201,8 +291,10 @@ def start_exam(request, paper_id):
             'status': exam_paper.get_status_display(),
             'time_limit': exam_paper.time_limit,
             'started_at': exam_paper.started_at,
+            'deadline': paper_deadline(exam_paper),
             'question_count': len(questions_data),
-            'questions': questions_data
+            'questions': questions_data,
+            'saved_answers': saved_answers
         }, status=status.HTTP_200_OK)
 
     except ExamPaper.DoesNotExist:
@@ -219,9 +311,14 @@ def submit_exam(request, paper_id):
         # 检查试卷是否存在且属于当前用户
         exam_paper = ExamPaper.objects.get(id=paper_id, user=request.user)
 
-        # 获取提交的答案
+        if is_expired(exam_paper):
+            return Response({
+                'error': '考试已超时，试卷将按已保存的答案自动提交'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # 获取提交的答案；未提交的题目使用考试中已保存的答案，全部已保存时可提交空字典
         answers = request.data.get('answers', {})
-        if not answers:
+        if not answers and not exam_paper.exam_records.exclude(user_answer='').exists():
             return Response({
                 'error': '未提供答案'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -252,6 +349,10 @@ def submit_exam(request, paper_id):
         return Response({
             'error': '试卷不存在'
         }, status=status.HTTP_404_NOT_FOUND)
+    except ExamAlreadySubmitted:
+        return Response({
+            'error': '试卷已提交，请勿重复提交'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         # 捕获其他可能的异常
         return Response({
@@ -259,6 +360,45 @@ def submit_exam(request, paper_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def save_answers(request, paper_id):
+    """考试过程中保存答案（超时后按已保存的答案自动交卷）"""
+    try:
+        exam_paper = ExamPaper.objects.get(id=paper_id, user=request.user)
+    except ExamPaper.DoesNotExist:
+        return Response({
+            'error': '试卷不存在'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if exam_paper.status != ExamPaper.Status.IN_PROGRESS:
+        return Response({
+            'error': '只能保存进行中试卷的答案'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if is_expired(exam_paper):
+        return Response({
+            'error': '考试已超时，无法继续保存答案'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    answers = request.data.get('answers', {})
+    if not isinstance(answers, dict):
+        return Response({
+            'error': 'answers 必须是 {题目ID: 答案} 格式'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    records = list(exam_paper.exam_records.filter(
+        question_id__in=[key for key in answers if str(key).isdigit()]
+    ))
+    for record in records:
+        record.user_answer = str(answers.get(str(record.question_id), ''))
+    ExamRecord.objects.bulk_update(records, ['user_answer'])
+
+    return Response({
+        'saved': len(records),
+        'deadline': paper_deadline(exam_paper)
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAdminUser])
 def delete_exam(request, paper_id):
@@ -276,8 +416,47 @@ def delete_exam(request, paper_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+@parser_classes([MultiPartParser])
+def import_questions(request):
+    """批量导入题目（管理员专用），上传 .xlsx/.csv 文件"""
+    upload = request.FILES.get('file')
+    if not upload:
+        return Response({
+            'error': '请上传题库文件'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    file_format = os.path.splitext(upload.name)[1].lstrip('.').lower()
+    if file_format not in ('xlsx', 'csv'):
+        return Response({
+            'error': '仅支持 xlsx 和 csv 格式'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    importer = QuestionImporter(
+        create_missing_tags=_is_true(request.data.get('create_tags')),
+        skip_duplicates=_is_true(request.data.get('skip_duplicates')),
+        dry_run=_is_true(request.data.get('dry_run')),
+    )
+
+    # 上传文件落盘后以只读流式方式读取
+    with tempfile.NamedTemporaryFile(suffix=f'.{file_format}') as temp_file:
+        for chunk in upload.chunks():
+            temp_file.write(chunk)
+        temp_file.flush()
+        try:
+            result = importer.import_file(temp_file.name, file_format)
+        except ValueError as e:
+            return Response({
+                'error': f'导入失败: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(result.to_dict(), status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
+@read_from_replica
 def exam_stats(request):
     """获取考试统计数据（管理员专用）"""
     User = get_user_model()
@@ -314,4 +493,69 @@ def exam_stats(request):
         'recent_exams': recent_exams
     }
 
-    return Response(stats_data, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(stats_data, status=status.HTTP_200_OK)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """text/event-stream 内容协商用；推送内容由视图直接写出，这里只渲染错误信息"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode(self.charset)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def exam_monitor(request):
+    """考试实时监控计数快照（管理员专用）"""
+    reconcile_if_due()
+    return Response(get_snapshot(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication, QueryParamTokenAuthentication])
+@permission_classes([permissions.IsAdminUser])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def exam_monitor_stream(request):
+    """
+    考试实时监控推送（SSE，管理员专用）
+
+    浏览器 EventSource 无法设置请求头，可用 ?token= 传递令牌。计数有变化时推送 snapshot 事件，
+    否则定期发送心跳注释；连接达到最长时间后结束，由 EventSource 自动重连。
+    """
+    monitor_settings = get_monitor_settings()
+    push_interval = monitor_settings.get('PUSH_INTERVAL', 2)
+    heartbeat_seconds = monitor_settings.get('HEARTBEAT_SECONDS', 15)
+    max_seconds = monitor_settings.get('STREAM_MAX_SECONDS', 600)
+
+    def events():
+        started = last_sent = time.monotonic()
+        last_payload = None
+        yield f"retry: {int(push_interval * 1000)}\n\n"
+        while time.monotonic() - started < max_seconds:
+            if reconcile_if_due() and not connection.in_atomic_block:
+                # 推送循环期间不占用数据库连接
+                connection.close()
+            payload = json.dumps(get_snapshot(), ensure_ascii=False)
+            now = time.monotonic()
+            if payload != last_payload:
+                yield f"event: snapshot\ndata: {payload}\n\n"
+                last_payload, last_sent = payload, now
+            elif now - last_sent >= heartbeat_seconds:
+                yield ": heartbeat\n\n"
+                last_sent = now
+            time.sleep(push_interval)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # 关闭 Nginx 缓冲，保证实时推送
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """缓存命中率（管理员专用，统计值为处理本次请求的工作进程的数据）"""
+    return Response(get_cache_stats(), status=status.HTTP_200_OK)
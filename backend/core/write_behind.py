@@ -0,0 +1,131 @@
+"""
+写入协调器
+
+交卷、组卷时除了考生需要立即看到的结果（答题记录、试卷得分、能力画像），还有一些非交互的写入：
+题目作答统计、组卷次数计数、错题本。这些写入不需要和交卷在同一个事务中完成，
+在业务事务提交后放入进程内队列，由后台线程按 BATCH_SIZE 条或 FLUSH_INTERVAL 秒合并为一个事务写入，
+SQLite 上每个事务只需一次写锁和一次提交，集中交卷时写锁的争用明显减少。
+
+队列只在内存中，进程异常退出时未写入的部分会丢失，可用 compute_item_stats、rebuild_wrong_questions 命令重建。
+正常退出时会等待队列写完。
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+def get_write_behind_settings():
+    return getattr(settings, 'WRITE_BEHIND_SETTINGS', {})
+
+
+def _run(func, args, kwargs):
+    """单独执行一次写入（失败不影响同批的其他写入）"""
+    try:
+        with transaction.atomic():
+            func(*args, **kwargs)
+        return True
+    except Exception as e:
+        print(f"[写入协调] {func.__name__} 写入失败: {e}")
+        return False
+
+
+class WriteCoordinator:
+    """进程内写入队列和后台写入线程"""
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def _ensure_started(self):
+        # 工作进程由主进程 fork 产生时不会继承线程，按进程号重新创建
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=get_write_behind_settings().get('MAX_QUEUE', 10000))
+            self._thread = threading.Thread(target=self._loop, name='write-behind', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.flush)
+
+    def submit(self, func, *args, **kwargs):
+        """放入队列，队列已满时直接在当前线程写入"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+        except queue.Full:
+            _run(func, args, kwargs)
+
+    def flush(self, timeout=30):
+        """等待队列中的写入全部完成"""
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                print(f"[写入协调] 等待超时，{self._queue.unfinished_tasks} 条写入未完成")
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _loop(self):
+        write_settings = get_write_behind_settings()
+        batch_size = write_settings.get('BATCH_SIZE', 200)
+        interval = write_settings.get('FLUSH_INTERVAL', 0.5)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        try:
+            # 整批在一个事务中写入，每条写入使用保存点，单条失败时回滚该条
+            with transaction.atomic():
+                for func, args, kwargs in batch:
+                    _run(func, args, kwargs)
+        except Exception as e:
+            # 整批提交失败（如等锁超时）时逐条重试
+            print(f"[写入协调] 批量写入失败，逐条重试: {e}")
+            for func, args, kwargs in batch:
+                _run(func, args, kwargs)
+        finally:
+            connection.close_if_unusable_or_obsolete()
+        self.batches += 1
+        self.writes += len(batch)
+
+
+coordinator = WriteCoordinator()
+
+
+def defer_write(func, *args, **kwargs):
+    """
+    当前事务提交后写入（未在事务中时立即放入队列）
+
+    WRITE_BEHIND_SETTINGS['ENABLED'] 为 False 时在提交后直接写入。
+    """
+    if get_write_behind_settings().get('ENABLED', True):
+        transaction.on_commit(lambda: coordinator.submit(func, *args, **kwargs))
+    else:
+        transaction.on_commit(lambda: _run(func, args, kwargs))
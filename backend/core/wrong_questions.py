@@ -0,0 +1,176 @@
+"""
+错题本
+
+交卷时按本卷的对错结果增量维护每个用户的错题本（间隔重复）：
+答错的题目加入错题本并回到第一个复习间隔；已在错题本中的题目答对一次进入下一个间隔，
+全部间隔都答对后移出。错题回顾组卷按 (用户, 到期时间) 索引直接取题，不再扫描答题记录。
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .models import ExamPaper, ExamRecord, WrongQuestion
+
+
+def get_review_intervals():
+    """复习间隔列表（timedelta）"""
+    days = settings.ASSESSMENT_SETTINGS.get('ERROR_REVIEW_INTERVAL_DAYS', (1, 3, 7))
+    return [timedelta(days=value) for value in days]
+
+
+def update_wrong_questions(user_id, records, answered_at):
+    """
+    根据一张试卷的评分结果更新错题本
+
+    Args:
+        user_id: 考生ID
+        records: 已评分的答题记录列表
+        answered_at: 交卷时间
+    """
+    records = [record for record in records if record.question_id]
+    if not records:
+        return
+    intervals = get_review_intervals()
+    entries = {
+        entry.question_id: entry
+        for entry in WrongQuestion.objects.filter(
+            user_id=user_id,
+            question_id__in=[record.question_id for record in records]
+        )
+    }
+
+    to_create, to_update, to_delete = [], [], []
+    for record in records:
+        entry = entries.get(record.question_id)
+        if not record.is_correct:
+            if entry is None:
+                to_create.append(WrongQuestion(
+                    user_id=user_id,
+                    question_id=record.question_id,
+                    last_wrong_at=answered_at,
+                    due_at=answered_at + intervals[0],
+                ))
+            else:
+                entry.wrong_count += 1
+                entry.review_stage = 0
+                entry.last_wrong_at = answered_at
+                entry.due_at = answered_at + intervals[0]
+                to_update.append(entry)
+        elif entry is not None:
+            entry.review_stage += 1
+            entry.last_reviewed_at = answered_at
+            if entry.review_stage >= len(intervals):
+                to_delete.append(entry.id)
+            else:
+                entry.due_at = answered_at + intervals[entry.review_stage]
+                to_update.append(entry)
+
+    if to_create:
+        WrongQuestion.objects.bulk_create(to_create)
+    if to_update:
+        WrongQuestion.objects.bulk_update(
+            to_update, ['wrong_count', 'review_stage', 'last_wrong_at', 'last_reviewed_at', 'due_at']
+        )
+    if to_delete:
+        WrongQuestion.objects.filter(id__in=to_delete).delete()
+
+
+def select_review_questions(user, count):
+    """
+    错题回顾取题：优先取已到期的错题，不足时提前复习最早到期的错题
+
+    Returns:
+        list[Question]
+    """
+    entries = WrongQuestion.objects.filter(
+        user=user,
+        question__is_active=True
+    ).select_related('question').order_by('due_at')[:count]
+    return [entry.question for entry in entries]
+
+
+def rebuild_wrong_questions(user_ids=None, user_chunk_size=200):
+    """
+    按已完成试卷的历史答题记录重建错题本
+
+    对每个 (用户, 题目)：答错次数为历史答错总数，复习阶段为最后一次答错之后答对的次数，
+    复习阶段达到间隔数的题目不进入错题本。
+
+    Args:
+        user_ids: 只重建这些用户，默认为全部有已完成试卷的用户
+
+    Returns:
+        int: 重建后的错题数量
+    """
+    intervals = get_review_intervals()
+    interval_array = np.array(intervals, dtype='timedelta64[us]')
+    if user_ids is None:
+        user_ids = ExamPaper.objects.filter(
+            status=ExamPaper.Status.COMPLETED
+        ).values_list('user_id', flat=True).distinct().order_by('user_id')
+    user_ids = sorted(set(user_ids))
+
+    created = 0
+    for start in range(0, len(user_ids), user_chunk_size):
+        chunk = user_ids[start:start + user_chunk_size]
+        frame = pd.DataFrame.from_records(
+            ExamRecord.objects.filter(
+                paper__user_id__in=chunk,
+                paper__status=ExamPaper.Status.COMPLETED,
+                paper__completed_at__isnull=False
+            ).values_list('paper__user_id', 'question_id', 'paper__completed_at', 'is_correct'),
+            columns=['user_id', 'question_id', 'completed_at', 'is_correct']
+        )
+        entries = _replay_wrong_answers(frame, len(intervals), interval_array)
+        with transaction.atomic():
+            WrongQuestion.objects.filter(user_id__in=chunk).delete()
+            WrongQuestion.objects.bulk_create(
+                [
+                    WrongQuestion(
+                        user_id=int(row.user_id),
+                        question_id=int(row.question_id),
+                        wrong_count=int(row.wrong_count),
+                        review_stage=int(row.review_stage),
+                        last_wrong_at=row.last_wrong_at,
+                        last_reviewed_at=None if pd.isna(row.last_reviewed_at) else row.last_reviewed_at,
+                        due_at=row.due_at,
+                    )
+                    for row in entries.itertuples(index=False)
+                ],
+                batch_size=1000
+            )
+        created += len(entries)
+    return created
+
+
+def _replay_wrong_answers(frame, stage_count, interval_array):
+    """由答题历史计算错题本条目（向量化，不逐条回放）"""
+    if frame.empty:
+        return frame.assign(wrong_count=0, review_stage=0, last_wrong_at=None, last_reviewed_at=None, due_at=None)
+
+    frame['wrong'] = ~frame['is_correct'].fillna(False).astype(bool)
+    keys = ['user_id', 'question_id']
+    wrong = frame[frame['wrong']].groupby(keys).agg(
+        wrong_count=('wrong', 'size'),
+        last_wrong_at=('completed_at', 'max'),
+    )
+    if wrong.empty:
+        return wrong.reset_index().assign(review_stage=0, last_reviewed_at=None, due_at=None)
+
+    # 最后一次答错之后的答对记录
+    later = frame[~frame['wrong']].join(wrong['last_wrong_at'], on=keys, how='inner')
+    later = later[later['completed_at'] > later['last_wrong_at']]
+    reviews = later.groupby(keys).agg(
+        review_stage=('completed_at', 'size'),
+        last_reviewed_at=('completed_at', 'max'),
+    )
+
+    entries = wrong.join(reviews, how='left').reset_index()
+    entries['review_stage'] = entries['review_stage'].fillna(0).astype(int)
+    entries = entries[entries['review_stage'] < stage_count].copy()
+    anchor = entries['last_reviewed_at'].fillna(entries['last_wrong_at'])
+    entries['due_at'] = anchor + pd.to_timedelta(interval_array[entries['review_stage'].to_numpy()])
+    return entries
@@ -0,0 +1,17 @@
+"""
+gunicorn 配置（在 backend 目录启动 gunicorn 时自动读取）
+
+考试监控推送接口 /api/exam/monitor/stream/（SSE）的每个连接会占用一个处理线程，
+最长 EXAM_MONITOR_SETTINGS['STREAM_MAX_SECONDS'] 秒。gunicorn 默认的单个 sync 工作进程
+同一时间只能处理一个请求，管理员打开监控页面后其他接口（包括交卷）都会被阻塞，
+因此使用 gthread：多个工作进程，每个进程多个线程，推送连接只占用其中一个线程。
+同时打开监控页面的管理员数应明显少于 工作进程数 × 线程数。
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+# gthread 的超时只检测工作进程是否卡死，不限制单个请求（长连接推送不受影响）
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
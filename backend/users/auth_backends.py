@@ -1,22 +1,19 @@
 from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth import get_user_model
-from django.db.models import Q
 
-User = get_user_model()
+from .login import find_login_user, verify_password
+
 
 class JobNumberBackend(ModelBackend):
     """
     自定义认证后端，支持使用工号或用户名登录
+
+    按输入格式只走一个唯一索引查找用户，密码在有界线程池中校验（见 users/login.py）。
     """
 
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # 尝试使用工号或用户名查找用户
-            user = User.objects.get(
-                Q(job_number=username) | Q(username=username)
-            )
-            if user.check_password(password) and user.is_active:
-                return user
-        except User.DoesNotExist:
+        if not username or password is None:
             return None
-        return None
\ No newline at end of file
+        user = find_login_user(username)
+        if verify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,184 @@
+"""
+令牌认证
+
+TokenAuthentication 每个请求都要联表查询 authtoken_token 和 users。CachedTokenAuthentication
+把 令牌→用户 缓存在进程内的 LRU 中（容量和有效期可配置，可选再由共享的 Django 缓存兜底），
+命中时不访问数据库。
+
+缓存在以下情况失效：
+- 令牌被删除（登出、管理员删除）
+- 用户被保存（修改密码、启用/停用等）
+
+以上均通过信号触发，见 users/signals.py。本进程的缓存直接清除；其他进程（多个 gunicorn
+工作进程、后台任务容器）通过用户的令牌版本号（cache_generations 表中的 user_token:<用户ID>）感知：
+每条缓存记录写入时的版本号，命中后用一条主键查询比较，版本号变化即视为失效并重新查库。
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache import USER_TOKEN, bump_generation, generation_name, get_generations
+
+SHARED_KEY_PREFIX = 'auth_token'
+
+
+def get_token_cache_settings():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_SETTINGS', {})
+
+
+class TokenCache:
+    """带过期时间的进程内 LRU：{令牌: (过期时刻, 用户, 令牌创建时间, 令牌版本号)}"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._user_keys = {}  # {用户ID: {令牌}}，用于按用户失效
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2], entry[3]
+
+    def set(self, key, user, created, generation, ttl, max_entries):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, user, created, generation)
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._user_keys.get(entry[1].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[entry[1].pk]
+
+
+token_cache = TokenCache()
+
+
+def _shared_key(key):
+    return f'{SHARED_KEY_PREFIX}:{key}'
+
+
+def _shared_user_key(user_id):
+    return f'{SHARED_KEY_PREFIX}:user:{user_id}'
+
+
+def get_token_generation(user_id):
+    """用户当前的令牌版本号"""
+    return get_generations([generation_name(USER_TOKEN, user_id)])[0]
+
+
+def invalidate_token(key, user_id=None):
+    """令牌删除后清除缓存（指定用户时同时使其他进程中该用户的缓存失效）"""
+    token_cache.invalidate(key)
+    if user_id is not None:
+        bump_generation(USER_TOKEN, user_id)
+    if get_token_cache_settings().get('USE_SHARED_CACHE', False):
+        cache.delete(_shared_key(key))
+
+
+def invalidate_user(user_id):
+    """用户信息变化（密码、启用状态等）后清除该用户的全部令牌缓存，包括其他进程中的缓存"""
+    token_cache.invalidate_user(user_id)
+    bump_generation(USER_TOKEN, user_id)
+    if get_token_cache_settings().get('USE_SHARED_CACHE', False):
+        keys = cache.get(_shared_user_key(user_id)) or []
+        cache.delete_many([_shared_key(key) for key in keys] + [_shared_user_key(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """带缓存的令牌认证，可选令牌过期（TOKEN_EXPIRE_HOURS，默认不过期）"""
+
+    def authenticate_credentials(self, key):
+        cache_settings = get_token_cache_settings()
+        ttl = cache_settings.get('TTL_SECONDS', 60)
+        use_shared = cache_settings.get('USE_SHARED_CACHE', False)
+        max_entries = cache_settings.get('MAX_ENTRIES', 10000)
+
+        cached = token_cache.get(key) if ttl else None
+        if cached is None and use_shared:
+            cached = cache.get(_shared_key(key))
+            if cached is not None and len(cached) == 3:
+                token_cache.set(key, *cached, ttl, max_entries)
+            else:
+                cached = None
+        if cached is not None and cached[2] != get_token_generation(cached[0].pk):
+            # 令牌或用户已在其他进程中被修改
+            token_cache.invalidate(key)
+            cached = None
+
+        if cached is None:
+            # 先读版本号再查库：查库后发生的修改会使版本号变化，不会缓存旧数据
+            user_id = self.get_model().objects.filter(key=key).values_list('user_id', flat=True).first()
+            generation = get_token_generation(user_id) if user_id is not None else 0
+            user, token = super().authenticate_credentials(key)
+            cached = (user, token.created, generation)
+            if ttl:
+                token_cache.set(key, user, token.created, generation, ttl, max_entries)
+                if use_shared:
+                    cache.set(_shared_key(key), cached, ttl)
+                    user_keys = cache.get(_shared_user_key(user.pk)) or []
+                    if key not in user_keys:
+                        cache.set(_shared_user_key(user.pk), user_keys + [key], ttl)
+
+        user, created, _ = cached
+        expire_hours = cache_settings.get('TOKEN_EXPIRE_HOURS')
+        if expire_hours and created + timedelta(hours=expire_hours) < timezone.now():
+            self.get_model().objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed('认证令牌已过期，请重新登录。')
+        # 每个请求使用副本，避免视图修改 request.user 时影响缓存中的对象；
+        # 与 TokenAuthentication 一样以令牌对象作为 request.auth（缓存命中时不查库）
+        user = copy.copy(user)
+        return user, self.get_model()(key=key, user=user, created=created)
+
+
+class QueryParamTokenAuthentication(CachedTokenAuthentication):
+    """
+    从查询参数 ?token= 读取令牌
+
+    浏览器的 EventSource 无法设置请求头，仅用于服务端推送（SSE）接口。
+    """
+    query_param = 'token'
+
+    def authenticate(self, request):
+        key = request.query_params.get(self.query_param)
+        if not key:
+            return None
+        return self.authenticate_credentials(key)
@@ -0,0 +1,42 @@
+"""
+密码哈希辅助函数
+
+PBKDF2 计算量大，批量开户时在进程池中并行计算。
+本模块不导入任何模型，便于在子进程中直接使用。
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _make_password(raw_password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(raw_password)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def hash_passwords(raw_passwords, workers=None, parallel_threshold=8):
+    """
+    批量计算密码哈希
+
+    Args:
+        raw_passwords: 明文密码列表
+        workers: 进程数，默认使用CPU核数
+        parallel_threshold: 少于该数量时直接在当前进程计算
+
+    Returns:
+        list: 与输入一一对应的密码哈希
+    """
+    raw_passwords = list(raw_passwords)
+    if len(raw_passwords) < parallel_threshold or workers == 1:
+        return [_make_password(raw) for raw in raw_passwords]
+
+    # 子进程不应继承父进程已打开的数据库连接
+    from django.db import connections
+    connections.close_all()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        chunksize = max(1, len(raw_passwords) // ((workers or 4) * 4))
+        return list(executor.map(_make_password, raw_passwords, chunksize=chunksize))
@@ -0,0 +1,241 @@
+"""
+员工批量导入
+
+从 Excel(.xlsx)/CSV 读取员工信息，以工号为唯一键做插入或更新：
+新员工的密码哈希在进程池中并行计算，用户与登录 Token 均通过 bulk_create 批量写入，
+可选为新员工批量初始化能力画像。
+"""
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from core.cache import USER, USER_TOKEN, bump_generation, bump_generations
+from core.importers import iter_table_rows, cell_text
+from .hashing import hash_passwords
+from .models import User
+
+HEADER_ALIASES = {
+    'job_number': ('job_number', '工号'),
+    'username': ('username', '用户名'),
+    'name': ('name', '姓名'),
+    'position': ('position', '岗位', '职位'),
+    'department': ('department', '部门', '所属车站/部门', '车站'),
+    'email': ('email', '邮箱'),
+    'password': ('password', '密码', '初始密码'),
+}
+
+# 导入时会更新的字段（密码仅在显式要求时重置）
+UPDATE_FIELDS = ['position', 'department', 'first_name', 'last_name', 'email']
+
+
+class UserImportResult:
+    """导入结果"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.tokens_created = 0
+        self.profiles_created = 0
+        self.errors = []  # [(行号, 错误信息)]
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+class UserImporter:
+    """员工批量导入器"""
+
+    def __init__(self, default_password=None, workers=None, chunk_size=1000,
+                 reset_passwords=False, seed_profiles=False, dry_run=False):
+        self.default_password = default_password
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.reset_passwords = reset_passwords
+        self.seed_profiles = seed_profiles
+        self.dry_run = dry_run
+
+    def import_file(self, path, file_format=None):
+        """导入员工文件，返回 UserImportResult"""
+        result = UserImportResult()
+        rows = iter_table_rows(path, file_format)
+        header = next(rows, None)
+        if header is None:
+            return result
+        columns = _map_header(header[1])
+
+        chunk = []
+        seen_job_numbers = {}
+        for row_number, values in rows:
+            row = {
+                field: cell_text(values[index]) if index < len(values) else ''
+                for index, field in columns
+            }
+            if not any(row.values()):
+                continue
+            result.total_rows += 1
+            try:
+                parsed = self.parse_row(row)
+            except ValueError as e:
+                result.add_error(row_number, str(e))
+                continue
+
+            job_number = parsed['job_number']
+            if job_number in seen_job_numbers:
+                result.add_error(row_number, f'工号 {job_number} 与第{seen_job_numbers[job_number]}行重复')
+                continue
+            seen_job_numbers[job_number] = row_number
+
+            chunk.append((row_number, parsed))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, result)
+                chunk = []
+
+        self._flush(chunk, result)
+        return result
+
+    def parse_row(self, row):
+        """解析并校验单行数据"""
+        job_number = row.get('job_number', '')
+        if not job_number:
+            raise ValueError('工号不能为空')
+        if len(job_number) > User._meta.get_field('job_number').max_length:
+            raise ValueError(f'工号过长: {job_number}')
+        if not row.get('position'):
+            raise ValueError('岗位不能为空')
+        if not row.get('department'):
+            raise ValueError('部门不能为空')
+
+        password = row.get('password') or self.default_password
+        name = row.get('name', '')
+        return {
+            'job_number': job_number,
+            'username': row.get('username') or job_number,
+            # 与现有数据保持一致：first_name 存姓，last_name 存名
+            'first_name': name[:1],
+            'last_name': name[1:],
+            'position': row['position'],
+            'department': row['department'],
+            'email': row.get('email', ''),
+            'password': password,
+        }
+
+    def _flush(self, chunk, result):
+        """按工号批量插入或更新一批员工"""
+        if not chunk:
+            return
+
+        existing = {
+            user['job_number']: user
+            for user in User.objects.filter(
+                job_number__in=[parsed['job_number'] for _, parsed in chunk]
+            ).values('id', 'job_number', 'username')
+        }
+
+        # 新员工的用户名不能与其他员工冲突
+        new_usernames = [parsed['username'] for _, parsed in chunk if parsed['job_number'] not in existing]
+        taken_usernames = set(
+            User.objects.filter(username__in=new_usernames).values_list('username', flat=True)
+        )
+
+        valid = []
+        for row_number, parsed in chunk:
+            is_new = parsed['job_number'] not in existing
+            if is_new and parsed['username'] in taken_usernames:
+                result.add_error(row_number, f'用户名 {parsed["username"]} 已被其他员工使用')
+                continue
+            if (is_new or self.reset_passwords) and not parsed['password']:
+                result.add_error(row_number, '未提供密码，且未设置默认密码')
+                continue
+            if not is_new:
+                # 已有员工保留原用户名，避免触发用户名唯一约束
+                parsed['username'] = existing[parsed['job_number']]['username']
+            valid.append((is_new, parsed))
+
+        if self.dry_run or not valid:
+            result.created += sum(1 for is_new, _ in valid if is_new)
+            result.updated += sum(1 for is_new, _ in valid if not is_new)
+            return
+
+        # 只为需要设置密码的员工计算哈希（PBKDF2 并行计算）
+        to_hash = [parsed for is_new, parsed in valid if is_new or self.reset_passwords]
+        for parsed, hashed in zip(to_hash, hash_passwords([parsed['password'] for parsed in to_hash], self.workers)):
+            parsed['password_hash'] = hashed
+        unusable_password = make_password(None)
+
+        users = [
+            User(
+                job_number=parsed['job_number'],
+                username=parsed['username'],
+                first_name=parsed['first_name'],
+                last_name=parsed['last_name'],
+                position=parsed['position'],
+                department=parsed['department'],
+                email=parsed['email'],
+                # 已有员工不重置密码时，冲突更新不会写入该占位值
+                password=parsed.get('password_hash', unusable_password),
+            )
+            for _, parsed in valid
+        ]
+
+        update_fields = UPDATE_FIELDS + (['password'] if self.reset_passwords else [])
+        job_numbers = [parsed['job_number'] for _, parsed in valid]
+        with transaction.atomic():
+            User.objects.bulk_create(
+                users,
+                update_conflicts=True,
+                unique_fields=['job_number'],
+                update_fields=update_fields,
+            )
+            user_ids = list(User.objects.filter(job_number__in=job_numbers).values_list('id', flat=True))
+
+            # 提前签发登录Token，避免首次登录时逐个创建
+            has_token = set(Token.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+            tokens = Token.objects.bulk_create(
+                [Token(key=Token.generate_key(), user_id=user_id) for user_id in user_ids if user_id not in has_token],
+                ignore_conflicts=True,
+            )
+            new_user_ids = list(User.objects.filter(
+                job_number__in=[parsed['job_number'] for is_new, parsed in valid if is_new]
+            ).values_list('id', flat=True))
+            if self.seed_profiles:
+                result.profiles_created += seed_capability_profiles(new_user_ids)
+            # bulk_create 不触发 post_save，需手动使依赖员工信息的导出和已有员工的令牌认证缓存失效
+            bump_generation(USER)
+            bump_generations(USER_TOKEN, [
+                existing[parsed['job_number']]['id'] for is_new, parsed in valid if not is_new
+            ])
+
+        result.created += len(new_user_ids)
+        result.updated += len(valid) - len(new_user_ids)
+        result.tokens_created += len(tokens)
+
+
+def seed_capability_profiles(user_ids):
+    """为员工批量初始化全部能力标签（排除role标签）的默认能力画像"""
+    from analysis.models import CapabilityProfile
+    from core.models import Tag
+
+    tag_ids = list(Tag.objects.exclude(category='role').values_list('id', flat=True))
+    profiles = [
+        CapabilityProfile(user_id=user_id, tag_id=tag_id, mastery_level=50.0, initial_level=50.0)
+        for user_id in user_ids
+        for tag_id in tag_ids
+    ]
+    CapabilityProfile.objects.bulk_create(profiles, batch_size=2000, ignore_conflicts=True)
+    return len(profiles)
+
+
+def _map_header(header):
+    """将表头映射为 [(列序号, 字段名)]"""
+    alias_lookup = {
+        alias.lower(): field for field, aliases in HEADER_ALIASES.items() for alias in aliases
+    }
+    columns = [
+        (index, alias_lookup[cell_text(name).lower()])
+        for index, name in enumerate(header)
+        if cell_text(name).lower() in alias_lookup
+    ]
+    if not any(field == 'job_number' for _, field in columns):
+        raise ValueError('文件缺少工号列（job_number/工号）')
+    return columns
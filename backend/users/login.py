@@ -0,0 +1,132 @@
+"""
+登录流程
+
+交接班时大量员工集中登录，登录的开销主要在三处：
+- 查找用户：按输入格式只走工号或用户名其中一个唯一索引，不再使用 OR 查询
+- 校验密码：PBKDF2 在有界线程池中计算（hashlib 计算时释放 GIL），
+  排队已满时快速返回"登录繁忙"，不让少数慢请求长时间占住全部工作进程
+- 签发令牌：一条 INSERT ... ON CONFLICT ... RETURNING 完成"已有则复用（已过期则换新）、没有则创建"
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import connection
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+class LoginBusy(Exception):
+    """密码校验线程池排队已满"""
+
+
+def get_login_settings():
+    return getattr(settings, 'LOGIN_SETTINGS', {})
+
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _executor, _slots
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                login_settings = get_login_settings()
+                workers = login_settings.get('HASH_WORKERS', 4)
+                _slots = threading.BoundedSemaphore(workers + login_settings.get('HASH_QUEUE', 32))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-check')
+    return _executor, _slots
+
+
+def find_login_user(identifier):
+    """
+    按输入格式选择索引查找用户：符合工号格式的先按工号查，否则先按用户名查，
+    未找到时再查另一个字段（两个字段都有唯一索引）
+    """
+    pattern = get_login_settings().get('JOB_NUMBER_PATTERN', r'^[A-Za-z]*\d+$')
+    fields = ('job_number', 'username') if re.match(pattern, identifier) else ('username', 'job_number')
+    for field in fields:
+        user = User.objects.filter(**{field: identifier}).first()
+        if user is not None:
+            return user
+    return None
+
+
+def verify_password(user, raw_password):
+    """
+    在线程池中校验密码
+
+    user 为 None 时仍计算一次哈希，使不存在的账号与密码错误的耗时一致。
+    哈希算法升级需要重新保存密码时，在当前线程中保存（线程池中不访问数据库）。
+
+    Raises:
+        LoginBusy: 排队等待超过 QUEUE_TIMEOUT 秒
+    """
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=get_login_settings().get('QUEUE_TIMEOUT', 5)):
+        raise LoginBusy('登录人数较多，请稍后重试')
+    try:
+        if user is None:
+            executor.submit(make_password, raw_password).result()
+            return False
+
+        needs_update = []
+        valid = executor.submit(
+            check_password, raw_password, user.password, lambda raw: needs_update.append(True)
+        ).result()
+    finally:
+        slots.release()
+
+    if valid and needs_update:
+        user.set_password(raw_password)
+        user.save(update_fields=['password'])
+    return valid
+
+
+def issue_token(user):
+    """
+    签发登录令牌：已有则复用，没有则创建（一条 upsert 语句）
+
+    设置了 AUTH_TOKEN_CACHE_SETTINGS['TOKEN_EXPIRE_HOURS'] 时，已过期的令牌在同一条语句中
+    换成新令牌和新的创建时间，否则登录会拿回一个认证时立即被拒绝的旧令牌。
+
+    Returns:
+        str: 令牌
+    """
+    expire_hours = getattr(settings, 'AUTH_TOKEN_CACHE_SETTINGS', {}).get('TOKEN_EXPIRE_HOURS')
+    now = timezone.now()
+    expired_before = now - timedelta(hours=expire_hours) if expire_hours else None
+
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        token, created = Token.objects.get_or_create(user=user)
+        if not created and expired_before and token.created < expired_before:
+            token.delete()
+            token = Token.objects.create(user=user)
+        return token.key
+
+    table = connection.ops.quote_name(Token._meta.db_table)
+    params = [Token.generate_key(), connection.ops.adapt_datetimefield_value(now), user.pk]
+    if expired_before:
+        expired = f'{table}."created" < %s'
+        update = (f'"key" = CASE WHEN {expired} THEN EXCLUDED."key" ELSE {table}."key" END, '
+                  f'"created" = CASE WHEN {expired} THEN EXCLUDED."created" ELSE {table}."created" END')
+        params += [connection.ops.adapt_datetimefield_value(expired_before)] * 2
+    else:
+        update = '"user_id" = EXCLUDED."user_id"'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ("key", "created", "user_id") VALUES (%s, %s, %s) '
+            f'ON CONFLICT ("user_id") DO UPDATE SET {update} '
+            f'RETURNING "key"',
+            params
+        )
+        return cursor.fetchone()[0]
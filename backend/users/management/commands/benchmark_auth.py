@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from users.authentication import CachedTokenAuthentication, token_cache
+from users.models import User
+
+
+class _Rollback(Exception):
+    """用于在基准测试结束后回滚临时数据"""
+
+
+class Command(BaseCommand):
+    help = '令牌认证基准测试：对比每个请求的认证耗时和SQL查询数（临时数据会回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='每种认证方式的请求次数')
+        parser.add_argument('--tokens', type=int, default=20, help='轮流使用的令牌数量（模拟多个在线用户）')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['requests'])
+        token_count = max(1, options['tokens'])
+
+        results = []
+        try:
+            with transaction.atomic():
+                keys = self.create_tokens(token_count)
+                factory = APIRequestFactory()
+                requests = [factory.get('/api/auth/profile/', HTTP_AUTHORIZATION=f'Token {key}') for key in keys]
+
+                token_cache.clear()
+                for name, authenticator in (
+                    ('TokenAuthentication', TokenAuthentication()),
+                    ('CachedTokenAuthentication', CachedTokenAuthentication()),
+                ):
+                    results.append((name,) + self.measure(authenticator, requests, repeat))
+                token_cache.clear()
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'认证方式':<28} {'查询数/请求':>10} {'中位耗时(us)':>12} {'平均耗时(us)':>12}")
+        for name, queries, median_us, mean_us in results:
+            self.stdout.write(f'{name:<28} {queries:>10.3f} {median_us:>12.1f} {mean_us:>12.1f}')
+
+        baseline, cached = results[0][3], results[1][3]
+        self.stdout.write(self.style.SUCCESS(f'缓存认证平均耗时为原来的 {cached / baseline * 100:.1f}%'))
+
+    def create_tokens(self, count):
+        """为基准测试创建临时用户和令牌"""
+        keys = []
+        for index in range(count):
+            user = User.objects.create_user(
+                username=f'bench_auth_{index}',
+                job_number=f'BENCH-AUTH-{index:04d}',
+                password=None,
+                position='站务员',
+                department='基准测试',
+            )
+            keys.append(Token.objects.create(user=user).key)
+        return keys
+
+    def measure(self, authenticator, requests, repeat):
+        """返回 (平均每请求查询数, 中位耗时us, 平均耗时us)"""
+        durations = []
+        with CaptureQueriesContext(connection) as queries:
+            for index in range(repeat):
+                request = Request(requests[index % len(requests)], authenticators=[authenticator])
+                start = time.perf_counter()
+                request.user
+                durations.append((time.perf_counter() - start) * 1e6)
+        return len(queries) / repeat, statistics.median(durations), statistics.mean(durations)
@@ -0,0 +1,122 @@
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from users import authentication
+from users.authentication import CachedTokenAuthentication, TokenCache
+from users.login import issue_token
+from users.models import User
+
+USER_PREFIX = 'CHECK-AUTH-'
+
+
+class _Rollback(Exception):
+    """检查结束后回滚临时数据"""
+
+
+@contextmanager
+def process_cache(token_cache):
+    """模拟在另一个工作进程中执行：使用独立的进程内令牌缓存"""
+    original = authentication.token_cache
+    authentication.token_cache = token_cache
+    try:
+        yield
+    finally:
+        authentication.token_cache = original
+
+
+class Command(BaseCommand):
+    help = '令牌认证检查：在一个进程缓存中撤销令牌后，另一个进程缓存中的认证必须失败；令牌过期后重新登录应签发新令牌（临时数据会回滚）'
+
+    def handle(self, *args, **options):
+        self.failures = []
+        self.sequence = 0
+        try:
+            with override_settings(AUTH_TOKEN_CACHE_SETTINGS={
+                'TTL_SECONDS': 600, 'MAX_ENTRIES': 100, 'USE_SHARED_CACHE': False, 'TOKEN_EXPIRE_HOURS': None,
+            }), transaction.atomic():
+                self.check_revocation('登出（删除令牌）', lambda user, token: token.delete())
+                self.check_revocation('停用账号', lambda user, token: self.deactivate(user))
+                self.check_password_change()
+                self.check_login_after_expiry()
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if self.failures:
+            raise CommandError(f'{len(self.failures)} 项检查未通过: {", ".join(self.failures)}')
+        self.stdout.write(self.style.SUCCESS('令牌认证检查通过'))
+
+    def create_token(self):
+        self.sequence += 1
+        user = User.objects.create_user(
+            username=f'check_auth_{self.sequence}', job_number=f'{USER_PREFIX}{self.sequence}', password='Check#2024'
+        )
+        return user, Token.objects.create(user=user)
+
+    def change_password(self, user):
+        user.set_password('Changed#2024')
+        user.save()
+
+    def deactivate(self, user):
+        user.is_active = False
+        user.save()
+
+    def authenticate(self, key):
+        """返回认证得到的用户，认证失败返回 None"""
+        try:
+            return CachedTokenAuthentication().authenticate_credentials(key)[0]
+        except exceptions.AuthenticationFailed:
+            return None
+
+    def report(self, name, passed):
+        if passed:
+            self.stdout.write(f'✓ {name}')
+        else:
+            self.failures.append(name)
+            self.stdout.write(self.style.ERROR(f'✗ {name}'))
+
+    def check_revocation(self, name, revoke):
+        """工作进程 A 缓存令牌后，在工作进程 B 中撤销，A 再次认证应失败"""
+        user, token = self.create_token()
+        worker_a, worker_b = TokenCache(), TokenCache()
+        with process_cache(worker_a):
+            cached = self.authenticate(token.key) and self.authenticate(token.key) and len(worker_a) == 1
+        with process_cache(worker_b):
+            revoke(User.objects.get(pk=user.pk), token)
+        with process_cache(worker_a):
+            revoked = self.authenticate(token.key) is None
+        self.report(f'{name}后其他进程缓存的令牌失效', bool(cached) and revoked)
+
+    def check_password_change(self):
+        """工作进程 B 修改密码后，A 不再使用缓存中的旧用户数据"""
+        user, token = self.create_token()
+        worker_a, worker_b = TokenCache(), TokenCache()
+        with process_cache(worker_a):
+            self.authenticate(token.key)
+        with process_cache(worker_b):
+            self.change_password(User.objects.get(pk=user.pk))
+        with process_cache(worker_a):
+            current = self.authenticate(token.key)
+        self.report('修改密码后其他进程重新读取用户数据',
+                    current is not None and current.check_password('Changed#2024'))
+
+    def check_login_after_expiry(self):
+        """令牌过期后重新登录，应签发可以认证的新令牌；未过期时复用原令牌"""
+        user, token = self.create_token()
+        with override_settings(AUTH_TOKEN_CACHE_SETTINGS={
+            'TTL_SECONDS': 600, 'MAX_ENTRIES': 100, 'USE_SHARED_CACHE': False, 'TOKEN_EXPIRE_HOURS': 1,
+        }), process_cache(TokenCache()):
+            reused = issue_token(user) == token.key
+            Token.objects.filter(user=user).update(created=timezone.now() - timedelta(hours=2))
+            key = issue_token(user)
+            rotated = key != token.key and self.authenticate(key) is not None
+            rejected = self.authenticate(token.key) is None
+        self.report('令牌未过期时登录复用原令牌', reused)
+        self.report('令牌过期后登录签发新令牌', rotated and rejected)
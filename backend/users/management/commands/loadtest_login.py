@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+
+from users.models import User
+
+USER_PREFIX = 'LOADTEST-LOGIN-'
+
+
+class Command(BaseCommand):
+    help = '登录压测：多线程持续请求登录接口，统计单个工作进程的登录吞吐量和延迟（临时账号会删除）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='临时账号数量')
+        parser.add_argument('--concurrency', type=int, default=8, help='并发请求线程数')
+        parser.add_argument('--duration', type=float, default=10, help='压测时长（秒）')
+        parser.add_argument('--password', default='Loadtest#2024', help='临时账号的密码')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--users 和 --concurrency 必须大于0')
+
+        job_numbers = self.create_users(options['users'], options['password'])
+        try:
+            results = self.run(job_numbers, options['password'], options['concurrency'], options['duration'])
+        finally:
+            User.objects.filter(job_number__startswith=USER_PREFIX).delete()
+
+        elapsed, latencies, status_counts = results
+        succeeded = status_counts.get(200, 0)
+        self.stdout.write(f'并发 {options["concurrency"]}，持续 {elapsed:.1f} 秒，共 {len(latencies)} 次登录请求')
+        self.stdout.write('状态码: ' + ', '.join(f'{code}×{count}' for code, count in sorted(status_counts.items())))
+        if latencies:
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(f'延迟: 中位 {statistics.median(latencies):.1f} ms，P95 {p95:.1f} ms，最大 {latencies[-1]:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'单个工作进程持续登录吞吐量: {succeeded / elapsed:.1f} 次/秒'))
+
+    def create_users(self, count, password):
+        """创建临时账号（所有账号共用一次计算出的密码哈希）"""
+        User.objects.filter(job_number__startswith=USER_PREFIX).delete()
+        encoded = make_password(password)
+        User.objects.bulk_create([
+            User(
+                username=f'loadtest_login_{index}',
+                job_number=f'{USER_PREFIX}{index:05d}',
+                password=encoded,
+                position='站务员',
+                department='压测',
+            )
+            for index in range(count)
+        ])
+        return [f'{USER_PREFIX}{index:05d}' for index in range(count)]
+
+    def run(self, job_numbers, password, concurrency, duration):
+        """返回 (实际耗时, 各请求延迟ms, {状态码: 次数})"""
+        latencies = []
+        status_counts = {}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker(offset):
+            client = APIClient()
+            index = offset
+            local_latencies, local_counts = [], {}
+            try:
+                while time.perf_counter() < deadline:
+                    job_number = job_numbers[index % len(job_numbers)]
+                    index += concurrency
+                    start = time.perf_counter()
+                    response = client.post(
+                        '/api/auth/login/', {'job_number': job_number, 'password': password}, format='json'
+                    )
+                    local_latencies.append((time.perf_counter() - start) * 1000)
+                    local_counts[response.status_code] = local_counts.get(response.status_code, 0) + 1
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local_latencies)
+                for code, count in local_counts.items():
+                    status_counts[code] = status_counts.get(code, 0) + count
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, status_counts
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.cache import USER, bump_generation
+from .authentication import invalidate_token, invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_token_cache(sender, instance, created=False, **kwargs):
+    """用户被修改（密码、启用状态、岗位等）或删除后，清除其令牌认证缓存（新建用户尚无缓存）"""
+    if created:
+        return
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_generation(sender, instance, raw=False, update_fields=None, **kwargs):
+    """员工信息变化后使依赖部门、岗位等字段的导出文件失效（只更新最后登录时间时跳过）"""
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    bump_generation(USER)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """令牌被删除（登出等）后清除认证缓存"""
+    invalidate_token(instance.key, instance.user_id)
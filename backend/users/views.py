@@ -1,9 +1,9 @@
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from rest_framework.generics import CreateAPIView
 from .models import User
+from .login import LoginBusy, issue_token
 from .serializers import LoginSerializer, UserSerializer, UserCreateSerializer
 
 
@@ -13,12 +13,16 @@ def login_view(request):
     """用户登录接口"""
     serializer = LoginSerializer(data=request.data, context={'request': request})
 
-    if serializer.is_valid():
+    try:
+        is_valid = serializer.is_valid()
+    except LoginBusy as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if is_valid:
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
 
         return Response({
-            'token': token.key,
+            'token': issue_token(user),
             'user': UserSerializer(user).data
         }, status=status.HTTP_200_OK)
 